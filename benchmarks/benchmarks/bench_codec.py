@@ -0,0 +1,69 @@
+# This Python file uses the following encoding: utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+import json
+import timeit
+from bhiveapi.codec import JsonCodec, JSON_MODULE
+
+
+def get_block_batch_reply(n_blocks=100, n_trx=50):
+    """Returns an encoded block_api.get_block batch reply with n_blocks blocks"""
+    reply = []
+    for block_num in range(1, n_blocks + 1):
+        transactions = []
+        for i in range(n_trx):
+            transactions.append({
+                "ref_block_num": block_num % 65536,
+                "ref_block_prefix": 3348585398,
+                "expiration": "2020-03-20T12:00:30",
+                "operations": [{"type": "custom_json_operation",
+                                "value": {"required_auths": [], "required_posting_auths": ["holger80"],
+                                          "id": "sm_find_match",
+                                          "json": "{\"match_type\":\"Ranked\",\"mana_cap\":28,\"ruleset\":\"Standard\"}"}},
+                               {"type": "transfer_operation",
+                                "value": {"from": "holger80", "to": "beembot",
+                                          "amount": {"amount": "1000", "precision": 3, "nai": "@@000000021"},
+                                          "memo": "Test transfer äöü %d" % i}}],
+                "extensions": [],
+                "signatures": ["1f" + "7a" * 64]})
+        block = {"previous": "%08x" % (block_num - 1) + "ab" * 16,
+                 "timestamp": "2020-03-20T12:00:00",
+                 "witness": "gtg",
+                 "transaction_merkle_root": "cd" * 20,
+                 "extensions": [],
+                 "witness_signature": "20" + "ef" * 64,
+                 "transactions": transactions,
+                 "block_id": "%08x" % block_num + "ab" * 16,
+                 "signing_key": "STM5ys4KvLasF8zEr4RyaCbVcP8ubHnedxT2uhXfAvBjNmvzFnKNE",
+                 "transaction_ids": ["%040x" % (block_num * 1000 + i) for i in range(n_trx)]}
+        reply.append({"jsonrpc": "2.0", "result": {"block": block}, "id": block_num})
+    return json.dumps(reply).encode("utf8")
+
+
+class Benchmark(object):
+    goal_time = 1
+
+
+class Codec(Benchmark):
+    params = [JSON_MODULE, "json"]
+    param_names = ["module"]
+
+    def setup(self, module):
+        self.codec = JsonCodec(module)
+        self.reply = get_block_batch_reply()
+        self.payload = json.loads(self.reply.decode("utf8"))
+
+    def time_loads(self, module):
+        self.codec.loads(self.reply)
+
+    def time_dumps(self, module):
+        self.codec.dumps(self.payload)
+
+    def track_loads_bytes_per_sec(self, module):
+        number = 10
+        duration = timeit.timeit(lambda: self.codec.loads(self.reply), number=number)
+        return len(self.reply) * number / duration
+
+    track_loads_bytes_per_sec.unit = "bytes/s"
@@ -0,0 +1,42 @@
+# This Python file uses the following encoding: utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+from bhive import Hive
+from bhive.block import Block
+from bhive.blockchainobject import BlockchainObject
+from bhive.opsstatistics import OpsStatistics
+from bhive.records import BlockRecord
+from bhiveapi import codec
+from .bench_stream import get_blocks
+
+
+class Benchmark(object):
+    goal_time = 1
+
+
+class OpsStatisticsCounting(Benchmark):
+    """Counting with Block.ops_statistics compared with OpsStatistics on BlockRecords"""
+
+    def setup(self):
+        self.hv = Hive(offline=True)
+        self.replies = [codec.dumps(block.json()) for block in get_blocks(self.hv)]
+
+    def teardown(self):
+        BlockchainObject.clear_cache()
+
+    def time_block_ops_statistics(self):
+        ops_stat = None
+        for reply in self.replies:
+            ops_stat = Block(codec.loads(reply), hive_instance=self.hv).ops_statistics(add_to_ops_stat=ops_stat)
+
+    def time_records(self):
+        stats = OpsStatistics()
+        for reply in self.replies:
+            stats.add_block(BlockRecord(codec.loads(reply)))
+
+    def time_records_interval(self):
+        stats = OpsStatistics(interval=3600)
+        for reply in self.replies:
+            stats.add_block(BlockRecord(codec.loads(reply)))
@@ -0,0 +1,76 @@
+# This Python file uses the following encoding: utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+import time
+import tracemalloc
+from bhive import Hive
+from bhive.blockchain import Blockchain
+from bhive.blockchainobject import BlockchainObject
+from bhiveapi import codec
+from .bench_stream import get_blocks
+
+
+class ReceivedBlockchain(Blockchain):
+    """Streams recorded blocks, which are decoded from JSON like node replies"""
+    def __init__(self, replies, hive_instance):
+        super(ReceivedBlockchain, self).__init__(hive_instance=hive_instance)
+        self.replies = replies
+
+    def blocks(self, raw_records=False, **kwargs):
+        for reply in self.replies:
+            yield self._new_block(codec.loads(reply), raw_records=raw_records)
+
+
+class Benchmark(object):
+    goal_time = 1
+
+
+class Records(Benchmark):
+    """Block and Operation objects compared with BlockRecord and OperationRecord"""
+    params = [False, True]
+    param_names = ["raw_records"]
+
+    def setup(self, raw_records):
+        self.hv = Hive(offline=True)
+        self.replies = [codec.dumps(block.json()) for block in get_blocks(self.hv)]
+        self.b = ReceivedBlockchain(self.replies, self.hv)
+        self.n_ops = sum(len(codec.loads(reply)["transactions"]) for reply in self.replies)
+
+    def teardown(self, raw_records):
+        BlockchainObject.clear_cache()
+
+    def time_blocks(self, raw_records):
+        for block in self.b.blocks(raw_records=raw_records):
+            pass
+
+    def time_stream(self, raw_records):
+        for op in self.b.stream(raw_records=raw_records):
+            pass
+
+    def time_stream_timestamp(self, raw_records):
+        for op in self.b.stream(raw_records=raw_records):
+            op["timestamp"]
+
+    def track_ops_per_sec(self, raw_records):
+        start = time.time()
+        for op in self.b.stream(raw_records=raw_records):
+            pass
+        return self.n_ops / (time.time() - start)
+
+    track_ops_per_sec.unit = "ops/s"
+
+    def track_bytes_per_op(self, raw_records):
+        """Memory of all streamed operations and their blocks, when they are kept"""
+        BlockchainObject.clear_cache()
+        tracemalloc.start()
+        try:
+            start = tracemalloc.get_traced_memory()[0]
+            ops = list(self.b.stream(raw_records=raw_records))
+            size = tracemalloc.get_traced_memory()[0] - start
+        finally:
+            tracemalloc.stop()
+        return size / len(ops)
+
+    track_bytes_per_op.unit = "bytes"
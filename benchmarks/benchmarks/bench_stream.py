@@ -0,0 +1,89 @@
+# This Python file uses the following encoding: utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+import json
+import time
+from bhive import Hive
+from bhive.block import Block
+from bhive.blockchain import Blockchain
+
+
+def get_blocks(hive_instance, n_blocks=100, n_trx=50):
+    """Returns n_blocks appbase blocks with many votes and custom_json and few transfer operations"""
+    blocks = []
+    for block_num in range(1, n_blocks + 1):
+        transactions = []
+        for i in range(n_trx):
+            if i % 10 == 0:
+                op = {"type": "transfer_operation",
+                      "value": {"from": "holger80", "to": "beembot",
+                                "amount": {"amount": "1000", "precision": 3, "nai": "@@000000021"},
+                                "memo": "Test transfer %d" % i}}
+            elif i % 2 == 0:
+                op = {"type": "vote_operation",
+                      "value": {"voter": "holger80", "author": "beembot", "permlink": "post-%d" % i, "weight": 10000}}
+            else:
+                op = {"type": "custom_json_operation",
+                      "value": {"required_auths": [], "required_posting_auths": ["holger80"],
+                                "id": "sm_find_match",
+                                "json": "{\"match_type\":\"Ranked\",\"mana_cap\":28,\"ruleset\":\"Standard\"}"}}
+            transactions.append({"ref_block_num": block_num % 65536, "ref_block_prefix": 3348585398,
+                                 "expiration": "2020-03-20T12:00:30", "operations": [op],
+                                 "extensions": [], "signatures": ["1f" + "7a" * 64]})
+        block = Block({"previous": "%08x" % (block_num - 1) + "ab" * 16,
+                       "timestamp": "2020-03-20T12:00:00",
+                       "witness": "gtg",
+                       "transaction_merkle_root": "cd" * 20,
+                       "extensions": [],
+                       "witness_signature": "20" + "ef" * 64,
+                       "transactions": transactions,
+                       "block_id": "%08x" % block_num + "ab" * 16,
+                       "signing_key": "STM5ys4KvLasF8zEr4RyaCbVcP8ubHnedxT2uhXfAvBjNmvzFnKNE",
+                       "transaction_ids": ["%040x" % (block_num * 1000 + i) for i in range(n_trx)]},
+                      hive_instance=hive_instance)
+        block["id"] = block_num
+        blocks.append(block)
+    return blocks
+
+
+class RecordedBlockchain(Blockchain):
+    """Streams a recorded list of blocks"""
+    def __init__(self, blocks, hive_instance):
+        super(RecordedBlockchain, self).__init__(hive_instance=hive_instance)
+        self.recorded_blocks = blocks
+
+    def blocks(self, **kwargs):
+        return iter(self.recorded_blocks)
+
+
+class Benchmark(object):
+    goal_time = 1
+
+
+class Stream(Benchmark):
+    params = [[], ["transfer"], ["transfer", "vote", "custom_json"]]
+    param_names = ["opNames"]
+
+    def setup(self, opNames):
+        self.hv = Hive(offline=True)
+        self.blocks = get_blocks(self.hv)
+        self.b = RecordedBlockchain(self.blocks, self.hv)
+
+    def time_stream(self, opNames):
+        for op in self.b.stream(opNames=opNames):
+            pass
+
+    def time_stream_id(self, opNames):
+        for op in self.b.stream(opNames=opNames):
+            op["_id"]
+
+    def track_ops_per_sec(self, opNames):
+        start = time.time()
+        n_ops = sum(len(block["transactions"]) for block in self.blocks)
+        for op in self.b.stream(opNames=opNames):
+            pass
+        return n_ops / (time.time() - start)
+
+    track_ops_per_sec.unit = "ops/s"
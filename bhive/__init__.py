@@ -8,13 +8,23 @@ __all__ = [
     "amount",
     "asset",
     "block",
+    "blockarchive",
     "blockchain",
+    "blocktimeindex",
+    "forkdetection",
+    "headfollower",
+    "customjsonrouter",
     "market",
+    "opsstatistics",
     "storage",
+    "streamcursor",
     "price",
+    "records",
+    "shardedstream",
     "utils",
     "wallet",
     "vote",
+    "watchlist",
     "message",
     "notify",
     "comment",
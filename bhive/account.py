@@ -3297,6 +3297,17 @@ class Accounts(AccountsObject):
         accounts = []
         name_cnt = 0
 
+        if getattr(self.hive.rpc, "batch_fanout", False) and self.hive.rpc.get_use_appbase() and len(name_list) > batch_limit:
+            # queue all calls, the batch is sent in parallel to several nodes
+            self.hive.rpc.set_next_node_on_empty_reply(False)
+            while name_cnt + batch_limit < len(name_list):
+                self.hive.rpc.find_accounts({'accounts': name_list[name_cnt:batch_limit + name_cnt]}, api="database", add_to_queue=True)
+                name_cnt += batch_limit
+            for reply in self.hive.rpc.find_accounts({'accounts': name_list[name_cnt:]}, api="database", add_to_queue=False, fanout_batch_size=1):
+                if reply is not None:
+                    accounts += reply["accounts"]
+            name_cnt = len(name_list)
+
         while name_cnt < len(name_list):
             self.hive.rpc.set_next_node_on_empty_reply(False)
             if self.hive.rpc.get_use_appbase():
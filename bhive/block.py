@@ -9,6 +9,7 @@ from .exceptions import BlockDoesNotExistsException
 from .utils import parse_time, formatTimeString
 from .blockchainobject import BlockchainObject
 from bhiveapi.exceptions import ApiNotSupported
+from bhiveapi import codec
 from bhivegraphenebase.py23 import bytes_types, integer_types, string_types, text_type
 
 
@@ -94,6 +95,7 @@ class Block(BlockchainObject):
         return block
 
     def json(self):
+        """Returns a deep copy of the block with string timestamps, which can be changed by the caller"""
         output = self.copy()
         parse_times = [
             "timestamp",
@@ -106,18 +108,20 @@ class Block(BlockchainObject):
                 else:
                     output[p] = p_date
 
+        # the cached block itself is not modified
         if "transactions" in output:
-            for i in range(len(output["transactions"])):
-                if 'expiration' in output["transactions"][i] and isinstance(output["transactions"][i]["expiration"], (datetime, date)):
-                    output["transactions"][i]["expiration"] = formatTimeString(output["transactions"][i]["expiration"])
+            output["transactions"] = [self._format_time_field(trx, "expiration") for trx in output["transactions"]]
         elif "operations" in output:
-            for i in range(len(output["operations"])):
-                if 'timestamp' in output["operations"][i] and isinstance(output["operations"][i]["timestamp"], (datetime, date)):
-                    output["operations"][i]["timestamp"] = formatTimeString(output["operations"][i]["timestamp"])
+            output["operations"] = [self._format_time_field(op, "timestamp") for op in output["operations"]]
+        # nested transactions and operations must not be shared with the cache
+        return codec.loads(codec.dumps(output))
 
-        ret = json.loads(str(json.dumps(output)))
-        output = self._parse_json_data(output)
-        return ret
+    @staticmethod
+    def _format_time_field(data, key):
+        if key in data and isinstance(data[key], (datetime, date)):
+            data = data.copy()
+            data[key] = formatTimeString(data[key])
+        return data
 
     def refresh(self):
         """ Even though blocks never change, you freshly obtain its contents
@@ -365,6 +369,7 @@ class BlockHeader(BlockchainObject):
         return block
 
     def json(self):
+        """Returns a deep copy of the header with string timestamps, which can be changed by the caller"""
         output = self.copy()
         parse_times = [
             "timestamp",
@@ -376,4 +381,4 @@ class BlockHeader(BlockchainObject):
                     output[p] = formatTimeString(p_date)
                 else:
                     output[p] = p_date
-        return json.loads(str(json.dumps(output)))
+        return codec.loads(codec.dumps(output))
@@ -0,0 +1,310 @@
+# This Python file uses the following encoding: utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+import bisect
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import zlib
+from array import array
+from bhiveapi import codec
+from .block import Block
+from .records import BlockRecord
+log = logging.getLogger(__name__)
+COMPRESSION_MODULES = {"zlib": zlib}
+try:
+    import bz2
+    COMPRESSION_MODULES["bz2"] = bz2
+except ImportError:
+    pass
+try:
+    import lzma
+    COMPRESSION_MODULES["lzma"] = lzma
+except ImportError:
+    pass
+
+
+class BlockArchive(object):
+    """ Local append-only archive of blocks
+
+        :param str path: Directory in which the archive is stored
+        :param int segment_size: A new segment file is started, when the
+            current one is larger than segment_size bytes (default is 256 MB)
+        :param str compression: ``zlib`` (default), ``bz2``, ``lzma`` or
+            ``None``, only used when a new archive is created
+        :param int compression_level: compression level (default is 6)
+        :param bool read_only: No blocks can be added, when True (default is False)
+
+        Each block is stored as compressed JSON record in a segment file
+        (``segment_000000.dat``, ...). The records are never changed. The
+        block number, segment, offset and length of each record are appended
+        to ``index.dat``. The segments are read through mmap, so that single
+        blocks can be read without reading the whole segment.
+
+        The archive can be used as source by :func:`bhive.blockchain.Blockchain.blocks`:
+
+        .. code-block:: python
+
+            from bhive.blockchain import Blockchain
+            from bhive.blockarchive import BlockArchive
+            archive = BlockArchive("/tmp/blocks")
+            b = Blockchain()
+            # missing blocks are received from the node and added to the archive
+            for block in b.blocks(start=42000000, stop=42001000, block_archive=archive):
+                print(block)
+
+        Only full blocks can be stored and read. They contain no virtual
+        operations, so blocks with ``only_ops=True`` or ``only_virtual_ops=True``
+        are not read from the archive.
+    """
+    version = 1
+    meta_name = "archive.json"
+    index_name = "index.dat"
+    segment_name = "segment_%06d.dat"
+    # block_num, segment, offset, length
+    index_record = struct.Struct("<IIQI")
+
+    def __init__(self, path, segment_size=256 * 1024 ** 2, compression="zlib", compression_level=6, read_only=False):
+        self.path = path
+        self.segment_size = segment_size
+        self.compression_level = compression_level
+        self.read_only = read_only
+        self._lock = threading.RLock()
+        if not os.path.isdir(path):
+            if read_only:
+                raise ValueError("%s does not exist" % path)
+            os.makedirs(path)
+        meta_filename = os.path.join(path, self.meta_name)
+        if os.path.isfile(meta_filename):
+            with open(meta_filename, "r") as f:
+                meta = json.load(f)
+            if meta.get("version", 1) > self.version:
+                raise ValueError("Archive version %d is not supported" % meta["version"])
+            compression = meta.get("compression")
+        elif not read_only:
+            if compression is not None and compression not in COMPRESSION_MODULES:
+                raise ValueError("Unknown compression %s" % str(compression))
+            with open(meta_filename, "w") as f:
+                json.dump({"version": self.version, "compression": compression}, f)
+        self.compression = compression
+        if compression is not None and compression not in COMPRESSION_MODULES:
+            raise ValueError("Compression %s is not available" % str(compression))
+        self._compression_module = COMPRESSION_MODULES.get(compression)
+        # sorted by block number
+        self._block_nums = array(str("I"))
+        self._segments = array(str("I"))
+        self._offsets = array(str("Q"))
+        self._lengths = array(str("I"))
+        # segment: (file, mmap)
+        self._readers = {}
+        self._writer = None
+        self._writer_segment = None
+        self._index_file = None
+        self._load_index()
+
+    def _segment_filename(self, segment):
+        return os.path.join(self.path, self.segment_name % segment)
+
+    def _load_index(self):
+        """Reads the index, records which are not completely written are removed"""
+        index_filename = os.path.join(self.path, self.index_name)
+        if not os.path.isfile(index_filename) or os.path.getsize(index_filename) == 0:
+            return
+        segment_sizes = {}
+        entries = []
+        valid_size = 0
+        with open(index_filename, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                n_records = len(data) // self.index_record.size
+                for i in range(n_records):
+                    block_num, segment, offset, length = self.index_record.unpack_from(data, i * self.index_record.size)
+                    if segment not in segment_sizes:
+                        filename = self._segment_filename(segment)
+                        segment_sizes[segment] = os.path.getsize(filename) if os.path.isfile(filename) else 0
+                    if offset + length > segment_sizes[segment]:
+                        break
+                    entries.append((block_num, segment, offset, length))
+                    valid_size += self.index_record.size
+            finally:
+                data.close()
+        if valid_size < os.path.getsize(index_filename) and not self.read_only:
+            log.warning("Removing %d incomplete index records" % ((os.path.getsize(index_filename) - valid_size) // self.index_record.size))
+            with open(index_filename, "r+b") as f:
+                f.truncate(valid_size)
+        if any(entries[i][0] > entries[i + 1][0] for i in range(len(entries) - 1)):
+            entries.sort()
+        for block_num, segment, offset, length in entries:
+            self._add_entry(block_num, segment, offset, length)
+
+    def _add_entry(self, block_num, segment, offset, length):
+        if len(self._block_nums) == 0 or block_num > self._block_nums[-1]:
+            pos = len(self._block_nums)
+        else:
+            pos = bisect.bisect_left(self._block_nums, block_num)
+            if pos < len(self._block_nums) and self._block_nums[pos] == block_num:
+                return
+        self._block_nums.insert(pos, block_num)
+        self._segments.insert(pos, segment)
+        self._offsets.insert(pos, offset)
+        self._lengths.insert(pos, length)
+
+    def _find(self, block_num):
+        pos = bisect.bisect_left(self._block_nums, block_num)
+        if pos < len(self._block_nums) and self._block_nums[pos] == block_num:
+            return pos
+        return None
+
+    def __len__(self):
+        return len(self._block_nums)
+
+    def __contains__(self, block_num):
+        return self._find(int(block_num)) is not None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def first_block_num(self):
+        """Lowest stored block number or None"""
+        if len(self._block_nums) == 0:
+            return None
+        return self._block_nums[0]
+
+    @property
+    def last_block_num(self):
+        """Highest stored block number or None"""
+        if len(self._block_nums) == 0:
+            return None
+        return self._block_nums[-1]
+
+    def next_block_num(self, block_num):
+        """Returns the lowest stored block number which is greater or equal than block_num or None"""
+        pos = bisect.bisect_left(self._block_nums, block_num)
+        if pos < len(self._block_nums):
+            return self._block_nums[pos]
+        return None
+
+    def _encode(self, data):
+        data = codec.dumps(data)
+        if self.compression == "lzma":
+            data = self._compression_module.compress(data, preset=self.compression_level)
+        elif self._compression_module is not None:
+            data = self._compression_module.compress(data, self.compression_level)
+        return data
+
+    def _decode(self, data):
+        if self._compression_module is not None:
+            data = self._compression_module.decompress(data)
+        return codec.loads(data)
+
+    def _open_writer(self, size):
+        if self._index_file is None:
+            self._index_file = open(os.path.join(self.path, self.index_name), "ab")
+        if self._writer is None:
+            segment = 0
+            while os.path.isfile(self._segment_filename(segment + 1)):
+                segment += 1
+            self._writer_segment = segment
+            self._writer = open(self._segment_filename(segment), "ab")
+        if self._writer.tell() > 0 and self._writer.tell() + size > self.segment_size:
+            self._writer.close()
+            self._writer_segment += 1
+            self._writer = open(self._segment_filename(self._writer_segment), "ab")
+
+    def append(self, block):
+        """ Adds a block to the archive
+
+            :param block: :class:`bhive.block.Block`, :class:`bhive.records.BlockRecord` or block dict
+            :returns: False, when the block was already stored
+        """
+        if self.read_only:
+            raise ValueError("The archive is read only")
+        if isinstance(block, (Block, BlockRecord)):
+            data = block.json()
+        else:
+            data = block
+        if "transactions" not in data or "block_id" not in data:
+            raise ValueError("Only full blocks can be stored")
+        block_num = int(data["block_id"][:8], base=16)
+        with self._lock:
+            if block_num in self:
+                return False
+            record = self._encode(data)
+            self._open_writer(len(record))
+            offset = self._writer.tell()
+            self._writer.write(record)
+            self._writer.flush()
+            self._index_file.write(self.index_record.pack(block_num, self._writer_segment, offset, len(record)))
+            self._index_file.flush()
+            self._add_entry(block_num, self._writer_segment, offset, len(record))
+        return True
+
+    def extend(self, blocks):
+        """Adds all blocks, returns the number of added blocks"""
+        cnt = 0
+        for block in blocks:
+            if self.append(block):
+                cnt += 1
+        return cnt
+
+    def _read(self, segment, offset, length):
+        with self._lock:
+            reader = self._readers.get(segment)
+            if reader is None or len(reader[1]) < offset + length:
+                if reader is not None:
+                    reader[1].close()
+                    reader[0].close()
+                f = open(self._segment_filename(segment), "rb")
+                reader = (f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+                self._readers[segment] = reader
+            return reader[1][offset:offset + length]
+
+    def get(self, block_num):
+        """Returns the stored block dict or None"""
+        pos = self._find(int(block_num))
+        if pos is None:
+            return None
+        return self._decode(self._read(self._segments[pos], self._offsets[pos], self._lengths[pos]))
+
+    def get_block(self, block_num, hive_instance=None):
+        """Returns the stored block as :class:`bhive.block.Block` or None"""
+        data = self.get(block_num)
+        if data is None:
+            return None
+        block = Block(data, hive_instance=hive_instance)
+        block["id"] = block.block_num
+        block.identifier = block.block_num
+        return block
+
+    def blocks(self, start=None, stop=None, hive_instance=None):
+        """Yields all stored blocks from start to stop (both included) in order"""
+        pos = 0 if start is None else bisect.bisect_left(self._block_nums, start)
+        while pos < len(self._block_nums):
+            block_num = self._block_nums[pos]
+            if stop is not None and block_num > stop:
+                break
+            yield self.get_block(block_num, hive_instance=hive_instance)
+            pos += 1
+
+    def close(self):
+        """Closes all open files"""
+        with self._lock:
+            for f, data in self._readers.values():
+                data.close()
+                f.close()
+            self._readers = {}
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+            if self._index_file is not None:
+                self._index_file.close()
+                self._index_file = None
@@ -7,13 +7,10 @@ from future.utils import python_2_unicode_compatible
 from builtins import str
 from builtins import range
 from builtins import object
-import sys
 import time
 import hashlib
 import json
 import math
-from threading import Thread, Event
-from time import sleep
 import logging
 from datetime import datetime, timedelta
 from .utils import formatTimeString, addTzInfo
@@ -21,155 +18,171 @@ from .block import Block, BlockHeader
 from bhiveapi.node import Nodes
 from bhiveapi.hivenoderpc import HiveNodeRPC
 from .exceptions import BatchedCallsNotSupported, BlockDoesNotExistsException, BlockWaitTimeExceeded, OfflineHasNoRPCException
-from bhiveapi.exceptions import NumRetriesReached
+from bhiveapi.exceptions import NumRetriesReached, NoMethodWithName, NoApiWithName, ApiNotSupported
 from bhivegraphenebase.py23 import py23_bytes
+from bhivebase.operationids import getVirtualOperationFilter
 from bhive.instance import shared_hive_instance
 from .amount import Amount
+from .watchlist import AccountWatchlist
+from .records import BlockRecord, OperationRecord
+from .shardedstream import ShardedStream, get_hive_config
+from .forkdetection import BlockRollback, BlockWindow
+from .headfollower import HeadPoller
+from .opsstatistics import OpsStatistics
+from .blocktimeindex import BlockTimeIndex, to_seconds
 import bhive as hv
 log = logging.getLogger(__name__)
-if sys.version_info < (3, 0):
-    from Queue import Queue
-else:
-    from queue import Queue
+# same output as json.dumps(event, sort_keys=True), hash_op results must not change
+_hash_op_encoder = json.JSONEncoder(sort_keys=True)
 FUTURES_MODULE = None
 if not FUTURES_MODULE:
     try:
-        from concurrent.futures import ThreadPoolExecutor, wait, as_completed
+        from concurrent.futures import ThreadPoolExecutor, wait, as_completed, FIRST_COMPLETED
         FUTURES_MODULE = "futures"
         # FUTURES_MODULE = None
     except ImportError:
         FUTURES_MODULE = None
 
 
-# default exception handler. if you want to take some action on failed tasks
-# maybe add the task back into the queue, then make your own handler and pass it in
-def default_handler(name, exception, *args, **kwargs):
-    log.warn('%s raised %s with args %s and kwargs %s' % (name, str(exception), repr(args), repr(kwargs)))
-    pass
-
-
-class Worker(Thread):
-    """Thread executing tasks from a given tasks queue"""
-    def __init__(self, name, queue, results, abort, idle, exception_handler):
-        Thread.__init__(self)
-        self.name = name
-        self.queue = queue
-        self.results = results
-        self.abort = abort
-        self.idle = idle
-        self.exception_handler = exception_handler
-        self.daemon = True
-        self.start()
-
-    def run(self):
-        """Thread work loop calling the function with the params"""
-        # keep running until told to abort
-        while not self.abort.is_set():
-            try:
-                # get a task and raise immediately if none available
-                func, args, kwargs = self.queue.get(False)
-                self.idle.clear()
-            except:
-                # no work to do
-                # if not self.idle.is_set():
-                #  print >> stdout, '%s is idle' % self.name
-                self.idle.set()
-                # time.sleep(1)
-                continue
+class BlockRangeSize(object):
+    """ Adapts the number of blocks which are received by one
+        ``block_api.get_block_range`` call
 
-            try:
-                # the function may raise
-                result = func(*args, **kwargs)
-                # print(result)
-                if(result is not None):
-                    self.results.put(result)
-            except Exception as e:
-                # so we move on and handle it in whatever way the caller wanted
-                self.exception_handler(self.name, e, args, kwargs)
-            finally:
-                # task complete no matter what happened
-                self.queue.task_done()
-
-
-# class for thread pool
-class Pool:
-    """Pool of threads consuming tasks from a queue"""
-    def __init__(self, thread_count, batch_mode=True, exception_handler=default_handler):
-        # batch mode means block when adding tasks if no threads available to process
-        self.queue = Queue(thread_count if batch_mode else 0)
-        self.resultQueue = Queue(0)
-        self.thread_count = thread_count
-        self.exception_handler = exception_handler
-        self.aborts = []
-        self.idles = []
-        self.threads = []
-
-    def __del__(self):
-        """Tell my threads to quit"""
-        self.abort()
-
-    def run(self, block=False):
-        """Start the threads, or restart them if you've aborted"""
-        # either wait for them to finish or return false if some arent
-        if block:
-            while self.alive():
-                sleep(1)
-        elif self.alive():
-            return False
+        :param int size: initial number of blocks (default is 50)
+        :param int min_size: smallest number of blocks (default is 1)
+        :param int max_size: largest number of blocks (default is 1000,
+            which is the limit of hived)
+        :param float target_latency: wanted duration of one call in seconds
+        :param int target_bytes: wanted size of one reply in bytes
 
-        # go start them
-        self.aborts = []
-        self.idles = []
-        self.threads = []
-        for n in range(self.thread_count):
-            abort = Event()
-            idle = Event()
-            self.aborts.append(abort)
-            self.idles.append(idle)
-            self.threads.append(Worker('thread-%d' % n, self.queue, self.resultQueue, abort, idle, self.exception_handler))
-        return True
-
-    def enqueue(self, func, *args, **kargs):
-        """Add a task to the queue"""
-        self.queue.put((func, args, kargs))
-
-    def join(self):
-        """Wait for completion of all the tasks in the queue"""
-        self.queue.join()
-
-    def abort(self, block=False):
-        """Tell each worker that its done working"""
-        # tell the threads to stop after they are done with what they are currently doing
-        for a in self.aborts:
-            a.set()
-        # wait for them to finish if requested
-        while block and self.alive():
-            sleep(1)
-
-    def alive(self):
-        """Returns True if any threads are currently running"""
-        return True in [t.is_alive() for t in self.threads]
-
-    def idle(self):
-        """Returns True if all threads are waiting for work"""
-        return False not in [i.is_set() for i in self.idles]
-
-    def done(self):
-        """Returns True if not tasks are left to be completed"""
-        return self.queue.empty()
-
-    def results(self, sleep_time=0):
-        """Get the set of results that have been processed, repeatedly call until done"""
-        sleep(sleep_time)
-        results = []
-        try:
-            while True:
-                # get a result, raises empty exception immediately if none available
-                results.append(self.resultQueue.get(False))
-                self.resultQueue.task_done()
-        except:
-            return results
-        return results
+        After each call, the size is set to the number of blocks which would
+        match both targets, but it changes at most by a factor of two.
+    """
+    def __init__(self, size=50, min_size=1, max_size=1000, target_latency=2., target_bytes=8 * 1024 ** 2):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.target_latency = target_latency
+        self.target_bytes = target_bytes
+        self.size = max(min_size, min(max_size, size))
+
+    def update(self, count, latency, response_bytes=0):
+        """ Adapts the size after count blocks were received
+
+            :param int count: number of received blocks
+            :param float latency: duration of the call in seconds
+            :param int response_bytes: size of the reply in bytes (0 when unknown)
+        """
+        if count <= 0:
+            return self.size
+        wanted = self.max_size
+        if latency > 0:
+            wanted = min(wanted, self.target_latency / (latency / count))
+        if response_bytes > 0:
+            wanted = min(wanted, self.target_bytes / (response_bytes / count))
+        wanted = int(max(self.size // 2, min(self.size * 2, wanted)))
+        self.size = max(self.min_size, min(self.max_size, wanted))
+        return self.size
+
+
+class StreamOperation(dict):
+    """ Operation dict yielded by :func:`Blockchain.stream`
+
+        The ``_id`` hash of the operation is computed on first access of
+        ``_id`` or when the whole dict is read (iteration, items, comparison,
+        copy, ...).
+
+        :param event: operation from which ``_id`` is computed
+    """
+    __slots__ = ["_event"]
+
+    def __init__(self, event, **kwargs):
+        super(StreamOperation, self).__init__(**kwargs)
+        self._event = event
+
+    def _set_id(self):
+        if self._event is not None:
+            dict.__setitem__(self, "_id", Blockchain.hash_op(self._event))
+            self._event = None
+
+    def __missing__(self, key):
+        if key == "_id" and self._event is not None:
+            self._set_id()
+            return dict.__getitem__(self, key)
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        if key == "_id" and self._event is not None:
+            return True
+        return dict.__contains__(self, key)
+
+    def __setitem__(self, key, value):
+        if key == "_id":
+            self._event = None
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key):
+        self._set_id()
+        dict.__delitem__(self, key)
+
+    def get(self, key, default=None):
+        if key == "_id":
+            self._set_id()
+        return dict.get(self, key, default)
+
+    def __iter__(self):
+        self._set_id()
+        return dict.__iter__(self)
+
+    def __len__(self):
+        self._set_id()
+        return dict.__len__(self)
+
+    def __eq__(self, other):
+        self._set_id()
+        if isinstance(other, StreamOperation):
+            other._set_id()
+        return dict.__eq__(self, other)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __repr__(self):
+        self._set_id()
+        return dict.__repr__(self)
+
+    __hash__ = None
+
+    def keys(self):
+        self._set_id()
+        return dict.keys(self)
+
+    def values(self):
+        self._set_id()
+        return dict.values(self)
+
+    def items(self):
+        self._set_id()
+        return dict.items(self)
+
+    def pop(self, key, *args):
+        self._set_id()
+        return dict.pop(self, key, *args)
+
+    def popitem(self):
+        self._set_id()
+        return dict.popitem(self)
+
+    def setdefault(self, key, default=None):
+        self._set_id()
+        return dict.setdefault(self, key, default)
+
+    def copy(self):
+        self._set_id()
+        return dict.copy(self)
+
+    def __reduce__(self):
+        self._set_id()
+        return (dict, (dict(self.items()), ))
 
 
 @python_2_unicode_compatible
@@ -182,6 +195,18 @@ class Blockchain(object):
             actual head block (``head``)
         :param int max_block_wait_repetition: maximum wait repetition for next block
             where each repetition is block_interval long (default is 3)
+        :param BlockRangeSize block_range_size: sets the number of blocks of
+            ``block_api.get_block_range`` calls (default is a new
+            :class:`BlockRangeSize`)
+        :param HeadPoller head_poller: schedules the requests for new blocks, when
+            the current block is reached (default is a new
+            :class:`bhive.headfollower.HeadPoller`). When set to False, block_interval
+            seconds are waited between the requests.
+        :param BlockTimeIndex block_time_index: stores block times, which are used by
+            :func:`block_time` and :func:`get_estimated_block_num` (default is a new
+            in-memory :class:`bhive.blocktimeindex.BlockTimeIndex`). Only the times of
+            irreversible blocks are added. When set to False, no block times are kept
+            between the calls.
 
         This class let's you deal with blockchain related data and methods.
         Read blockchain related data:
@@ -222,14 +247,29 @@ class Blockchain(object):
                 ops.append(operation)
 
     """
+    max_block_retries = 5
+    # number of blocks and maximum number of operations of one enum_virtual_ops call
+    enum_virtual_ops_range = 1000
+    enum_virtual_ops_limit = 1000
+    # number of delivered blocks which are checked for forks
+    fork_window = 100
+
     def __init__(
         self,
         hive_instance=None,
         mode="irreversible",
         max_block_wait_repetition=None,
         data_refresh_time_seconds=900,
+        block_range_size=None,
+        head_poller=None,
+        block_time_index=None,
     ):
         self.hive = hive_instance or shared_hive_instance()
+        self.block_range_size = block_range_size or BlockRangeSize()
+        # node url: False, when get_block_range is not supported
+        self._block_range_support = {}
+        # node url: False, when enum_virtual_ops is not supported
+        self._enum_virtual_ops_support = {}
 
         if mode == "irreversible":
             self.mode = 'last_irreversible_block_num'
@@ -242,6 +282,14 @@ class Blockchain(object):
         else:
             self.max_block_wait_repetition = 3
         self.block_interval = self.hive.get_block_interval()
+        self.head_poller = HeadPoller(self.block_interval) if head_poller is None else head_poller
+        # difference between the head block and the block number of mode
+        self._head_offset = 0
+        if block_time_index is None:
+            block_time_index = BlockTimeIndex(block_interval=self.block_interval)
+        self.block_time_index = None if block_time_index is False else block_time_index
+        # only blocks up to this block are added to block_time_index
+        self._last_irreversible_block_num = None
 
     def is_irreversible_mode(self):
         return self.mode == 'last_irreversible_block_num'
@@ -280,12 +328,34 @@ class Blockchain(object):
             .. note:: The block number returned depends on the ``mode`` used
                       when instantiating from this class.
         """
+        return int(self._get_current_props().get(self.mode))
+
+    def _get_current_props(self):
         props = self.hive.get_dynamic_global_properties(False)
         if props is None:
             raise ValueError("Could not receive dynamic_global_properties!")
         if self.mode not in props:
             raise ValueError(self.mode + " is not in " + str(props))
-        return int(props.get(self.mode))
+        return props
+
+    def _poll_current_block_num(self, block_num):
+        """Returns the current block number and tells head_poller, whether block_num is available"""
+        props = self._get_current_props()
+        current_block_num = int(props.get(self.mode))
+        if self.head_poller:
+            # the poller gets the head block number together with its time, in
+            # irreversible mode, block_num is available once the head is head_offset ahead
+            head_block_num = int(props.get("head_block_number", current_block_num))
+            self._head_offset = head_block_num - current_block_num
+            self.head_poller.update(head_block_num, props.get("time"), available=current_block_num >= block_num)
+        return current_block_num
+
+    def _wait_for_block(self, block_num):
+        """Waits until block_num is expected to be available, returns the waited seconds"""
+        if not self.head_poller:
+            time.sleep(self.block_interval)
+            return self.block_interval
+        return self.head_poller.wait(block_num + self._head_offset)
 
     def get_current_block(self, only_ops=False, only_virtual_ops=False):
         """ This call returns the current block
@@ -307,6 +377,16 @@ class Blockchain(object):
         """ This call estimates the block number based on a given date
 
             :param datetime date: block time for which a block number is estimated
+            :param bool estimateForwards: The estimation starts from the first block,
+                when no earlier block time is known (default: False)
+            :param bool accurate: Block headers are fetched until the last block at or
+                before date is found, when True (default). Otherwise, the block number
+                is interpolated between the known block times.
+
+            Known block times are taken from ``block_time_index``, only the
+            block headers which are needed to refine the result are received.
+            Dates after the last known block time need one
+            ``get_dynamic_global_properties`` call.
 
             .. note:: The block number returned depends on the ``mode`` used
                       when instantiating from this class.
@@ -321,57 +401,111 @@ class Blockchain(object):
                 True
 
         """
-        last_block = self.get_current_block()
-        date = addTzInfo(date)
-        if estimateForwards:
-            block_offset = 10
-            first_block = BlockHeader(block_offset, hive_instance=self.hive)
-            time_diff = date - first_block.time()
-            block_number = math.floor(time_diff.total_seconds() / self.block_interval + block_offset)
+        index = self.block_time_index
+        if index is None:
+            index = BlockTimeIndex(block_interval=self.block_interval)
+        seconds = to_seconds(addTzInfo(date))
+        last_block_num = None
+        # the head block may still be replaced by a fork, it is not stored in the index
+        head = None
+        left, right = index.bracket(seconds)
+        if right is None:
+            props = self._get_current_props()
+            last_block_num = int(props.get(self.mode))
+            self._last_irreversible_block_num = int(props["last_irreversible_block_num"])
+            head = (int(props["head_block_number"]), to_seconds(props["time"]))
+            left, right = index.bracket(seconds, last_anchor=head)
+        if left is None and accurate and not estimateForwards:
+            # the estimate from the first later block is usually exact
+            self._get_block_header_time(max(1, right[0] - int(math.ceil((right[1] - seconds) / self.block_interval))), index)
+            left, right = index.bracket(seconds, last_anchor=head)
+        if left is None and (accurate or estimateForwards):
+            self._get_block_header_time(1, index)
+            left, right = index.bracket(seconds, last_anchor=head)
+
+        if not accurate or left is None or right is None:
+            block_number = index.estimate_block_num(seconds, last_anchor=head)
         else:
-            time_diff = last_block.time() - date
-            block_number = math.floor(last_block.identifier - time_diff.total_seconds() / self.block_interval)
+            block_number = index.get_block_num(seconds)
+            if block_number is None:
+                block_number = self._find_block_num(seconds, left, right, index)
         if block_number < 1:
             block_number = 1
+        if last_block_num is not None and block_number > last_block_num:
+            block_number = last_block_num
+        return int(block_number)
 
-        if accurate:
-            if block_number > last_block.identifier:
-                block_number = last_block.identifier
-            block_time_diff = timedelta(seconds=10)
-            
-            last_block_time_diff_seconds = 10
-            second_last_block_time_diff_seconds = 10
-            
-            while block_time_diff.total_seconds() > self.block_interval or block_time_diff.total_seconds() < -self.block_interval:
-                block = BlockHeader(block_number, hive_instance=self.hive)
-                second_last_block_time_diff_seconds = last_block_time_diff_seconds
-                last_block_time_diff_seconds = block_time_diff.total_seconds()
-                block_time_diff = date - block.time()
-                if second_last_block_time_diff_seconds == block_time_diff.total_seconds() and second_last_block_time_diff_seconds < 10:
-                    return int(block_number)
-                delta = block_time_diff.total_seconds() // self.block_interval
-                if delta == 0 and block_time_diff.total_seconds() < 0:
-                    delta = -1
-                elif delta == 0 and block_time_diff.total_seconds() > 0:
-                    delta = 1
-                block_number += delta
-                if block_number < 1:
-                    break
-                if block_number > last_block.identifier:
-                    break
+    def _get_block_header_time(self, block_num, index=None):
+        """Receives the time of block_num and adds it to the index, returns it as seconds since epoch"""
+        seconds = to_seconds(BlockHeader(block_num, hive_instance=self.hive).time())
+        if index is None:
+            index = self.block_time_index
+        self._add_block_time(index, block_num, seconds)
+        return seconds
+
+    def _add_block_time(self, index, block_num, timestamp):
+        """ Adds the time of block_num to index, when the block is irreversible.
+            Reversible blocks may still be replaced by a fork with other block times.
+        """
+        if index is None:
+            return
+        if index is self.block_time_index and (self._last_irreversible_block_num is None or
+                                              block_num > self._last_irreversible_block_num):
+            props = self.hive.get_dynamic_global_properties(False)
+            if props is None:
+                return
+            self._last_irreversible_block_num = int(props["last_irreversible_block_num"])
+            if block_num > self._last_irreversible_block_num:
+                return
+        index.add(block_num, timestamp)
 
-        return int(block_number)
+    def _find_block_num(self, seconds, left, right, index):
+        """ Returns the last block at or before seconds
+
+            left and right are ``(block_num, seconds)`` of blocks before and after seconds.
+            Missed blocks make blocks later, so that the block is between the
+            estimates from left and from right. The estimates from the nearer
+            block are tried first, then the block is found by bisection.
+        """
+        block_interval = self.block_interval
+        guided_tries = 2
+        while right[0] - left[0] > 1:
+            if right[1] - left[1] == (right[0] - left[0]) * block_interval:
+                return left[0] + (seconds - left[1]) // block_interval
+            upper = min(right[0] - 1, left[0] + (seconds - left[1]) // block_interval)
+            lower = max(left[0], right[0] - int(math.ceil((right[1] - seconds) / block_interval)))
+            if lower >= upper:
+                return upper
+            if guided_tries > 0 and lower > left[0] and right[1] - seconds < seconds - left[1]:
+                block_num = lower
+            elif guided_tries > 0:
+                block_num = upper
+            else:
+                block_num = (lower + upper + 1) // 2
+            guided_tries -= 1
+            block_seconds = self._get_block_header_time(block_num, index)
+            if block_seconds <= seconds:
+                left = (block_num, block_seconds)
+            else:
+                right = (block_num, block_seconds)
+        return left[0]
 
     def block_time(self, block_num):
         """ Returns a datetime of the block with the given block
             number.
 
             :param int block_num: Block number
+
+            The block header is only received, when the time is not known
+            from ``block_time_index``.
         """
-        return Block(
-            block_num,
-            hive_instance=self.hive
-        ).time()
+        if self.block_time_index is not None:
+            block_time = self.block_time_index.get_time(block_num)
+            if block_time is not None:
+                return block_time
+        block_time = BlockHeader(block_num, hive_instance=self.hive).time()
+        self._add_block_time(self.block_time_index, block_num, block_time)
+        return block_time
 
     def block_timestamp(self, block_num):
         """ Returns the timestamp of the block with the given block
@@ -379,129 +513,182 @@ class Blockchain(object):
 
             :param int block_num: Block number
         """
-        block_time = Block(
-            block_num,
-            hive_instance=self.hive
-        ).time()
+        block_time = self.block_time(block_num)
         return int(time.mktime(block_time.timetuple()))
 
-    def blocks(self, start=None, stop=None, max_batch_size=None, threading=False, thread_num=8, only_ops=False, only_virtual_ops=False):
+    def blocks(self, start=None, stop=None, max_batch_size=None, threading=False, thread_num=8, only_ops=False, only_virtual_ops=False,
+               use_block_range=True, block_archive=None, raw_records=False, processes=None, shard_size=1000, ordered=True,
+               fork_detection=False):
         """ Yields blocks starting from ``start``.
 
             :param int start: Starting block
             :param int stop: Stop at this block
             :param int max_batch_size: only for appbase nodes. When not None, batch calls of are used.
-                Cannot be combined with threading
-            :param bool threading: Enables threading. Cannot be combined with batch calls
+                When the rpc was created with ``batch_fanout=True``, each batch is split into
+                sub-batches which are fetched in parallel from several nodes.
+                When combined with threading, each thread requests batches of max_batch_size blocks.
+            :param bool threading: Enables threading.
             :param int thread_num: Defines the number of threads, when `threading` is set.
+                Up to thread_num blocks (or batches of blocks, when max_batch_size is set)
+                are requested at the same time, a new request is started as soon as one
+                has finished. The blocks are yielded in order.
             :param bool only_ops: Only yield operations (default: False).
                 Cannot be combined with ``only_virtual_ops=True``.
             :param bool only_virtual_ops: Only yield virtual operations (default: False)
+            :param bool use_block_range: Receives the blocks until the current block with
+                ``block_api.get_block_range``, when the node supports it (default: True).
+                The number of blocks per call is adapted by ``block_range_size``.
+                With threading, it is only used together with max_batch_size, each call then
+                receives max_batch_size blocks. Nodes without the API are detected and
+                batched or single ``get_block`` calls are used instead. Not used with
+                only_ops and only_virtual_ops, as get_block_range returns no virtual operations.
+            :param BlockArchive block_archive: Blocks are read from this
+                :class:`bhive.blockarchive.BlockArchive`, missing blocks are received from the
+                node and are added to the archive (only in irreversible mode and when the
+                archive is not read only). The archive stores full blocks, it is not used
+                with ``only_virtual_ops=True`` and cannot be combined with ``only_ops=True``.
+            :param bool raw_records: Yields :class:`bhive.records.BlockRecord` objects instead
+                of :class:`bhive.block.Block` (default: False). The records are not cached
+                and their timestamps are only parsed on access.
+            :param int processes: When set, the blocks from start to stop (or to the
+                current block, when stop is not set) are split into shards of shard_size
+                blocks, which are received and parsed by this number of worker processes,
+                each with its own RPC connection. The following blocks are received as usual.
+                Cannot be combined with block_archive.
+            :param int shard_size: Number of blocks of each shard (default: 1000)
+            :param bool ordered: When False, the blocks of the worker processes are
+                yielded in the order in which they are received (default: True)
+            :param bool fork_detection: Only used in head mode. The ``previous`` id of each
+                block is compared with the id of the last ``fork_window`` delivered blocks.
+                When a fork has replaced delivered blocks, a
+                :class:`bhive.forkdetection.BlockRollback` is yielded for each of them (the
+                highest block first) and the blocks of the new chain are delivered again
+                (default: False). Cannot be combined with only_ops and only_virtual_ops.
 
             .. note:: If you want instant confirmation, you need to instantiate
                       class:`bhive.blockchain.Blockchain` with
                       ``mode="head"``, otherwise, the call will wait until
                       confirmed in an irreversible block.
 
+            In irreversible mode, the time of each delivered block is added to
+            ``block_time_index``.
         """
+        blocks = self._blocks(start=start, stop=stop, max_batch_size=max_batch_size, threading=threading,
+                              thread_num=thread_num, only_ops=only_ops, only_virtual_ops=only_virtual_ops,
+                              use_block_range=use_block_range, block_archive=block_archive, raw_records=raw_records,
+                              processes=processes, shard_size=shard_size, ordered=ordered, fork_detection=fork_detection)
+        if self.block_time_index is None or not self.is_irreversible_mode() or only_virtual_ops:
+            # reversible blocks may be replaced by a fork with other block times
+            return blocks
+        return self._index_block_times(blocks)
+
+    def _index_block_times(self, blocks):
+        """Adds the time of each block to block_time_index and yields the block"""
+        index = self.block_time_index
+        for block in blocks:
+            timestamp = block.get("timestamp")
+            if timestamp is not None and block.block_num is not None:
+                index.add(block.block_num, timestamp)
+            yield block
+
+    def _blocks(self, start=None, stop=None, max_batch_size=None, threading=False, thread_num=8, only_ops=False,
+                only_virtual_ops=False, use_block_range=True, block_archive=None, raw_records=False, processes=None,
+                shard_size=1000, ordered=True, fork_detection=False):
+        """Yields the blocks of :func:`blocks`"""
+        if fork_detection and not self.is_irreversible_mode():
+            if only_ops or only_virtual_ops:
+                raise ValueError("fork_detection needs full blocks and cannot be combined with only_ops")
+            if not start:
+                start = self.get_current_block_num()
+            for block in self._fork_detecting_blocks(start, stop, raw_records=raw_records):
+                yield block
+            return
+        if processes:
+            if block_archive is not None:
+                raise ValueError("block_archive cannot be combined with processes")
+            kwargs = {"max_batch_size": max_batch_size, "threading": threading, "thread_num": thread_num,
+                      "only_ops": only_ops, "only_virtual_ops": only_virtual_ops,
+                      "use_block_range": use_block_range, "raw_records": raw_records}
+            if not start:
+                start = self.get_current_block_num()
+            # blocks after the current block are not sharded, they are received below
+            shard_stop = self.get_current_block_num()
+            if stop:
+                shard_stop = min(stop, shard_stop)
+            if start <= shard_stop:
+                for block in self._sharded_stream(start, shard_stop, processes, shard_size, ordered).run("blocks", start, shard_stop, kwargs):
+                    if not raw_records:
+                        block = self._new_block(block, only_ops=only_ops, only_virtual_ops=only_virtual_ops)
+                    yield block
+                if stop and shard_stop >= stop:
+                    return
+                start = shard_stop + 1
+            for block in self._blocks(start=start, stop=stop, **kwargs):
+                yield block
+            return
+        if block_archive is not None and not only_virtual_ops:
+            if only_ops:
+                raise ValueError("block_archive stores full blocks and cannot be combined with only_ops")
+            if not start:
+                start = self.get_current_block_num()
+            for block in self._archive_blocks(block_archive, start, stop, max_batch_size=max_batch_size,
+                                              threading=threading, thread_num=thread_num,
+                                              use_block_range=use_block_range, raw_records=raw_records):
+                yield block
+            return
         # Let's find out how often blocks are generated!
-        current_block = self.get_current_block()
-        current_block_num = current_block.block_num
+        cached_irreversible_block_num = self._get_cached_irreversible_block_num()
+        if start and stop and cached_irreversible_block_num is not None and stop <= cached_irreversible_block_num:
+            # all blocks are irreversible, they can be read from the rpc cache
+            current_block_num = cached_irreversible_block_num
+        else:
+            current_block_num = self.get_current_block_num()
         if not start:
             start = current_block_num
         head_block_reached = False
-        if threading and FUTURES_MODULE is not None:
-            pool = ThreadPoolExecutor(max_workers=thread_num)
+        if threading and FUTURES_MODULE is None:
+            log.warning("concurrent.futures is not available, blocks are received without threading")
+            threading = False
+        if threading and self.hive.rpc.is_thread_safe():
+            # all threads share one rpc client with a connection pool for thread_num connections
+            self.hive.rpc.resize_connection_pool(thread_num)
+            hive_instance = [self.hive]
         elif threading:
-            pool = Pool(thread_num, batch_mode=True)
-        if threading:
             hive_instance = [self.hive]
             nodelist = self.hive.rpc.nodes.export_working_nodes()
             for i in range(thread_num - 1):
                 hive_instance.append(hv.Hive(node=nodelist,
                                                 num_retries=self.hive.rpc.num_retries,
                                                 num_retries_call=self.hive.rpc.num_retries_call,
-                                                timeout=self.hive.rpc.timeout))
+                                                timeout=self.hive.rpc.timeout,
+                                                rpc_cache=self.hive.rpc.rpc_cache))
         # We are going to loop indefinitely
         latest_block = 0
         while True:
             if stop:
                 head_block = stop
             else:
-                current_block_num = self.get_current_block_num()
+                current_block_num = self._poll_current_block_num(start)
                 head_block = current_block_num
+            if use_block_range and not threading and not only_ops and not only_virtual_ops and not head_block_reached:
+                range_stop = head_block
+                if stop and stop > current_block_num:
+                    # blocks above the current (e.g. last irreversible) block are
+                    # received one by one below, when they are available
+                    current_block_num = self.get_current_block_num()
+                    range_stop = min(stop, current_block_num)
+                # continues with the next method, when the node does not support get_block_range
+                for block in self._block_range_blocks(start, range_stop, raw_records=raw_records):
+                    yield block
+                    start = block.block_num + 1
             if threading and not head_block_reached:
                 latest_block = start - 1
-                result_block_nums = []
-                for blocknum in range(start, head_block + 1, thread_num):
-                    # futures = []
-                    i = 0
-                    if FUTURES_MODULE is not None:
-                        futures = []
-                    block_num_list = []
-                    # freeze = self.hive.rpc.nodes.freeze_current_node
-                    num_retries = self.hive.rpc.nodes.num_retries
-                    # self.hive.rpc.nodes.freeze_current_node = True
-                    self.hive.rpc.nodes.num_retries = thread_num
-                    error_cnt = self.hive.rpc.nodes.node.error_cnt
-                    while i < thread_num and blocknum + i <= head_block:
-                        block_num_list.append(blocknum + i)
-                        results = []
-                        if FUTURES_MODULE is not None:
-                            futures.append(pool.submit(Block, blocknum + i, only_ops=only_ops, only_virtual_ops=only_virtual_ops, hive_instance=hive_instance[i]))
-                        else:
-                            pool.enqueue(Block, blocknum + i, only_ops=only_ops, only_virtual_ops=only_virtual_ops, hive_instance=hive_instance[i])
-                        i += 1
-                    if FUTURES_MODULE is not None:
-                        try:
-                            results = [r.result() for r in as_completed(futures)]
-                        except Exception as e:
-                            log.error(str(e))
-                    else:
-                        pool.run(True)
-                        pool.join()
-                        for result in pool.results():
-                            results.append(result)
-                        pool.abort()
-                    self.hive.rpc.nodes.num_retries = num_retries
-                    # self.hive.rpc.nodes.freeze_current_node = freeze
-                    new_error_cnt = self.hive.rpc.nodes.node.error_cnt
-                    self.hive.rpc.nodes.node.error_cnt = error_cnt
-                    if new_error_cnt > error_cnt:
-                        self.hive.rpc.nodes.node.error_cnt += 1
-                    #    self.hive.rpc.next()
-
-                    checked_results = []
-                    for b in results:
-                        if b.block_num is not None and int(b.block_num) not in result_block_nums:
-                            b["id"] = b.block_num
-                            b.identifier = b.block_num
-                            checked_results.append(b)
-                            result_block_nums.append(int(b.block_num))
-
-                    missing_block_num = list(set(block_num_list).difference(set(result_block_nums)))
-                    while len(missing_block_num) > 0:
-                        for blocknum in missing_block_num:
-                            try:
-                                block = Block(blocknum, only_ops=only_ops, only_virtual_ops=only_virtual_ops, hive_instance=self.hive)
-                                checked_results.append(block)
-                                result_block_nums.append(int(block.block_num))
-                            except Exception as e:
-                                log.error(str(e))
-                        missing_block_num = list(set(block_num_list).difference(set(result_block_nums)))
-                    from operator import itemgetter
-                    blocks = sorted(checked_results, key=itemgetter('id'))
-                    for b in blocks:
-                        if latest_block < int(b.block_num):
-                            latest_block = int(b.block_num)
-                        yield b
-
-                if latest_block <= head_block:
-                    for blocknum in range(latest_block + 1, head_block + 1):
-                        if blocknum not in result_block_nums:
-                            block = Block(blocknum, only_ops=only_ops, only_virtual_ops=only_virtual_ops, hive_instance=self.hive)
-                            result_block_nums.append(blocknum)
-                            yield block
+                for block in self._prefetch_blocks(start, head_block, thread_num, hive_instance,
+                                                   only_ops=only_ops, only_virtual_ops=only_virtual_ops,
+                                                   batch_size=max_batch_size or 1, use_block_range=use_block_range,
+                                                   raw_records=raw_records):
+                    latest_block = block.block_num
+                    yield block
             elif max_batch_size is not None and (head_block - start) >= max_batch_size and not head_block_reached:
                 if not self.hive.is_connected():
                     raise OfflineHasNoRPCException("No RPC available in offline mode!")
@@ -552,16 +739,21 @@ class Blockchain(object):
                                     block = block["ops"]
                                 else:
                                     block = block["block"]
-                            block = Block(block, only_ops=only_ops, only_virtual_ops=only_virtual_ops, hive_instance=self.hive)
-                            block["id"] = block.block_num
-                            block.identifier = block.block_num
+                            block = self._new_block(block, only_ops=only_ops, only_virtual_ops=only_virtual_ops,
+                                                    raw_records=raw_records)
                             yield block
                             blocknum = block.block_num
             else:
                 # Blocks from start until head block
                 for blocknum in range(start, head_block + 1):
                     # Get full block
-                    block = self.wait_for_and_get_block(blocknum, only_ops=only_ops, only_virtual_ops=only_virtual_ops, block_number_check_cnt=5, last_current_block_num=current_block_num)
+                    if cached_irreversible_block_num is not None and blocknum <= cached_irreversible_block_num and raw_records:
+                        block = self._get_block_record(blocknum, self.hive, only_ops=only_ops, only_virtual_ops=only_virtual_ops)
+                    elif cached_irreversible_block_num is not None and blocknum <= cached_irreversible_block_num:
+                        block = Block(blocknum, only_ops=only_ops, only_virtual_ops=only_virtual_ops, hive_instance=self.hive)
+                    else:
+                        block = self.wait_for_and_get_block(blocknum, only_ops=only_ops, only_virtual_ops=only_virtual_ops, block_number_check_cnt=5, last_current_block_num=current_block_num,
+                                                            raw_records=raw_records)
                     yield block
             # Set new start
             start = head_block + 1
@@ -570,10 +762,424 @@ class Blockchain(object):
             if stop and start > stop:
                 return
 
-            # Sleep for one block
-            time.sleep(self.block_interval)
+            # Wait for the next block
+            self._wait_for_block(start)
+
+    def _fork_detecting_blocks(self, start, stop, raw_records=False):
+        """ Yields the blocks from start to stop and :class:`bhive.forkdetection.BlockRollback`
+            events for delivered blocks, which were replaced by a fork
+        """
+        window = BlockWindow(self.fork_window)
+        blocknum = start
+        current_block_num = None
+        while stop is None or blocknum <= stop:
+            if current_block_num is None or blocknum > current_block_num:
+                current_block_num = self.get_current_block_num()
+            record = self.wait_for_and_get_block(blocknum, last_current_block_num=current_block_num, raw_records=True)
+            if not window.links(blocknum, record["previous"]):
+                fork_num = self._find_fork(window, blocknum)
+                log.info("Fork detected, blocks %d to %d were replaced" % (fork_num + 1, blocknum - 1))
+                for rollback in window.rollback(fork_num):
+                    yield rollback
+                blocknum = fork_num + 1
+                continue
+            window.add(blocknum, record.block_id, previous=record["previous"], timestamp=record["timestamp"])
+            if raw_records:
+                yield record
+            else:
+                yield record.to_block(hive_instance=self.hive)
+            blocknum += 1
+
+    def _find_fork(self, window, blocknum):
+        """Returns the highest block number below blocknum, whose delivered block is still part of the chain"""
+        fork_num = blocknum - 1
+        while fork_num in window:
+            record = self._get_block_record(fork_num, self.hive)
+            if record.block_id == window.get_block_id(fork_num):
+                return fork_num
+            fork_num -= 1
+        log.warning("The fork is deeper than the %d checked blocks" % len(window))
+        return fork_num
+
+    def _sharded_stream(self, start, stop, processes, shard_size, ordered):
+        """Returns the :class:`bhive.shardedstream.ShardedStream` for :func:`blocks` and :func:`stream`"""
+        if not self.hive.is_connected():
+            raise OfflineHasNoRPCException("No RPC available in offline mode!")
+        mode = "irreversible" if self.is_irreversible_mode() else "head"
+        return ShardedStream(get_hive_config(self.hive), mode=mode, processes=processes, shard_size=shard_size,
+                             ordered=ordered)
+
+    def _prefetch_blocks(self, start, stop, window, hive_instance, only_ops=False, only_virtual_ops=False, batch_size=1,
+                         use_block_range=False, raw_records=False):
+        """ Yields the blocks from start to stop in order and receives them in threads.
+
+            :param int window: Number of requests which are sent at the same time
+            :param list hive_instance: Hive instances used by the threads (in turns)
+            :param int batch_size: Number of blocks which are received by one
+                batch call, single calls are used when set to 1 (default)
+            :param bool use_block_range: Uses ``get_block_range`` instead of
+                batch calls, when supported by the node
+
+            A new request is sent as soon as any request has finished. A
+            finished request waits until all blocks before it were yielded,
+            not more than ``4 * window * batch_size`` blocks are kept in memory.
+            Failed requests are sent again up to ``max_block_retries`` times.
+        """
+        batch_size = max(1, batch_size)
+        max_ahead = 4 * window * batch_size
+        pool = ThreadPoolExecutor(max_workers=window)
+        pending = {}
+        received = {}
+        retries = {}
+        next_submit = start
+        next_yield = start
+        try:
+            while next_yield <= stop:
+                while next_submit <= stop and len(pending) < window and next_submit - next_yield < max_ahead:
+                    count = min(batch_size, stop - next_submit + 1)
+                    future = pool.submit(self._get_blocks, next_submit, count,
+                                         hive_instance[(next_submit // batch_size) % len(hive_instance)],
+                                         only_ops=only_ops, only_virtual_ops=only_virtual_ops,
+                                         batched=batch_size > 1, use_block_range=use_block_range,
+                                         raw_records=raw_records)
+                    pending[future] = (next_submit, count)
+                    next_submit += count
+                done, not_done = wait(list(pending), return_when=FIRST_COMPLETED)
+                for future in done:
+                    blocknum, count = pending.pop(future)
+                    try:
+                        blocks = future.result()
+                    except Exception as e:
+                        retries[blocknum] = retries.get(blocknum, 0) + 1
+                        log.error(str(e))
+                        if retries[blocknum] > self.max_block_retries:
+                            raise
+                        future = pool.submit(self._get_blocks, blocknum, count,
+                                             hive_instance[(blocknum // batch_size) % len(hive_instance)],
+                                             only_ops=only_ops, only_virtual_ops=only_virtual_ops,
+                                             batched=batch_size > 1, use_block_range=use_block_range,
+                                             raw_records=raw_records)
+                        pending[future] = (blocknum, count)
+                        continue
+                    received[blocknum] = blocks
+                while next_yield in received:
+                    blocks = received.pop(next_yield)
+                    for block in blocks:
+                        yield block
+                    next_yield += len(blocks)
+        finally:
+            for future in pending:
+                future.cancel()
+            pool.shutdown(wait=False)
+
+    def _get_blocks(self, start, count, hive_instance, only_ops=False, only_virtual_ops=False, batched=False,
+                    use_block_range=False, raw_records=False):
+        """ Returns the list of the count blocks starting with start
+
+            :param Hive hive_instance: Hive instance used for the calls
+            :param bool batched: Receives all blocks with one batch call
+            :param bool use_block_range: Receives all blocks with one
+                ``get_block_range`` call, when supported
+            :param bool raw_records: Returns :class:`bhive.records.BlockRecord` objects
+
+            Raises BlockDoesNotExistsException when a block is missing.
+        """
+        blocks = None
+        if use_block_range and batched and not only_ops and not only_virtual_ops:
+            # get_block_range has no virtual ops, only_ops uses get_ops_in_block
+            blocks = self._get_block_range(start, count, hive_instance, raw_records=raw_records)
+        if blocks is None and not batched and raw_records:
+            blocks = [self._get_block_record(blocknum, hive_instance, only_ops=only_ops, only_virtual_ops=only_virtual_ops)
+                      for blocknum in range(start, start + count)]
+        elif blocks is None and not batched:
+            blocks = [Block(blocknum, only_ops=only_ops, only_virtual_ops=only_virtual_ops, hive_instance=hive_instance)
+                      for blocknum in range(start, start + count)]
+        elif blocks is None:
+            blocks = self._get_block_batch(start, count, hive_instance, only_ops=only_ops,
+                                           only_virtual_ops=only_virtual_ops, raw_records=raw_records)
+        for blocknum, block in enumerate(blocks, start):
+            if block.block_num is None or int(block.block_num) != blocknum:
+                raise BlockDoesNotExistsException(str(blocknum))
+            if raw_records:
+                continue
+            block["id"] = block.block_num
+            block.identifier = block.block_num
+        if len(blocks) != count:
+            raise BlockDoesNotExistsException(str(start + len(blocks)))
+        return blocks
+
+    def _get_block_batch(self, start, count, hive_instance, only_ops=False, only_virtual_ops=False, raw_records=False):
+        """Receives the count blocks starting with start by one batch call"""
+        rpc = hive_instance.rpc
+        if not hive_instance.is_connected():
+            raise OfflineHasNoRPCException("No RPC available in offline mode!")
+        rpc.set_next_node_on_empty_reply(False)
+        use_appbase = rpc.get_use_appbase()
+        for blocknum in range(start, start + count):
+            add_to_queue = blocknum < start + count - 1
+            if (only_ops or only_virtual_ops) and use_appbase:
+                block_batch = rpc.get_ops_in_block({"block_num": blocknum, 'only_virtual': only_virtual_ops},
+                                                   api="account_history", add_to_queue=add_to_queue)
+            elif only_ops or only_virtual_ops:
+                block_batch = rpc.get_ops_in_block(blocknum, only_virtual_ops, add_to_queue=add_to_queue)
+            elif use_appbase:
+                block_batch = rpc.get_block({"block_num": blocknum}, api="block", add_to_queue=add_to_queue)
+            else:
+                block_batch = rpc.get_block(blocknum, add_to_queue=add_to_queue)
+        if not bool(block_batch):
+            raise BatchedCallsNotSupported()
+        if not isinstance(block_batch, list) or count == 1:
+            block_batch = [block_batch]
+        blocks = []
+        for blocknum, block in enumerate(block_batch, start):
+            if only_ops or only_virtual_ops:
+                ops = block["ops"] if isinstance(block, dict) else block
+                if not bool(ops):
+                    ops = []
+                block = {'block': blocknum,
+                         'timestamp': ops[0]["timestamp"] if len(ops) > 0 else "1970-01-01T00:00:00",
+                         'operations': ops}
+            elif use_appbase:
+                block = block.get("block") if isinstance(block, dict) else None
+            if not bool(block):
+                break
+            if raw_records:
+                blocks.append(BlockRecord(block, block_num=blocknum if only_ops or only_virtual_ops else None, only_ops=only_ops,
+                                          only_virtual_ops=only_virtual_ops))
+            else:
+                blocks.append(Block(block, only_ops=only_ops, only_virtual_ops=only_virtual_ops, hive_instance=self.hive))
+        return blocks
+
+    def _new_block(self, block, only_ops=False, only_virtual_ops=False, raw_records=False):
+        """Returns the received block dict as :class:`bhive.block.Block` or :class:`bhive.records.BlockRecord`"""
+        if raw_records:
+            return BlockRecord(block, only_ops=only_ops, only_virtual_ops=only_virtual_ops)
+        block = Block(block, only_ops=only_ops, only_virtual_ops=only_virtual_ops, hive_instance=self.hive)
+        block["id"] = block.block_num
+        block.identifier = block.block_num
+        return block
+
+    def _get_block_record(self, block_num, hive_instance, only_ops=False, only_virtual_ops=False):
+        """ Receives a block as :class:`bhive.records.BlockRecord`, in the same way as
+            :func:`bhive.block.Block.refresh`, but without caching it.
+
+            Raises BlockDoesNotExistsException, when the block is not available.
+        """
+        rpc = hive_instance.rpc
+        if not hive_instance.is_connected():
+            raise OfflineHasNoRPCException("No RPC available in offline mode!")
+        rpc.set_next_node_on_empty_reply(False)
+        if only_ops or only_virtual_ops:
+            if rpc.get_use_appbase():
+                try:
+                    ops = rpc.get_ops_in_block({"block_num": block_num, 'only_virtual': only_virtual_ops}, api="account_history")["ops"]
+                except ApiNotSupported:
+                    ops = rpc.get_ops_in_block(block_num, only_virtual_ops, api="condenser")
+            else:
+                ops = rpc.get_ops_in_block(block_num, only_virtual_ops)
+            if bool(ops):
+                block = {'block': ops[0]["block"],
+                         'timestamp': ops[0]["timestamp"],
+                         'operations': ops}
+            else:
+                block = {'block': block_num,
+                         'timestamp': "1970-01-01T00:00:00",
+                         'operations': []}
+        elif rpc.get_use_appbase():
+            try:
+                block = rpc.get_block({"block_num": block_num}, api="block")
+                if block and "block" in block:
+                    block = block["block"]
+            except ApiNotSupported:
+                block = rpc.get_block(block_num, api="condenser")
+        else:
+            block = rpc.get_block(block_num)
+        if not block:
+            raise BlockDoesNotExistsException("output: %s of identifier %s" % (str(block), str(block_num)))
+        return BlockRecord(block, only_ops=only_ops, only_virtual_ops=only_virtual_ops)
+
+    def _supports_block_range(self, hive_instance):
+        """Returns False, when the connected node is known to have no get_block_range"""
+        rpc = hive_instance.rpc
+        if not hive_instance.is_connected() or not rpc.get_use_appbase():
+            return False
+        return self._block_range_support.get(rpc.url, True)
+
+    def _get_block_range(self, start, count, hive_instance, raw_records=False):
+        """ Receives count full blocks starting with start by one ``block_api.get_block_range`` call
+
+            Returns None, when the node does not support the call. Fewer
+            blocks are returned, when they are not available yet.
+        """
+        if not self._supports_block_range(hive_instance):
+            return None
+        rpc = hive_instance.rpc
+        url = rpc.url
+        rpc.set_next_node_on_empty_reply(False)
+        try:
+            ret = rpc.get_block_range({"starting_block_num": start, "count": count}, api="block")
+        except (NoMethodWithName, NoApiWithName, ApiNotSupported):
+            log.info("%s does not support get_block_range" % url)
+            self._block_range_support[url] = False
+            return None
+        blocks = ret.get("blocks") if isinstance(ret, dict) else None
+        if blocks is None or (len(blocks) > 0 and "block_id" not in blocks[0]):
+            # blocks without block_id would not be identical to get_block results
+            self._block_range_support[url] = False
+            return None
+        if raw_records:
+            return [BlockRecord(block) for block in blocks]
+        return [Block(block, hive_instance=self.hive) for block in blocks]
+
+    def _block_range_blocks(self, start, stop, raw_records=False):
+        """ Yields the blocks from start to stop received by ``get_block_range`` calls
+
+            The number of blocks per call is adapted by ``block_range_size``.
+            Stops early, when get_block_range is not supported or a block is
+            not available.
+        """
+        blocknum = start
+        while blocknum <= stop:
+            count = min(self.block_range_size.size, stop - blocknum + 1)
+            start_time = time.time()
+            blocks = self._get_block_range(blocknum, count, self.hive, raw_records=raw_records)
+            if not blocks:
+                return
+            if len(blocks) == count:
+                self.block_range_size.update(count, time.time() - start_time, self.hive.rpc.last_response_size)
+            for block in blocks:
+                if block.block_num != blocknum:
+                    return
+                if not raw_records:
+                    block["id"] = block.block_num
+                    block.identifier = block.block_num
+                yield block
+                blocknum += 1
+
+    def _supports_enum_virtual_ops(self):
+        """Returns False, when the connected node is known to have no enum_virtual_ops"""
+        if not self.hive.is_connected() or not self.hive.rpc.get_use_appbase():
+            return False
+        return self._enum_virtual_ops_support.get(self.hive.rpc.url, True)
+
+    def _enum_virtual_ops_blocks(self, start, stop, virtual_op_filter=None, raw_records=False):
+        """ Yields blocks with the virtual operations from start to stop, which are
+            received by ``account_history_api.enum_virtual_ops`` calls
+
+            :param int virtual_op_filter: bit flags of the wanted virtual operations
+                (see :func:`bhivebase.operationids.getVirtualOperationFilter`)
+
+            The blocks have the same layout as ``Block(only_virtual_ops=True)``.
+            Blocks without (wanted) virtual operations are skipped. Nothing
+            is yielded, when the node does not support the call.
+        """
+        url = self.hive.rpc.url
+        self.hive.rpc.set_next_node_on_empty_reply(False)
+        range_begin = start
+        while range_begin <= stop:
+            range_end = min(stop + 1, range_begin + self.enum_virtual_ops_range)
+            block_begin = range_begin
+            operation_begin = 0
+            ops_by_block = {}
+            while True:
+                params = {"block_range_begin": block_begin, "block_range_end": range_end,
+                          "include_reversible": not self.is_irreversible_mode(),
+                          "operation_begin": operation_begin, "limit": self.enum_virtual_ops_limit}
+                if virtual_op_filter:
+                    params["filter"] = virtual_op_filter
+                try:
+                    ret = self.hive.rpc.enum_virtual_ops(params, api="account_history")
+                except (NoMethodWithName, NoApiWithName, ApiNotSupported):
+                    if range_begin > start:
+                        raise
+                    log.info("%s does not support enum_virtual_ops" % url)
+                    self._enum_virtual_ops_support[url] = False
+                    return
+                for op in ret["ops"]:
+                    ops_by_block.setdefault(op["block"], []).append(op)
+                next_operation_begin = ret.get("next_operation_begin", 0)
+                if not next_operation_begin or ret.get("next_block_range_begin", range_end) >= range_end:
+                    break
+                block_begin = max(block_begin, ret["next_block_range_begin"])
+                operation_begin = next_operation_begin
+            for blocknum in sorted(ops_by_block):
+                ops = ops_by_block[blocknum]
+                block = self._new_block({'block': blocknum, 'timestamp': ops[0]["timestamp"], 'operations': ops},
+                                        only_virtual_ops=True, raw_records=raw_records)
+                yield block
+            range_begin = range_end
+
+    def _virtual_ops_blocks(self, opNames=[], virtual_op_filter=None, **kwargs):
+        """ Yields the blocks for :func:`stream` with ``only_virtual_ops=True``
+
+            Blocks until the current block are received with
+            ``enum_virtual_ops``, the following blocks with :func:`blocks`.
+        """
+        start = kwargs.get("start")
+        stop = kwargs.get("stop")
+        if isinstance(virtual_op_filter, (list, set, tuple)):
+            virtual_op_filter = getVirtualOperationFilter(virtual_op_filter)
+        elif virtual_op_filter is None and bool(opNames):
+            try:
+                virtual_op_filter = getVirtualOperationFilter(opNames)
+            except ValueError:
+                virtual_op_filter = None
+        current_block_num = self.get_current_block_num()
+        if not start:
+            start = current_block_num
+        end = current_block_num if not stop else min(stop, current_block_num)
+        if start <= end and self._supports_enum_virtual_ops():
+            for block in self._enum_virtual_ops_blocks(start, end, virtual_op_filter=virtual_op_filter,
+                                                       raw_records=kwargs.get("raw_records", False)):
+                yield block
+            if self._supports_enum_virtual_ops():
+                start = end + 1
+        if stop and start > stop:
+            return
+        kwargs["start"] = start
+        for block in self.blocks(**kwargs):
+            yield block
+
+    def _archive_blocks(self, block_archive, start, stop, raw_records=False, **kwargs):
+        """ Yields the blocks from start to stop, which are read from block_archive.
+            Missing blocks are received by :func:`blocks` and stored in the archive.
+        """
+        store = not block_archive.read_only and self.is_irreversible_mode()
+        blocknum = start
+        while stop is None or blocknum <= stop:
+            if raw_records:
+                block = block_archive.get(blocknum)
+                if block is not None:
+                    block = BlockRecord(block, block_num=blocknum)
+            else:
+                block = block_archive.get_block(blocknum, hive_instance=self.hive)
+            if block is not None:
+                yield block
+                blocknum += 1
+                continue
+            gap_stop = block_archive.next_block_num(blocknum)
+            if gap_stop is not None:
+                gap_stop -= 1
+            if stop is not None and (gap_stop is None or gap_stop > stop):
+                gap_stop = stop
+            for block in self._blocks(start=blocknum, stop=gap_stop, raw_records=raw_records, **kwargs):
+                if store:
+                    block_archive.append(block)
+                yield block
+                blocknum = block.block_num + 1
+            if gap_stop is None:
+                return
+            blocknum = gap_stop + 1
 
-    def wait_for_and_get_block(self, block_number, blocks_waiting_for=None, only_ops=False, only_virtual_ops=False, block_number_check_cnt=-1, last_current_block_num=None):
+    def _get_cached_irreversible_block_num(self):
+        """Returns the last irreversible block number known to the rpc cache or None"""
+        rpc_cache = getattr(self.hive.rpc, "rpc_cache", None)
+        if rpc_cache is None:
+            return None
+        return rpc_cache.last_irreversible_block_num
+
+    def wait_for_and_get_block(self, block_number, blocks_waiting_for=None, only_ops=False, only_virtual_ops=False, block_number_check_cnt=-1, last_current_block_num=None,
+                               raw_records=False):
         """ Get the desired block from the chain, if the current head block is smaller (for both head and irreversible)
             then we wait, but a maxmimum of blocks_waiting_for * max_block_wait_repetition time before failure.
 
@@ -584,40 +1190,42 @@ class Blockchain(object):
             :param bool only_virtual_ops: Includes only virtual operations (default: False)
             :param int block_number_check_cnt: limit the number of retries when greater than -1
             :param int last_current_block_num: can be used to reduce the number of get_current_block_num() api calls
+            :param bool raw_records: Returns a :class:`bhive.records.BlockRecord` instead of a
+                :class:`bhive.block.Block` (default: False)
 
         """
-        if last_current_block_num is None:
-            last_current_block_num = self.get_current_block_num()
-        elif last_current_block_num - block_number < 50:
-            last_current_block_num = self.get_current_block_num()
+        if last_current_block_num is None or last_current_block_num - block_number < 50:
+            last_current_block_num = self._poll_current_block_num(block_number)
 
         if not blocks_waiting_for:
             blocks_waiting_for = max(
                 1, block_number - last_current_block_num)
 
-            repetition = 0
+            waited = 0
             # can't return the block before the chain has reached it (support future block_num)
             while last_current_block_num < block_number:
-                repetition += 1
-                time.sleep(self.block_interval)
-                if last_current_block_num - block_number < 50:
-                    last_current_block_num = self.get_current_block_num()
-                if repetition > blocks_waiting_for * self.max_block_wait_repetition:
+                waited += self._wait_for_block(block_number)
+                last_current_block_num = self._poll_current_block_num(block_number)
+                if last_current_block_num < block_number and waited > blocks_waiting_for * self.max_block_wait_repetition * self.block_interval:
                     raise BlockWaitTimeExceeded("Already waited %d s" % (blocks_waiting_for * self.max_block_wait_repetition * self.block_interval))
         # block has to be returned properly
-        repetition = 0
+        waited = 0
         cnt = 0
         block = None
         while (block is None or block.block_num is None or int(block.block_num) != block_number) and (block_number_check_cnt < 0 or cnt < block_number_check_cnt):
             try:
-                block = Block(block_number, only_ops=only_ops, only_virtual_ops=only_virtual_ops, hive_instance=self.hive)
+                if raw_records:
+                    block = self._get_block_record(block_number, self.hive, only_ops=only_ops, only_virtual_ops=only_virtual_ops)
+                else:
+                    block = Block(block_number, only_ops=only_ops, only_virtual_ops=only_virtual_ops, hive_instance=self.hive)
                 cnt += 1
             except BlockDoesNotExistsException:
                 block = None
-                if repetition > blocks_waiting_for * self.max_block_wait_repetition:
+                if waited > blocks_waiting_for * self.max_block_wait_repetition * self.block_interval:
                     raise BlockWaitTimeExceeded("Already waited %d s" % (blocks_waiting_for * self.max_block_wait_repetition * self.block_interval))
-                repetition += 1
-                time.sleep(self.block_interval)
+                if self.head_poller:
+                    self.head_poller.miss()
+                waited += self._wait_for_block(block_number)
 
         return block
 
@@ -626,7 +1234,9 @@ class Blockchain(object):
         """
         raise DeprecationWarning('Blockchain.ops() is deprecated. Please use Blockchain.stream() instead.')
 
-    def ops_statistics(self, start, stop=None, add_to_ops_stat=None, with_virtual_ops=True, verbose=False):
+    def ops_statistics(self, start, stop=None, add_to_ops_stat=None, with_virtual_ops=True, verbose=False, interval=None,
+                       processes=None, shard_size=10000, threading=False, thread_num=8, max_batch_size=None,
+                       block_archive=None):
         """ Generates statistics for all operations (including virtual operations) starting from
             ``start``.
 
@@ -634,32 +1244,76 @@ class Blockchain(object):
             :param int stop: Stop at this block, if set to None, the current_block_num is taken
             :param dict add_to_ops_stat: if set, the result is added to add_to_ops_stat
             :param bool verbose: if True, the current block number and timestamp is printed
+            :param int interval: When set, an :class:`bhive.opsstatistics.OpsStatistics`
+                with the number of operations per type and per interval of this length
+                in seconds is returned instead of the dict. add_to_ops_stat can then be
+                an OpsStatistics, to which the result is added.
+            :param int processes: When set, the range is split into shards of shard_size
+                blocks, which are counted by this number of worker processes. Only the
+                counts of each shard are sent back to this process.
+            :param int shard_size: Number of blocks of each shard (default: 10000)
+            :param bool threading: Enables threading, see :func:`blocks`
+            :param int thread_num: Number of threads, see :func:`blocks`
+            :param int max_batch_size: batch size, see :func:`blocks`
+            :param BlockArchive block_archive: Blocks are read from this
+                :class:`bhive.blockarchive.BlockArchive` (see :func:`blocks`). With
+                processes, each worker opens the archive read only.
 
             This call returns a dict with all possible operations and their occurrence.
 
         """
-        if add_to_ops_stat is None:
-            import bhivebase.operationids
-            ops_stat = bhivebase.operationids.operations.copy()
-            for key in ops_stat:
-                ops_stat[key] = 0
-        else:
-            ops_stat = add_to_ops_stat.copy()
         current_block = self.get_current_block_num()
         if start > current_block:
             return
         if stop is None:
             stop = current_block
-        for block in self.blocks(start=start, stop=stop, only_ops=False, only_virtual_ops=False):
+        if processes:
+            if not self.hive.is_connected():
+                raise OfflineHasNoRPCException("No RPC available in offline mode!")
+            mode = "irreversible" if self.is_irreversible_mode() else "head"
+            kwargs = {"with_virtual_ops": with_virtual_ops, "interval": interval, "threading": threading,
+                      "thread_num": thread_num, "max_batch_size": max_batch_size,
+                      "block_archive_path": block_archive.path if block_archive is not None else None}
+            sharded_stream = ShardedStream(get_hive_config(self.hive), mode=mode, processes=processes,
+                                           shard_size=shard_size, ordered=False)
+            stats = OpsStatistics(interval=interval)
+            shard_stop = min(stop, current_block)
+            for shard_stats in sharded_stream.run("ops_statistics", start, shard_stop, kwargs):
+                stats.merge(shard_stats)
+                if verbose:
+                    print("%d blocks, %d ops" % (stats.blocks, sum(stats.counts.values())))
+            if stop > shard_stop:
+                # blocks after the current block are not sharded
+                stats.merge(self._count_ops(shard_stop + 1, stop, with_virtual_ops=with_virtual_ops, interval=interval,
+                                            verbose=verbose, threading=threading, thread_num=thread_num,
+                                            max_batch_size=max_batch_size, block_archive=block_archive))
+        else:
+            stats = self._count_ops(start, stop, with_virtual_ops=with_virtual_ops, interval=interval, verbose=verbose,
+                                    threading=threading, thread_num=thread_num, max_batch_size=max_batch_size,
+                                    block_archive=block_archive)
+        if interval is None:
+            return stats.json(add_to_ops_stat=add_to_ops_stat)
+        if add_to_ops_stat is not None:
+            return add_to_ops_stat.merge(stats)
+        return stats
+
+    def _count_ops(self, start, stop, with_virtual_ops=True, interval=None, verbose=False, block_archive=None, **kwargs):
+        """Returns the :class:`bhive.opsstatistics.OpsStatistics` of the blocks from start to stop"""
+        stats = OpsStatistics(interval=interval)
+        for block in self.blocks(start=start, stop=stop, raw_records=True, block_archive=block_archive, **kwargs):
             if verbose:
-                print(block["identifier"] + " " + block["timestamp"])
-            ops_stat = block.ops_statistics(add_to_ops_stat=ops_stat)
+                print("%d %s" % (block.block_num, block["timestamp"]))
+            stats.add_block(block)
         if with_virtual_ops:
-            for block in self.blocks(start=start, stop=stop, only_ops=True, only_virtual_ops=True):
+            # virtual operations are not counted as additional blocks
+            n_blocks = stats.blocks
+            for block in self.blocks(start=start, stop=stop, only_ops=True, only_virtual_ops=True, raw_records=True,
+                                     **kwargs):
                 if verbose:
-                    print(block["identifier"] + " " + block["timestamp"])
-                ops_stat = block.ops_statistics(add_to_ops_stat=ops_stat)
-        return ops_stat
+                    print("%d %s" % (block.block_num, block["timestamp"]))
+                stats.add_block(block)
+            stats.blocks = n_blocks
+        return stats
 
     def stream(self, opNames=[], raw_ops=False, *args, **kwargs):
         """ Yield specific operations (e.g. comments) only
@@ -675,11 +1329,48 @@ class Blockchain(object):
             :param bool only_ops: Only yield operations (default: False)
                 Cannot be combined with ``only_virtual_ops=True``
             :param bool only_virtual_ops: Only yield virtual operations (default: False)
+            :param bool enum_virtual_ops: When only_virtual_ops is set and threading is not used,
+                the virtual operations until the current block are received in block ranges with
+                ``account_history_api.enum_virtual_ops``, when the node supports it (default: True)
+            :param virtual_op_filter: List of virtual operation names (or the bit flags from
+                :func:`bhivebase.operationids.getVirtualOperationFilter`) which are filtered by
+                the node when ``enum_virtual_ops`` is used. When not set, it is taken from opNames,
+                if all of them are virtual operations.
+            :param accounts: Only operations which have one of these accounts in one of their
+                account fields (e.g. ``from``, ``to``, ``voter``, ``required_posting_auths``)
+                are yielded. Can be a list of account names or a
+                :class:`bhive.watchlist.AccountWatchlist`, which can be changed while the
+                stream is running.
+            :param custom_json_ids: When set, only ``custom_json`` operations with one of these
+                ids are yielded, other operations are not affected. Can be any container
+                (e.g. set or dict), which can be changed while the stream is running.
+            :param bool raw_records: Yields :class:`bhive.records.OperationRecord` objects
+                instead of dicts and uses :class:`bhive.records.BlockRecord` blocks
+                (default: False). Timestamps are only parsed and ``_id`` is only hashed on access.
+            :param StreamCursor cursor: The position of each processed operation is stored in
+                this :class:`bhive.streamcursor.StreamCursor`. When the cursor has a stored
+                position, the stream starts after it and ``start`` is ignored.
+            :param int processes: When set, the blocks from start to stop (or to the current
+                block) are split into shards, which are received and converted into operations
+                by this number of worker processes, each with its own RPC connection (see
+                :class:`bhive.shardedstream.ShardedStream`). accounts and custom_json_ids are
+                copied to the workers, later changes are not seen by them.
+            :param int shard_size: Number of blocks of each shard (default: 1000)
+            :param bool fork_detection: Only used in head mode. When delivered blocks are
+                replaced by a fork, a ``{"type": "rollback", "block_num": ..., "block_id": ...}``
+                dict is yielded for each of them (the highest block first, independent of
+                opNames) and the operations of the new blocks are delivered again
+                (default: False). A cursor is moved back to the start of the rolled back block.
+            :param bool ordered: When False, the operations of the worker processes are
+                yielded in the order in which they are received (default: True). Cannot
+                be combined with cursor.
 
             The dict output is formated such that ``type`` carries the
             operation type. Timestamp and block_num are taken from the
             block the operation was stored in and the other keys depend
-            on the actual operation.
+            on the actual operation. Operations are filtered by opNames
+            before they are converted, the ``_id`` hash is computed
+            on first access (see :class:`StreamOperation`).
 
             .. note:: If you want instant confirmation, you need to instantiate
                       class:`bhive.blockchain.Blockchain` with
@@ -720,64 +1411,166 @@ class Blockchain(object):
                 }
 
         """
-        for block in self.blocks(**kwargs):
+        enum_virtual_ops = kwargs.pop("enum_virtual_ops", True)
+        virtual_op_filter = kwargs.pop("virtual_op_filter", None)
+        cursor = kwargs.pop("cursor", None)
+        watchlist = kwargs.pop("accounts", None)
+        custom_json_ids = kwargs.pop("custom_json_ids", None)
+        raw_records = kwargs.get("raw_records", False)
+        processes = kwargs.pop("processes", None)
+        shard_size = kwargs.pop("shard_size", 1000)
+        ordered = kwargs.pop("ordered", True)
+        if processes and cursor is not None and not ordered:
+            raise ValueError("cursor cannot be combined with ordered=False")
+        if watchlist is not None and not isinstance(watchlist, AccountWatchlist):
+            watchlist = AccountWatchlist(watchlist)
+        resume_position = None
+        if cursor is not None and cursor.position is not None:
+            resume_position = cursor.position
+            kwargs["start"] = cursor.block_num
+        try:
+            if processes:
+                start = kwargs.get("start") or self.get_current_block_num()
+                stop = kwargs.get("stop")
+                # blocks after the current block are not sharded, they are streamed below
+                shard_stop = self.get_current_block_num()
+                if stop:
+                    shard_stop = min(stop, shard_stop)
+                if start <= shard_stop:
+                    shard_kwargs = dict(kwargs)
+                    shard_kwargs.update({"opNames": opNames, "raw_ops": raw_ops, "resume_position": resume_position,
+                                         "enum_virtual_ops": enum_virtual_ops, "virtual_op_filter": virtual_op_filter,
+                                         "custom_json_ids": list(custom_json_ids) if custom_json_ids is not None else None,
+                                         "accounts": (list(watchlist), watchlist.account_fields) if watchlist is not None else None})
+                    sharded_stream = self._sharded_stream(start, shard_stop, processes, shard_size, ordered)
+                    for position, op in sharded_stream.run("stream", start, shard_stop, shard_kwargs):
+                        yield op
+                        if cursor is not None:
+                            cursor.update(position)
+                    if stop and shard_stop >= stop:
+                        return
+                    kwargs["start"] = shard_stop + 1
+            blocks = self._stream_blocks(opNames, enum_virtual_ops, virtual_op_filter, kwargs)
+            for op in self._stream_ops(blocks, opNames, raw_ops, cursor, resume_position, watchlist=watchlist,
+                                       custom_json_ids=custom_json_ids, raw_records=raw_records):
+                yield op
+        finally:
+            if cursor is not None:
+                cursor.save()
+
+    def _stream_blocks(self, opNames, enum_virtual_ops, virtual_op_filter, kwargs):
+        """Returns the blocks generator for :func:`stream`"""
+        if kwargs.get("only_virtual_ops", False) and enum_virtual_ops and not kwargs.get("threading", False):
+            return self._virtual_ops_blocks(opNames=opNames, virtual_op_filter=virtual_op_filter, **kwargs)
+        return self.blocks(**kwargs)
+
+    def _stream_ops(self, blocks, opNames, raw_ops, cursor, resume_position, watchlist=None, custom_json_ids=None,
+                    raw_records=False, with_position=False):
+        """ Yields the operations of blocks for :func:`stream`
+
+            Operations at or before resume_position are skipped, the position of
+            each yielded operation is passed to ``cursor.update`` when the next
+            operation is requested. When watchlist is set, only operations of
+            the watched accounts are yielded. When custom_json_ids is set,
+            custom_json operations with other ids are skipped. When raw_records
+            is set, :class:`bhive.records.OperationRecord` objects are yielded.
+            When with_position is set, ``((block_num, trx_num, op_num), op)``
+            tuples are yielded.
+
+            The operation type is checked against opNames before anything else
+            is done with an operation, ``_id`` is computed on first access
+            (see :class:`StreamOperation`).
+        """
+        if bool(opNames):
+            op_names = frozenset(opNames)
+            # operation types of appbase nodes have an "_operation" suffix
+            op_names_appbase = frozenset([op_name + "_operation" for op_name in op_names] +
+                                         [op_name for op_name in op_names if not (len(op_name) > 10 and op_name[-10:] == "_operation")])
+        else:
+            op_names = None
+        for block in blocks:
+            if isinstance(block, BlockRollback):
+                yield block.json()
+                if cursor is not None:
+                    # nothing of the block and the blocks above it has been processed
+                    cursor.update((block.block_num, -1, -1))
+                continue
             if "transactions" in block:
                 trx = block["transactions"]
             else:
                 trx = [block]
-            block_num = 0
-            trx_id = ""
-            _id = ""
-            timestamp = ""
             for trx_nr in range(len(trx)):
                 if "operations" not in trx[trx_nr]:
                     continue
-                for event in trx[trx_nr]["operations"]:
+                for op_nr, event in enumerate(trx[trx_nr]["operations"]):
                     if isinstance(event, list):
-                        op_type, op = event
+                        op_type = event[0]
+                        if op_names is not None and op_type not in op_names:
+                            continue
+                        op = event[1]
                         trx_id = block["transaction_ids"][trx_nr]
                         block_num = block.get("id")
-                        _id = self.hash_op(event)
+                        hash_event = event
                         timestamp = block.get("timestamp")
                     elif isinstance(event, dict) and "type" in event and "value" in event:
                         op_type = event["type"]
+                        if op_names is not None and op_type not in op_names_appbase:
+                            continue
                         if len(op_type) > 10 and op_type[len(op_type) - 10:] == "_operation":
                             op_type = op_type[:-10]
                         op = event["value"]
                         trx_id = block["transaction_ids"][trx_nr]
                         block_num = block.get("id")
-                        _id = self.hash_op(event)
+                        hash_event = event
                         timestamp = block.get("timestamp")
                     elif "op" in event and isinstance(event["op"], dict) and "type" in event["op"] and "value" in event["op"]:
                         op_type = event["op"]["type"]
+                        if op_names is not None and op_type not in op_names_appbase:
+                            continue
                         if len(op_type) > 10 and op_type[len(op_type) - 10:] == "_operation":
                             op_type = op_type[:-10]
                         op = event["op"]["value"]
                         trx_id = event.get("trx_id")
                         block_num = event.get("block")
-                        _id = self.hash_op(event["op"])
+                        hash_event = event["op"]
                         timestamp = event.get("timestamp")
                     else:
                         op_type, op = event["op"]
+                        if op_names is not None and op_type not in op_names:
+                            continue
                         trx_id = event.get("trx_id")
                         block_num = event.get("block")
-                        _id = self.hash_op(event["op"])
+                        hash_event = event["op"]
                         timestamp = event.get("timestamp")
-                    if not bool(opNames) or op_type in opNames and block_num > 0:
-                        if raw_ops:
-                            yield {"block_num": block_num,
-                                   "trx_num": trx_nr,
-                                   "op": [op_type, op],
-                                   "timestamp": timestamp}
-                        else:
-                            updated_op = {"type": op_type}
-                            updated_op.update(op.copy())
-                            updated_op.update({"_id": _id,
-                                               "timestamp": timestamp,
-                                               "block_num": block_num,
-                                               "trx_num": trx_nr,
-                                               "trx_id": trx_id})
-                            yield updated_op
+                    if op_names is not None and not block_num > 0:
+                        continue
+                    if custom_json_ids is not None and op_type == "custom_json" and op.get("id") not in custom_json_ids:
+                        continue
+                    if watchlist is not None and not watchlist.matches(op_type, op):
+                        continue
+                    if resume_position is not None and (block_num, trx_nr, op_nr) <= resume_position:
+                        continue
+                    if raw_records and not raw_ops:
+                        updated_op = OperationRecord(op_type, op, block_num, trx_nr, op_nr, trx_id, timestamp, hash_event)
+                    elif raw_ops:
+                        updated_op = {"block_num": block_num,
+                                      "trx_num": trx_nr,
+                                      "op": [op_type, op],
+                                      "timestamp": timestamp}
+                    else:
+                        updated_op = StreamOperation(hash_event, type=op_type)
+                        dict.update(updated_op, op)
+                        dict.update(updated_op, {"timestamp": timestamp,
+                                                 "block_num": block_num,
+                                                 "trx_num": trx_nr,
+                                                 "trx_id": trx_id})
+                    if with_position:
+                        yield ((block_num, trx_nr, op_nr), updated_op)
+                    else:
+                        yield updated_op
+                    if cursor is not None:
+                        # the consumer has processed the operation
+                        cursor.update((block_num, trx_nr, op_nr))
 
     def awaitTxConfirmation(self, transaction, limit=10):
         """ Returns the transaction as seen by the blockchain after being
@@ -819,7 +1612,7 @@ class Blockchain(object):
                 op_type = op_type[:-10]
             op = event["value"]
             event = [op_type, op]
-        data = json.dumps(event, sort_keys=True)
+        data = _hash_op_encoder.encode(event)
         return hashlib.sha1(py23_bytes(data, 'utf-8')).hexdigest()
 
     def get_all_accounts(self, start='', stop='', steps=1e3, limit=-1, **kwargs):
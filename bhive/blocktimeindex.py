@@ -0,0 +1,269 @@
+# This Python file uses the following encoding: utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+import bisect
+import logging
+import os
+import struct
+import threading
+from array import array
+from datetime import datetime, date, timedelta
+from bhivegraphenebase.py23 import integer_types, string_types
+from .utils import formatTimeString, addTzInfo
+log = logging.getLogger(__name__)
+_epoch = addTzInfo(datetime(1970, 1, 1))
+
+
+def to_seconds(timestamp):
+    """Returns a datetime, time string or number as seconds since epoch"""
+    if isinstance(timestamp, integer_types + (float, )):
+        return int(timestamp)
+    if isinstance(timestamp, string_types):
+        timestamp = formatTimeString(timestamp)
+    elif not isinstance(timestamp, datetime) and isinstance(timestamp, date):
+        timestamp = datetime(timestamp.year, timestamp.month, timestamp.day)
+    return int((addTzInfo(timestamp) - _epoch).total_seconds())
+
+
+def to_datetime(seconds):
+    """Returns seconds since epoch as UTC datetime"""
+    return _epoch + timedelta(seconds=seconds)
+
+
+class BlockTimeIndex(object):
+    """ Sparse index of block numbers and block times
+
+        :param str filename: The index is stored in this file, when set
+            (default is None, the index is kept in memory)
+        :param int block_interval: block interval in seconds (default is 3)
+        :param int save_interval: the index is saved after save_interval
+            changes (default is 100)
+
+        Two anchors ``(block_num, time)`` whose time difference is exactly
+        ``block_interval`` times their block number difference prove that no
+        block was missed between them, the time of each block between them is
+        known. Anchors inside such a regular range are not stored, so that
+        the index only grows at missed blocks. :func:`get_time` and
+        :func:`get_block_num` return exact results without RPC calls for
+        covered ranges, :func:`estimate_block_num` interpolates between the
+        anchors.
+
+        The index is used by :func:`bhive.blockchain.Blockchain.block_time`
+        and :func:`bhive.blockchain.Blockchain.get_estimated_block_num`, blocks
+        delivered by :func:`bhive.blockchain.Blockchain.blocks` in irreversible
+        mode are added to it:
+
+        .. code-block:: python
+
+            from bhive.blockchain import Blockchain
+            from bhive.blocktimeindex import BlockTimeIndex
+            b = Blockchain(block_time_index=BlockTimeIndex("block_times.dat"))
+            print(b.block_time(42000000))
+
+        A stored index must only be used with the chain it was built from.
+    """
+    # block_num, time
+    record = struct.Struct("<Iq")
+
+    def __init__(self, filename=None, block_interval=3, save_interval=100):
+        self.filename = filename
+        self.block_interval = block_interval
+        self.save_interval = save_interval
+        self._lock = threading.RLock()
+        self._block_nums = array(str("I"))
+        self._times = array(str("q"))
+        self._unsaved = 0
+        if filename is not None and os.path.isfile(filename):
+            self._load()
+
+    def _load(self):
+        with open(self.filename, "rb") as f:
+            data = f.read()
+        for i in range(len(data) // self.record.size):
+            block_num, seconds = self.record.unpack_from(data, i * self.record.size)
+            self.add(block_num, seconds)
+        self._unsaved = 0
+
+    def save(self):
+        """Writes the index into filename"""
+        if self.filename is None:
+            return
+        with self._lock:
+            tmp_filename = self.filename + ".tmp"
+            with open(tmp_filename, "wb") as f:
+                f.write(b"".join([self.record.pack(block_num, seconds) for block_num, seconds in zip(self._block_nums, self._times)]))
+                f.flush()
+                os.fsync(f.fileno())
+            if hasattr(os, "replace"):
+                os.replace(tmp_filename, self.filename)
+            else:
+                os.rename(tmp_filename, self.filename)
+            self._unsaved = 0
+
+    def close(self):
+        """Saves the index, when it was changed"""
+        if self._unsaved > 0:
+            self.save()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return len(self._block_nums)
+
+    def anchors(self):
+        """Returns the list of stored ``(block_num, datetime)`` anchors"""
+        with self._lock:
+            return [(block_num, to_datetime(seconds)) for block_num, seconds in zip(self._block_nums, self._times)]
+
+    @property
+    def first_block_num(self):
+        if len(self._block_nums) == 0:
+            return None
+        return self._block_nums[0]
+
+    @property
+    def last_block_num(self):
+        if len(self._block_nums) == 0:
+            return None
+        return self._block_nums[-1]
+
+    @property
+    def last_time(self):
+        """Time of the last anchor as datetime or None"""
+        if len(self._times) == 0:
+            return None
+        return to_datetime(self._times[-1])
+
+    def _is_regular(self, pos_a, pos_b):
+        """True, when no block is missing between the anchors at pos_a and pos_b"""
+        return self._times[pos_b] - self._times[pos_a] == (self._block_nums[pos_b] - self._block_nums[pos_a]) * self.block_interval
+
+    def _remove(self, pos):
+        self._block_nums.pop(pos)
+        self._times.pop(pos)
+
+    def add(self, block_num, timestamp):
+        """ Adds the time of a block
+
+            :param int block_num: block number
+            :param timestamp: block time as datetime, time string or seconds since epoch
+            :returns: True, when the index was changed
+        """
+        block_num = int(block_num)
+        seconds = to_seconds(timestamp)
+        with self._lock:
+            pos = bisect.bisect_left(self._block_nums, block_num)
+            if pos < len(self._block_nums) and self._block_nums[pos] == block_num:
+                return False
+            if 0 < pos < len(self._block_nums) and self._is_regular(pos - 1, pos):
+                # the time is already known
+                return False
+            self._block_nums.insert(pos, block_num)
+            self._times.insert(pos, seconds)
+            # anchors inside a regular range are not needed
+            if pos + 2 < len(self._block_nums) and self._is_regular(pos, pos + 1) and self._is_regular(pos + 1, pos + 2):
+                self._remove(pos + 1)
+            if pos >= 2 and self._is_regular(pos - 2, pos - 1) and self._is_regular(pos - 1, pos):
+                self._remove(pos - 1)
+            self._unsaved += 1
+            if self.filename is not None and self._unsaved >= self.save_interval:
+                self.save()
+        return True
+
+    def add_block(self, block):
+        """ Adds a :class:`bhive.block.Block`, :class:`bhive.block.BlockHeader`,
+            :class:`bhive.records.BlockRecord` or block dict
+        """
+        block_num = block.block_num if hasattr(block, "block_num") else None
+        if block_num is None and "block_id" in block:
+            block_num = int(block["block_id"][:8], base=16)
+        elif block_num is None:
+            block_num = block.get("id", block.get("block"))
+        timestamp = block.timestamp if hasattr(block, "timestamp") else block["timestamp"]
+        return self.add(block_num, timestamp)
+
+    def _bracket_block_num(self, block_num):
+        """Returns the positions of the anchors before and after block_num (None, when not existing)"""
+        pos = bisect.bisect_left(self._block_nums, block_num)
+        if pos < len(self._block_nums) and self._block_nums[pos] == block_num:
+            return pos, pos
+        return (pos - 1 if pos > 0 else None), (pos if pos < len(self._block_nums) else None)
+
+    def _bracket_time(self, seconds):
+        """Returns the positions of the anchors before and after seconds (None, when not existing)"""
+        pos = bisect.bisect_left(self._times, seconds)
+        if pos < len(self._times) and self._times[pos] == seconds:
+            return pos, pos
+        return (pos - 1 if pos > 0 else None), (pos if pos < len(self._times) else None)
+
+    def get_time(self, block_num):
+        """Returns the exact time of block_num as datetime or None, when it is not known"""
+        with self._lock:
+            left, right = self._bracket_block_num(block_num)
+            if left is None or right is None:
+                return None
+            if left == right:
+                return to_datetime(self._times[left])
+            if not self._is_regular(left, right):
+                return None
+            return to_datetime(self._times[left] + (block_num - self._block_nums[left]) * self.block_interval)
+
+    def get_block_num(self, timestamp):
+        """ Returns the block number of the last block at or before timestamp,
+            None when it is not known
+        """
+        seconds = to_seconds(timestamp)
+        with self._lock:
+            left, right = self._bracket_time(seconds)
+            if left is None or right is None:
+                return None
+            if left == right:
+                return self._block_nums[left]
+            if self._block_nums[right] - self._block_nums[left] == 1:
+                return self._block_nums[left]
+            if self._is_regular(left, right):
+                return self._block_nums[left] + (seconds - self._times[left]) // self.block_interval
+            return None
+
+    def bracket(self, timestamp, last_anchor=None):
+        """ Returns the anchors ``(block_num, seconds)`` before and after timestamp,
+            each is None when not existing
+
+            :param tuple last_anchor: ``(block_num, seconds)`` of a block after all
+                stored anchors, which is not stored (e.g. the reversible head block)
+        """
+        seconds = to_seconds(timestamp)
+        with self._lock:
+            left, right = self._bracket_time(seconds)
+            left = None if left is None else (self._block_nums[left], self._times[left])
+            right = None if right is None else (self._block_nums[right], self._times[right])
+        if last_anchor is not None and right is None:
+            if last_anchor[1] >= seconds:
+                right = last_anchor
+            if last_anchor[1] <= seconds:
+                left = last_anchor
+        return left, right
+
+    def estimate_block_num(self, timestamp, last_anchor=None):
+        """ Returns the block number of timestamp by interpolation between
+            the anchors, or None when the index is empty
+
+            :param tuple last_anchor: see :func:`bracket`
+        """
+        seconds = to_seconds(timestamp)
+        left, right = self.bracket(seconds, last_anchor=last_anchor)
+        if left is None and right is None:
+            return None
+        if left is None:
+            return max(1, right[0] - (right[1] - seconds) // self.block_interval)
+        if right is None:
+            return left[0] + (seconds - left[1]) // self.block_interval
+        if right[1] == left[1]:
+            return left[0]
+        return left[0] + (seconds - left[1]) * (right[0] - left[0]) // (right[1] - left[1])
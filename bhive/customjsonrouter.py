@@ -0,0 +1,179 @@
+# This Python file uses the following encoding: utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+import logging
+import threading
+from bhiveapi import codec
+from .instance import shared_hive_instance
+log = logging.getLogger(__name__)
+
+
+class CustomJson(object):
+    """ custom_json operation passed to the handlers of :class:`CustomJsonRouter`
+
+        :param dict op: operation dict yielded by :func:`bhive.blockchain.Blockchain.stream`
+
+        The ``json`` field is decoded on first access of :attr:`payload` and
+        the result is shared by all handlers.
+    """
+    __slots__ = ["op", "_payload", "_decoded"]
+
+    def __init__(self, op):
+        self.op = op
+        self._payload = None
+        self._decoded = False
+
+    @property
+    def id(self):
+        return self.op["id"]
+
+    @property
+    def json(self):
+        """Undecoded json string"""
+        return self.op["json"]
+
+    @property
+    def payload(self):
+        """Decoded json field, None when it is not valid JSON"""
+        if not self._decoded:
+            self._decoded = True
+            try:
+                self._payload = codec.loads(self.op["json"])
+            except ValueError:
+                log.warning("custom_json %s in block %s has invalid json" % (self.op.get("id"), str(self.op.get("block_num"))))
+        return self._payload
+
+    @property
+    def required_auths(self):
+        return self.op.get("required_auths", [])
+
+    @property
+    def required_posting_auths(self):
+        return self.op.get("required_posting_auths", [])
+
+    @property
+    def account(self):
+        """First account which has signed the operation"""
+        auths = self.required_auths or self.required_posting_auths
+        if len(auths) > 0:
+            return auths[0]
+        return None
+
+    @property
+    def block_num(self):
+        return self.op.get("block_num")
+
+    @property
+    def timestamp(self):
+        return self.op.get("timestamp")
+
+    @property
+    def trx_id(self):
+        return self.op.get("trx_id")
+
+    def __repr__(self):
+        return "<CustomJson %s>" % self.op.get("id")
+
+
+class CustomJsonRouter(object):
+    """ Dispatches custom_json operations by their id to registered handlers
+
+        :param Blockchain blockchain: Blockchain instance used by :func:`run`
+            (default is a new Blockchain)
+        :param Hive hive_instance: Hive instance
+
+        Only operations with a registered id are converted by
+        :func:`bhive.blockchain.Blockchain.stream`, the ``json`` field is
+        decoded at most once per operation and only when a handler reads
+        :attr:`CustomJson.payload`. Handlers are called with a
+        :class:`CustomJson` object in the order in which they were registered.
+        Handlers can be registered and removed while :func:`run` is running.
+
+        .. code-block:: python
+
+            from bhive.customjsonrouter import CustomJsonRouter
+            router = CustomJsonRouter()
+
+            @router.route("follow")
+            def follow(custom_json):
+                print(custom_json.account, custom_json.payload)
+
+            router.run(start=42000000, stop=42000100)
+
+    """
+    def __init__(self, blockchain=None, hive_instance=None):
+        self.hive = hive_instance or shared_hive_instance()
+        self.blockchain = blockchain
+        self._lock = threading.Lock()
+        # custom_json id: list of handlers
+        self.handlers = {}
+
+    @property
+    def ids(self):
+        """Registered custom_json ids"""
+        return list(self.handlers)
+
+    def register(self, custom_json_id, handler):
+        """ Calls handler for each custom_json operation with custom_json_id
+
+            :param str custom_json_id: id of the custom_json operation
+            :param handler: callable, which gets a :class:`CustomJson` object
+        """
+        with self._lock:
+            handlers = list(self.handlers.get(custom_json_id, []))
+            handlers.append(handler)
+            self.handlers[custom_json_id] = handlers
+
+    def unregister(self, custom_json_id, handler=None):
+        """Removes handler (or all handlers, when not set) of custom_json_id"""
+        with self._lock:
+            if handler is None:
+                self.handlers.pop(custom_json_id, None)
+                return
+            handlers = [h for h in self.handlers.get(custom_json_id, []) if h != handler]
+            if len(handlers) > 0:
+                self.handlers[custom_json_id] = handlers
+            else:
+                self.handlers.pop(custom_json_id, None)
+
+    def route(self, custom_json_id):
+        """Decorator, which registers a function as handler of custom_json_id"""
+        def decorator(handler):
+            self.register(custom_json_id, handler)
+            return handler
+        return decorator
+
+    def dispatch(self, op):
+        """ Calls the handlers of a custom_json operation
+
+            :param dict op: operation dict yielded by :func:`bhive.blockchain.Blockchain.stream`
+            :returns: the number of called handlers
+        """
+        handlers = self.handlers.get(op.get("id"))
+        if not handlers:
+            return 0
+        custom_json = CustomJson(op)
+        for handler in handlers:
+            handler(custom_json)
+        return len(handlers)
+
+    def run(self, **kwargs):
+        """ Streams custom_json operations and dispatches them to the handlers
+
+            All parameters are passed to :func:`bhive.blockchain.Blockchain.stream`
+            (e.g. start, stop, threading, cursor, accounts).
+
+            :returns: the number of dispatched operations
+        """
+        if self.blockchain is None:
+            from .blockchain import Blockchain
+            self.blockchain = Blockchain(hive_instance=self.hive)
+        kwargs["opNames"] = ["custom_json"]
+        kwargs["custom_json_ids"] = self.handlers
+        cnt = 0
+        for op in self.blockchain.stream(**kwargs):
+            if self.dispatch(op) > 0:
+                cnt += 1
+        return cnt
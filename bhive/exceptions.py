@@ -155,3 +155,9 @@ class BlockWaitTimeExceeded(Exception):
     """ Wait time for new block exceeded
     """
     pass
+
+
+class ShardWorkerException(Exception):
+    """ A worker process of a sharded block stream has failed
+    """
+    pass
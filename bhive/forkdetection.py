@@ -0,0 +1,102 @@
+# This Python file uses the following encoding: utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+from collections import OrderedDict
+from bhivegraphenebase.py23 import string_types
+from .utils import formatTimeString
+
+
+class BlockRollback(object):
+    """ Event of :func:`bhive.blockchain.Blockchain.blocks` with ``fork_detection=True``,
+        which tells that an already delivered block was replaced by a fork
+
+        :param int block_num: number of the replaced block
+        :param str block_id: id of the replaced block
+        :param str previous: id of the block before the replaced block
+        :param timestamp: time of the replaced block
+
+        :func:`bhive.blockchain.Blockchain.stream` yields :func:`json` of it.
+    """
+    __slots__ = ["block_num", "block_id", "previous", "timestamp"]
+
+    def __init__(self, block_num, block_id, previous=None, timestamp=None):
+        self.block_num = block_num
+        self.block_id = block_id
+        self.previous = previous
+        if isinstance(timestamp, string_types):
+            timestamp = formatTimeString(timestamp)
+        self.timestamp = timestamp
+
+    def __eq__(self, other):
+        return isinstance(other, BlockRollback) and self.block_num == other.block_num and self.block_id == other.block_id
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "<BlockRollback %d %s>" % (self.block_num, self.block_id)
+
+    def json(self):
+        return {"type": "rollback", "block_num": self.block_num, "block_id": self.block_id,
+                "previous": self.previous, "timestamp": self.timestamp}
+
+
+class BlockWindow(object):
+    """ Ids of the last delivered blocks, which are used to detect forks
+
+        :param int size: number of stored blocks (default is 100)
+
+        A fork is detected, when the ``previous`` id of a new block differs
+        from the stored id of the block before it.
+    """
+    def __init__(self, size=100):
+        self.size = size
+        # block_num: (block_id, previous, timestamp)
+        self._blocks = OrderedDict()
+
+    def __len__(self):
+        return len(self._blocks)
+
+    def __contains__(self, block_num):
+        return block_num in self._blocks
+
+    @property
+    def first_block_num(self):
+        """Lowest stored block number or None"""
+        for block_num in self._blocks:
+            return block_num
+        return None
+
+    def get_block_id(self, block_num):
+        """Returns the stored id of block_num or None"""
+        entry = self._blocks.get(block_num)
+        if entry is None:
+            return None
+        return entry[0]
+
+    def links(self, block_num, previous):
+        """Returns False, when previous is not the stored id of the block before block_num"""
+        block_id = self.get_block_id(block_num - 1)
+        return block_id is None or block_id == previous
+
+    def add(self, block_num, block_id, previous=None, timestamp=None):
+        """Stores a delivered block, the oldest block is removed when the window is full"""
+        self._blocks[block_num] = (block_id, previous, timestamp)
+        while len(self._blocks) > self.size:
+            self._blocks.popitem(last=False)
+
+    def rollback(self, block_num):
+        """ Removes all blocks above block_num
+
+            :returns: list of :class:`BlockRollback` of the removed blocks,
+                the highest block first
+        """
+        rollbacks = []
+        for removed_num in sorted([n for n in self._blocks if n > block_num], reverse=True):
+            block_id, previous, timestamp = self._blocks.pop(removed_num)
+            rollbacks.append(BlockRollback(removed_num, block_id, previous=previous, timestamp=timestamp))
+        return rollbacks
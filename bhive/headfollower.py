@@ -0,0 +1,146 @@
+# This Python file uses the following encoding: utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+import logging
+import threading
+import time
+from datetime import datetime
+from bhivegraphenebase.py23 import string_types
+from .utils import formatTimeString, addTzInfo
+log = logging.getLogger(__name__)
+_epoch = addTzInfo(datetime(1970, 1, 1))
+
+
+class HeadPoller(object):
+    """ Schedules the requests for the next block, when a stream has reached the head block
+
+        :param float block_interval: block interval in seconds (default is 3)
+        :param float delay: the next block is requested delay seconds after it
+            is expected to be available (default is 0.3)
+        :param float min_wait: wait time after the first miss (default is 0.2)
+        :param float backoff: the wait time is multiplied with backoff after
+            each further miss (default is 2)
+        :param float max_wait: maximum wait time (default is block_interval)
+
+        The time at which a block is available is estimated from the block
+        number and time of the last head block and from the smallest lag
+        between a block time and the moment the block was seen. A request
+        which does not return the wanted block counts as a miss. Block
+        applied notices of a websocket (see :func:`start_websocket` and
+        :func:`notify`) stop the current wait immediately.
+
+        .. code-block:: python
+
+            from bhive.blockchain import Blockchain
+            from bhive.headfollower import HeadPoller
+            b = Blockchain(mode="head", head_poller=HeadPoller(delay=0.5))
+            for block in b.blocks():
+                print(block)
+
+    """
+    def __init__(self, block_interval=3, delay=0.3, min_wait=0.2, backoff=2., max_wait=None):
+        self.block_interval = block_interval
+        self.delay = delay
+        self.min_wait = min_wait
+        self.backoff = backoff
+        self.max_wait = max_wait if max_wait is not None else block_interval
+        # block number and time (seconds since epoch) of the last head block
+        self.ref_block_num = None
+        self.ref_time = None
+        # smallest observed difference between local time and block time
+        self.lag = None
+        self.polls = 0
+        self.misses = 0
+        self._miss_wait = None
+        self._notified = threading.Event()
+        self.websocket = None
+
+    def update(self, block_num, timestamp, available=True, now=None):
+        """ Stores the last head block
+
+            :param int block_num: head block number
+            :param timestamp: time of the head block (datetime or string)
+            :param bool available: False, when the wanted block was not available (miss)
+        """
+        if now is None:
+            now = time.time()
+        if timestamp is not None:
+            if isinstance(timestamp, string_types):
+                timestamp = formatTimeString(timestamp)
+            block_time = (addTzInfo(timestamp) - _epoch).total_seconds()
+            self.ref_block_num = block_num
+            self.ref_time = block_time
+            if self.lag is None or now - block_time < self.lag:
+                self.lag = now - block_time
+        if available:
+            self._miss_wait = None
+        else:
+            self.miss()
+
+    def miss(self):
+        """Increases the wait time, when a wanted block was not available"""
+        self.misses += 1
+        if self._miss_wait is None:
+            self._miss_wait = self.min_wait
+        else:
+            self._miss_wait = min(self.max_wait, self._miss_wait * self.backoff)
+
+    def expected_time(self, block_num):
+        """Returns the local time (seconds since epoch) at which block_num is expected to be available"""
+        if self.ref_time is None:
+            return None
+        return self.ref_time + (block_num - self.ref_block_num) * self.block_interval + self.lag
+
+    def get_wait(self, block_num, now=None):
+        """Returns the number of seconds to wait, before block_num is requested"""
+        if self._miss_wait is not None:
+            return self._miss_wait
+        expected = self.expected_time(block_num)
+        if expected is None:
+            return self.block_interval
+        if block_num <= self.ref_block_num:
+            return 0.
+        if now is None:
+            now = time.time()
+        return max(0., min(expected + self.delay - now, (block_num - self.ref_block_num) * self.block_interval + self.delay))
+
+    def wait(self, block_num):
+        """ Waits until block_num should be available or a block applied notice
+            was received, returns the waited seconds
+        """
+        wait_time = self.get_wait(block_num)
+        self.polls += 1
+        start = time.time()
+        if wait_time > 0:
+            self._notified.wait(wait_time)
+        self._notified.clear()
+        return time.time() - start
+
+    def notify(self, *args):
+        """Wakes up the current wait, called for each block applied notice"""
+        self._miss_wait = None
+        self._notified.set()
+
+    def start_websocket(self, urls, **kwargs):
+        """ Subscribes to block applied notices with :class:`bhiveapi.websocket.HiveWebsocket`,
+            which runs in a daemon thread
+
+            :param urls: websocket url or list of urls
+            :returns: the HiveWebsocket instance
+
+            All other parameters are passed to HiveWebsocket.
+        """
+        from bhiveapi.websocket import HiveWebsocket
+        self.websocket = HiveWebsocket(urls, only_block_id=True, on_block=self.notify, **kwargs)
+        thread = threading.Thread(target=self.websocket.run_forever)
+        thread.daemon = True
+        thread.start()
+        return self.websocket
+
+    def stop_websocket(self):
+        """Closes the websocket"""
+        if self.websocket is not None:
+            self.websocket.close()
+            self.websocket = None
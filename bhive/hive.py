@@ -73,6 +73,14 @@ class Hive(object):
             broadcast posting op or creating hot_links (default is False)
         :param HiveConnect hiveconnect: A HiveConnect object can be set manually, set use_sc2 to True
         :param dict custom_chains: custom chain which should be added to the known chains
+        :param bool batch_fanout: When True, batch calls to https nodes are split into sub-batches,
+            which are sent in parallel to several nodes (default is False)
+        :param RPCCache rpc_cache: On-disk cache for results which can never change, e.g.
+            irreversible blocks. A directory name can be given instead (default is None)
+        :param bool coalesce_requests: Identical rpc calls from several threads which are
+            in progress at the same time share a single request (default is False)
+        :param bool metrics: Record call counts, latencies, bytes and retries per api method
+            and node in ``hive.rpc.metrics`` (default is False)
 
         Three wallet operation modes are possible:
 
@@ -0,0 +1,173 @@
+# This Python file uses the following encoding: utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+from array import array
+from .blocktimeindex import to_seconds, to_datetime
+
+
+def get_op_type(event):
+    """ Returns the operation type without ``_operation`` of an operation
+        of a block or of ``get_ops_in_block`` / ``enum_virtual_ops``
+    """
+    if isinstance(event, dict) and "op" in event:
+        event = event["op"]
+    if isinstance(event, dict):
+        op_type = event["type"]
+        if len(op_type) > 10 and op_type[len(op_type) - 10:] == "_operation":
+            op_type = op_type[:-10]
+        return op_type
+    return event[0]
+
+
+class OpsStatistics(object):
+    """ Number of operations per operation type, returned by
+        :func:`bhive.blockchain.Blockchain.ops_statistics`
+
+        :param int interval: When set, the operations are also counted per
+            interval of this length in seconds (e.g. 3600 for operations per hour)
+
+        ``counts`` is a dict with the number of operations of each type. With
+        interval, ``series`` stores an ``array("I")`` for each type, whose
+        n-th value is the number of operations in the n-th interval after
+        :attr:`start_time`. Statistics of different block ranges are
+        combined with :func:`merge`.
+
+        .. code-block:: python
+
+            from bhive.blockchain import Blockchain
+            b = Blockchain()
+            stats = b.ops_statistics(42000000, 42010000, interval=3600, processes=4)
+            for start_time, votes in zip(stats.times(), stats.get_series("vote")):
+                print(start_time, votes)
+
+    """
+    def __init__(self, interval=None):
+        self.interval = interval
+        self.counts = {}
+        self.series = {}
+        # index of the first interval (seconds since epoch // interval)
+        self.first_interval = None
+        self.blocks = 0
+
+    def __len__(self):
+        """Number of intervals"""
+        if self.first_interval is None:
+            return 0
+        return max([len(values) for values in self.series.values()] or [0])
+
+    def __repr__(self):
+        return "<OpsStatistics %d ops in %d blocks>" % (sum(self.counts.values()), self.blocks)
+
+    @property
+    def start_time(self):
+        """Start of the first interval as datetime or None"""
+        if self.first_interval is None:
+            return None
+        return to_datetime(self.first_interval * self.interval)
+
+    def times(self):
+        """Returns the start times of all intervals as list of datetimes"""
+        if self.first_interval is None:
+            return []
+        return [to_datetime((self.first_interval + i) * self.interval) for i in range(len(self))]
+
+    def get_series(self, op_type):
+        """Returns the number of op_type operations of each interval as list"""
+        values = list(self.series.get(op_type, []))
+        return values + [0] * (len(self) - len(values))
+
+    def _shift(self, first_interval):
+        """Moves the start of all series to the earlier first_interval"""
+        if self.first_interval is None:
+            self.first_interval = first_interval
+            return
+        zeros = array(str("I"), [0]) * (self.first_interval - first_interval)
+        for op_type in self.series:
+            self.series[op_type] = zeros + self.series[op_type]
+        self.first_interval = first_interval
+
+    def add(self, op_type, timestamp=None, count=1):
+        """ Counts count operations of op_type
+
+            :param timestamp: block time as seconds since epoch, datetime or string,
+                only needed with interval
+        """
+        self.counts[op_type] = self.counts.get(op_type, 0) + count
+        if self.interval is None or timestamp is None:
+            return
+        interval_num = to_seconds(timestamp) // self.interval
+        if self.first_interval is None or interval_num < self.first_interval:
+            self._shift(interval_num)
+        pos = interval_num - self.first_interval
+        values = self.series.get(op_type)
+        if values is None:
+            values = self.series[op_type] = array(str("I"))
+        if len(values) <= pos:
+            values.extend([0] * (pos + 1 - len(values)))
+        values[pos] += count
+
+    def add_block(self, block):
+        """ Counts the operations of a block (:class:`bhive.block.Block`,
+            :class:`bhive.records.BlockRecord` or dict), which can also
+            contain only operations
+        """
+        self.blocks += 1
+        if "transactions" in block:
+            events = [event for trx in block["transactions"] for event in trx.get("operations", [])]
+        else:
+            events = block.get("operations") or []
+        if len(events) == 0:
+            return
+        block_counts = {}
+        for event in events:
+            op_type = get_op_type(event)
+            block_counts[op_type] = block_counts.get(op_type, 0) + 1
+        timestamp = None
+        if self.interval is not None:
+            timestamp = block.get("timestamp")
+            if "transactions" not in block and isinstance(events[0], dict) and "timestamp" in events[0]:
+                timestamp = events[0]["timestamp"]
+            timestamp = to_seconds(timestamp)
+        for op_type, count in block_counts.items():
+            self.add(op_type, timestamp, count)
+
+    def merge(self, other):
+        """Adds the counts of another OpsStatistics with the same interval"""
+        if other.interval != self.interval:
+            raise ValueError("Statistics with different intervals cannot be merged")
+        self.blocks += other.blocks
+        for op_type, count in other.counts.items():
+            self.counts[op_type] = self.counts.get(op_type, 0) + count
+        if other.first_interval is None:
+            return self
+        if self.first_interval is None or other.first_interval < self.first_interval:
+            self._shift(other.first_interval)
+        offset = other.first_interval - self.first_interval
+        for op_type, other_values in other.series.items():
+            values = self.series.get(op_type)
+            if values is None:
+                values = self.series[op_type] = array(str("I"))
+            if len(values) < offset + len(other_values):
+                values.extend([0] * (offset + len(other_values) - len(values)))
+            for i, count in enumerate(other_values):
+                values[offset + i] += count
+        return self
+
+    def json(self, add_to_ops_stat=None):
+        """ Returns the dict of :func:`bhive.blockchain.Blockchain.ops_statistics`
+            with all operation types and their number
+
+            :param dict add_to_ops_stat: if set, the counts are added to it
+        """
+        if add_to_ops_stat is None:
+            import bhivebase.operationids
+            ops_stat = bhivebase.operationids.operations.copy()
+            for key in ops_stat:
+                ops_stat[key] = 0
+        else:
+            ops_stat = add_to_ops_stat.copy()
+        for op_type, count in self.counts.items():
+            ops_stat[op_type] = ops_stat.get(op_type, 0) + count
+        return ops_stat
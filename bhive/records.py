@@ -0,0 +1,184 @@
+# This Python file uses the following encoding: utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+from bhivegraphenebase.py23 import string_types
+from .utils import formatTimeString
+
+
+class BlockRecord(object):
+    """ Compact block yielded by :func:`bhive.blockchain.Blockchain.blocks`
+        with ``raw_records=True``
+
+        :param dict data: block as received from the node
+        :param int block_num: block number (default is taken from data)
+        :param bool only_ops: data contains only operations (default: False)
+        :param bool only_virtual_ops: data contains only virtual operations (default: False)
+
+        Unlike :class:`bhive.block.Block`, the record is not stored in the
+        object cache and the received data is not changed. Item access
+        (``record["transactions"]``) returns the unparsed node data,
+        ``record["id"]`` returns the block number. The ``timestamp``
+        attribute is converted to datetime on first access.
+    """
+    __slots__ = ["block_num", "data", "only_ops", "only_virtual_ops", "_timestamp"]
+
+    def __init__(self, data, block_num=None, only_ops=False, only_virtual_ops=False):
+        if block_num is None:
+            if "block_id" in data:
+                block_num = int(data["block_id"][:8], base=16)
+            elif "block" in data:
+                block_num = int(data["block"])
+        self.block_num = block_num
+        self.data = data
+        self.only_ops = only_ops or only_virtual_ops
+        self.only_virtual_ops = only_virtual_ops
+        self._timestamp = None
+
+    @property
+    def identifier(self):
+        return self.block_num
+
+    @property
+    def timestamp(self):
+        """Block time as datetime"""
+        if self._timestamp is None:
+            timestamp = self.data.get("timestamp")
+            if isinstance(timestamp, string_types):
+                timestamp = formatTimeString(timestamp)
+            self._timestamp = timestamp
+        return self._timestamp
+
+    def time(self):
+        """Return a datetime instance for the timestamp of this block"""
+        return self.timestamp
+
+    @property
+    def block_id(self):
+        return self.data.get("block_id")
+
+    def __getitem__(self, key):
+        if key == "id":
+            return self.block_num
+        return self.data[key]
+
+    def get(self, key, default=None):
+        if key == "id":
+            return self.block_num
+        return self.data.get(key, default)
+
+    def __contains__(self, key):
+        return key == "id" or key in self.data
+
+    def __eq__(self, other):
+        return isinstance(other, BlockRecord) and self.block_num == other.block_num and self.data == other.data
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "<BlockRecord %s>" % str(self.block_num)
+
+    def json(self):
+        """Returns the block dict with string timestamps, the dict is not copied and must not be changed"""
+        return self.data
+
+    def to_block(self, hive_instance=None):
+        """Returns the record as :class:`bhive.block.Block`"""
+        from .block import Block
+        block = Block(dict(self.data), only_ops=self.only_ops, only_virtual_ops=self.only_virtual_ops,
+                      hive_instance=hive_instance)
+        block["id"] = self.block_num
+        block.identifier = self.block_num
+        return block
+
+
+class OperationRecord(object):
+    """ Compact operation yielded by :func:`bhive.blockchain.Blockchain.stream`
+        with ``raw_records=True``
+
+        The operation value is kept as received from the node in ``value``.
+        ``timestamp`` is converted to datetime and ``_id`` is hashed on first
+        access. Item access and :func:`get` return the same keys as the dicts
+        of ``stream``, :func:`json` returns such a dict.
+    """
+    __slots__ = ["type", "value", "block_num", "trx_num", "op_num", "trx_id", "_timestamp", "_event", "_op_id"]
+
+    def __init__(self, op_type, value, block_num, trx_num, op_num, trx_id, timestamp, event=None):
+        self.type = op_type
+        self.value = value
+        self.block_num = block_num
+        self.trx_num = trx_num
+        self.op_num = op_num
+        self.trx_id = trx_id
+        self._timestamp = timestamp
+        self._event = event
+        self._op_id = None
+
+    @property
+    def timestamp(self):
+        """Block time as datetime"""
+        if isinstance(self._timestamp, string_types):
+            self._timestamp = formatTimeString(self._timestamp)
+        return self._timestamp
+
+    @property
+    def position(self):
+        """``(block_num, trx_num, op_num)``, as used by :class:`bhive.streamcursor.StreamCursor`"""
+        return (self.block_num, self.trx_num, self.op_num)
+
+    @property
+    def op_id(self):
+        """Hash of the operation, the same as ``_id`` of the stream dicts"""
+        if self._op_id is None:
+            from .blockchain import Blockchain
+            self._op_id = Blockchain.hash_op(self._event if self._event is not None else [self.type, self.value])
+            self._event = None
+        return self._op_id
+
+    def __getitem__(self, key):
+        if key == "type":
+            return self.type
+        elif key == "timestamp":
+            return self.timestamp
+        elif key == "block_num":
+            return self.block_num
+        elif key == "trx_num":
+            return self.trx_num
+        elif key == "trx_id":
+            return self.trx_id
+        elif key == "_id":
+            return self.op_id
+        return self.value[key]
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        return key in ("type", "timestamp", "block_num", "trx_num", "trx_id", "_id") or key in self.value
+
+    def __eq__(self, other):
+        return isinstance(other, OperationRecord) and self.position == other.position and \
+            self.type == other.type and self.value == other.value
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "<OperationRecord %s %s>" % (self.type, str(self.position))
+
+    def json(self):
+        """Returns the operation as dict, like the dicts yielded by ``stream``"""
+        data = {"type": self.type}
+        data.update(self.value)
+        data.update({"_id": self.op_id, "timestamp": self.timestamp, "block_num": self.block_num,
+                     "trx_num": self.trx_num, "trx_id": self.trx_id})
+        return data
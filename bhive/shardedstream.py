@@ -0,0 +1,230 @@
+# This Python file uses the following encoding: utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+import logging
+import multiprocessing
+import traceback
+from .exceptions import ShardWorkerException
+log = logging.getLogger(__name__)
+try:
+    from queue import Empty
+except ImportError:
+    from Queue import Empty
+
+
+def get_shards(start, stop, shard_size):
+    """ Splits the block range from start to stop (both included) into shards
+
+        :returns: list of ``(start, stop)`` tuples
+    """
+    shard_size = max(1, int(shard_size))
+    return [(shard_start, min(stop, shard_start + shard_size - 1)) for shard_start in range(start, stop + 1, shard_size)]
+
+
+def get_hive_config(hive_instance):
+    """ Returns the picklable parameters, which are needed to create a
+        :class:`bhive.hive.Hive` instance with the same nodes in a worker process
+    """
+    rpc = hive_instance.rpc
+    return {"node": rpc.nodes.export_working_nodes() or [rpc.url],
+            "num_retries": rpc.num_retries,
+            "num_retries_call": rpc.num_retries_call,
+            "timeout": rpc.timeout,
+            "custom_chains": hive_instance.custom_chains}
+
+
+def _shard_items(blockchain, kind, start, stop, kwargs):
+    """Yields the results of one shard inside a worker process"""
+    if kind == "blocks":
+        for block in blockchain.blocks(start=start, stop=stop, **kwargs):
+            if isinstance(block, dict):
+                # Block objects hold the Hive instance and are rebuilt by the parent
+                block = dict(block)
+            yield block
+        return
+    if kind == "ops_statistics":
+        kwargs = dict(kwargs)
+        block_archive_path = kwargs.pop("block_archive_path", None)
+        if block_archive_path is not None:
+            from .blockarchive import BlockArchive
+            kwargs["block_archive"] = BlockArchive(block_archive_path, read_only=True)
+        yield blockchain._count_ops(start, stop, **kwargs)
+        return
+    kwargs = dict(kwargs)
+    accounts = kwargs.pop("accounts", None)
+    if accounts is not None:
+        from .watchlist import AccountWatchlist
+        accounts = AccountWatchlist(accounts[0], fields=accounts[1])
+    custom_json_ids = kwargs.pop("custom_json_ids", None)
+    if custom_json_ids is not None:
+        custom_json_ids = frozenset(custom_json_ids)
+    opNames = kwargs.pop("opNames", [])
+    raw_ops = kwargs.pop("raw_ops", False)
+    resume_position = kwargs.pop("resume_position", None)
+    enum_virtual_ops = kwargs.pop("enum_virtual_ops", True)
+    virtual_op_filter = kwargs.pop("virtual_op_filter", None)
+    kwargs["start"] = start
+    kwargs["stop"] = stop
+    blocks = blockchain._stream_blocks(opNames, enum_virtual_ops, virtual_op_filter, kwargs)
+    for item in blockchain._stream_ops(blocks, opNames, raw_ops, None, resume_position, watchlist=accounts,
+                                       custom_json_ids=custom_json_ids, raw_records=kwargs.get("raw_records", False),
+                                       with_position=True):
+        yield item
+
+
+def _shard_worker(hive_config, mode, tasks, results, chunk_size):
+    """ Main function of the worker processes
+
+        Receives ``(shard_num, start, stop, kind, kwargs)`` tasks until None is
+        received and puts ``(shard_num, status, data)`` messages into results.
+        status is ``items`` (data is a list of up to chunk_size items),
+        ``done`` or ``error`` (data is the traceback).
+    """
+    blockchain = None
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        shard_num, start, stop, kind, kwargs = task
+        try:
+            if blockchain is None:
+                from .hive import Hive
+                from .blockchain import Blockchain
+                blockchain = Blockchain(hive_instance=Hive(**hive_config), mode=mode)
+            chunk = []
+            for item in _shard_items(blockchain, kind, start, stop, kwargs):
+                chunk.append(item)
+                if len(chunk) >= chunk_size:
+                    results.put((shard_num, "items", chunk))
+                    chunk = []
+            if len(chunk) > 0:
+                results.put((shard_num, "items", chunk))
+            results.put((shard_num, "done", None))
+        except Exception:
+            results.put((shard_num, "error", traceback.format_exc()))
+
+
+class ShardedStream(object):
+    """ Processes a block range in shards by worker processes
+
+        :param dict hive_config: parameters of the :class:`bhive.hive.Hive` instance
+            which is created by each worker (see :func:`get_hive_config`)
+        :param str mode: ``irreversible`` (default) or ``head``
+        :param int processes: number of worker processes (default is 4)
+        :param int shard_size: number of blocks of each shard (default is 1000)
+        :param bool ordered: Results are yielded in block order, when True (default).
+            Otherwise, they are yielded as soon as they are received.
+        :param int queue_size: maximum number of chunks in the result queue
+            (default is ``4 * processes``)
+        :param int chunk_size: number of results, which are sent together
+            through the queue (default is 100)
+        :param str start_method: multiprocessing start method (e.g. ``spawn``),
+            the platform default is used when not set
+
+        Each worker creates its own Hive and Blockchain instance, only the
+        picklable hive_config is sent to it. At most ``processes`` shards are
+        processed at the same time. Results of shards which have finished
+        before an earlier shard are kept until they can be yielded, in ordered
+        mode no new shard is started more than ``2 * processes`` shards
+        ahead of the oldest unfinished one.
+    """
+    def __init__(self, hive_config, mode="irreversible", processes=4, shard_size=1000, ordered=True, queue_size=None,
+                 chunk_size=100, start_method=None):
+        self.hive_config = hive_config
+        self.mode = mode
+        self.processes = max(1, int(processes))
+        self.shard_size = shard_size
+        self.ordered = ordered
+        self.queue_size = queue_size or 4 * self.processes
+        self.chunk_size = chunk_size
+        self.start_method = start_method
+
+    def run(self, kind, start, stop, kwargs=None):
+        """ Yields the results of all shards from start to stop
+
+            :param str kind: ``blocks`` yields the blocks (as dict or
+                :class:`bhive.records.BlockRecord`) of
+                :func:`bhive.blockchain.Blockchain.blocks`, ``stream``
+                yields ``(position, op)`` tuples of
+                :func:`bhive.blockchain.Blockchain.stream`, ``ops_statistics``
+                yields one :class:`bhive.opsstatistics.OpsStatistics` per shard
+            :param dict kwargs: parameters of blocks or stream, must be picklable
+        """
+        shards = get_shards(start, stop, self.shard_size)
+        if len(shards) == 0:
+            return
+        if self.start_method is not None:
+            context = multiprocessing.get_context(self.start_method)
+        else:
+            context = multiprocessing
+        tasks = context.Queue()
+        results = context.Queue(self.queue_size)
+        n_workers = min(self.processes, len(shards))
+        workers = []
+        for i in range(n_workers):
+            worker = context.Process(target=_shard_worker,
+                                     args=(self.hive_config, self.mode, tasks, results, self.chunk_size))
+            worker.daemon = True
+            worker.start()
+            workers.append(worker)
+        max_ahead = 2 * n_workers if self.ordered else len(shards)
+        next_shard = 0
+        running = 0
+        current = 0
+        done = set()
+        buffered = {}
+        finished = False
+        try:
+            while current < len(shards):
+                while next_shard < len(shards) and running < n_workers and next_shard - current < max_ahead:
+                    tasks.put((next_shard, shards[next_shard][0], shards[next_shard][1], kind, kwargs or {}))
+                    next_shard += 1
+                    running += 1
+                shard_num, status, data = self._get_result(results, workers)
+                if status == "error":
+                    raise ShardWorkerException("Shard %d (blocks %d - %d) failed:\n%s" % (shard_num, shards[shard_num][0],
+                                                                                       shards[shard_num][1], data))
+                if status == "done":
+                    running -= 1
+                    done.add(shard_num)
+                if not self.ordered:
+                    if status == "items":
+                        for item in data:
+                            yield item
+                    current = len(done)
+                    continue
+                if status == "items":
+                    buffered.setdefault(shard_num, []).extend(data)
+                while current < len(shards):
+                    items = buffered.pop(current, None)
+                    if items is not None:
+                        for item in items:
+                            yield item
+                    if current not in done:
+                        break
+                    current += 1
+            finished = True
+        finally:
+            for worker in workers:
+                if finished:
+                    tasks.put(None)
+                else:
+                    worker.terminate()
+            for worker in workers:
+                worker.join(10)
+                if worker.is_alive():
+                    worker.terminate()
+            tasks.close()
+            results.close()
+
+    @staticmethod
+    def _get_result(results, workers):
+        while True:
+            try:
+                return results.get(timeout=1)
+            except Empty:
+                for worker in workers:
+                    if not worker.is_alive():
+                        raise ShardWorkerException("Worker process %s has stopped with exit code %s" % (worker.name, str(worker.exitcode)))
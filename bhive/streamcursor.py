@@ -0,0 +1,183 @@
+# This Python file uses the following encoding: utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+import abc
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from six import add_metaclass
+log = logging.getLogger(__name__)
+
+
+@add_metaclass(abc.ABCMeta)
+class CursorStore(object):
+    """ Abstract base class of the stores for :class:`StreamCursor` positions
+
+        A position is the tuple ``(block_num, trx_num, op_num)`` of the
+        last processed operation. Stores implement :func:`load` and
+        :func:`save`, :func:`close` is optional.
+    """
+    @abc.abstractmethod
+    def load(self):
+        """Returns the stored position or None"""
+
+    @abc.abstractmethod
+    def save(self, position):
+        """Stores the position atomically"""
+
+    def close(self):
+        pass
+
+
+class MemoryCursorStore(CursorStore):
+    """ Keeps the position in memory
+
+        :param tuple position: initial position (default is None)
+    """
+    def __init__(self, position=None):
+        self.position = tuple(position) if position is not None else None
+
+    def load(self):
+        return self.position
+
+    def save(self, position):
+        self.position = tuple(position)
+
+
+class FileCursorStore(CursorStore):
+    """ Stores the position as JSON file
+
+        :param str filename: name of the file
+
+        The position is written into a temporary file, which is synced to
+        disk and then renamed to filename. A crash leaves either the old
+        or the new position, but never a broken file.
+    """
+    def __init__(self, filename):
+        self.filename = filename
+
+    def load(self):
+        if not os.path.isfile(self.filename):
+            return None
+        with open(self.filename, "r") as f:
+            data = json.load(f)
+        return (data["block_num"], data["trx_num"], data["op_num"])
+
+    def save(self, position):
+        block_num, trx_num, op_num = position
+        tmp_filename = self.filename + ".tmp"
+        with open(tmp_filename, "w") as f:
+            json.dump({"block_num": block_num, "trx_num": trx_num, "op_num": op_num, "time": time.time()}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        if hasattr(os, "replace"):
+            os.replace(tmp_filename, self.filename)
+        else:
+            os.rename(tmp_filename, self.filename)
+
+
+class SQLiteCursorStore(CursorStore):
+    """ Stores the positions of one or more streams in a SQLite database
+
+        :param str filename: name of the database file
+        :param str name: name of the stream (default is ``default``)
+    """
+    def __init__(self, filename, name="default"):
+        self.filename = filename
+        self.name = name
+        self._local = threading.local()
+        self._get_connection().execute("CREATE TABLE IF NOT EXISTS stream_cursor (name TEXT PRIMARY KEY, "
+                                       "block_num INTEGER, trx_num INTEGER, op_num INTEGER, updated REAL)")
+
+    def _get_connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.filename, timeout=30, isolation_level=None)
+            self._local.connection = connection
+        return connection
+
+    def load(self):
+        row = self._get_connection().execute("SELECT block_num, trx_num, op_num FROM stream_cursor WHERE name = ?",
+                                             (self.name, )).fetchone()
+        if row is None:
+            return None
+        return tuple(row)
+
+    def save(self, position):
+        block_num, trx_num, op_num = position
+        self._get_connection().execute("INSERT OR REPLACE INTO stream_cursor (name, block_num, trx_num, op_num, updated) "
+                                       "VALUES (?, ?, ?, ?, ?)", (self.name, block_num, trx_num, op_num, time.time()))
+
+    def close(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+
+class StreamCursor(object):
+    """ Remembers the last processed operation of :func:`bhive.blockchain.Blockchain.stream`
+
+        :param CursorStore store: stores the position (default is
+            :class:`MemoryCursorStore`)
+        :param int save_interval: The position is stored after
+            save_interval processed operations (default is 100)
+        :param float save_seconds: The position is also stored, when the
+            last store is older than save_seconds (default is 10)
+
+        An operation counts as processed, when the consumer asks ``stream``
+        for the next operation. The position is stored when the stream
+        ends or is closed. A stream started with the cursor continues after
+        the stored position, so that no operation is delivered twice or skipped
+        (as long as the same opNames and filters are used).
+
+        .. code-block:: python
+
+            from bhive.blockchain import Blockchain
+            from bhive.streamcursor import StreamCursor, FileCursorStore
+            cursor = StreamCursor(FileCursorStore("transfers.cursor"))
+            b = Blockchain()
+            for op in b.stream(opNames=["transfer"], start=42000000, cursor=cursor):
+                print(op)
+
+    """
+    def __init__(self, store=None, save_interval=100, save_seconds=10.):
+        self.store = store if store is not None else MemoryCursorStore()
+        self.save_interval = save_interval
+        self.save_seconds = save_seconds
+        self.position = self.store.load()
+        self._saved_position = self.position
+        self._unsaved = 0
+        self._last_save = time.time()
+
+    @property
+    def block_num(self):
+        """Block number of the last processed operation or None"""
+        if self.position is None:
+            return None
+        return self.position[0]
+
+    def is_processed(self, position):
+        """Returns True, when the operation at position was already processed"""
+        return self.position is not None and tuple(position) <= self.position
+
+    def update(self, position):
+        """Marks the operation at position as processed and stores it, when the interval is reached"""
+        self.position = tuple(position)
+        self._unsaved += 1
+        if self._unsaved >= self.save_interval or \
+           (self.save_seconds is not None and time.time() - self._last_save >= self.save_seconds):
+            self.save()
+
+    def save(self):
+        """Stores the position, when it has changed"""
+        if self.position is not None and self.position != self._saved_position:
+            self.store.save(self.position)
+            self._saved_position = self.position
+        self._unsaved = 0
+        self._last_save = time.time()
@@ -0,0 +1,195 @@
+# This Python file uses the following encoding: utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+from builtins import str
+import threading
+from future.utils import string_types
+
+#: Fields of each operation type which contain account names
+account_fields = {
+    'vote': ('voter', 'author'),
+    'comment': ('parent_author', 'author'),
+    'transfer': ('from', 'to'),
+    'transfer_to_vesting': ('from', 'to'),
+    'withdraw_vesting': ('account', ),
+    'limit_order_create': ('owner', ),
+    'limit_order_cancel': ('owner', ),
+    'feed_publish': ('publisher', ),
+    'convert': ('owner', ),
+    'account_create': ('creator', 'new_account_name'),
+    'account_update': ('account', ),
+    'witness_update': ('owner', ),
+    'account_witness_vote': ('account', 'witness'),
+    'account_witness_proxy': ('account', 'proxy'),
+    'pow': ('worker_account', ),
+    'custom': ('required_auths', ),
+    'report_over_production': ('reporter', ),
+    'delete_comment': ('author', ),
+    'custom_json': ('required_auths', 'required_posting_auths'),
+    'comment_options': ('author', ),
+    'set_withdraw_vesting_route': ('from_account', 'to_account'),
+    'limit_order_create2': ('owner', ),
+    'claim_account': ('creator', ),
+    'create_claimed_account': ('creator', 'new_account_name'),
+    'request_account_recovery': ('recovery_account', 'account_to_recover'),
+    'recover_account': ('account_to_recover', ),
+    'change_recovery_account': ('account_to_recover', 'new_recovery_account'),
+    'escrow_transfer': ('from', 'to', 'agent'),
+    'escrow_dispute': ('from', 'to', 'agent', 'who'),
+    'escrow_release': ('from', 'to', 'agent', 'who', 'receiver'),
+    'pow2': (),
+    'escrow_approve': ('from', 'to', 'agent', 'who'),
+    'transfer_to_savings': ('from', 'to'),
+    'transfer_from_savings': ('from', 'to'),
+    'cancel_transfer_from_savings': ('from', ),
+    'custom_binary': ('required_owner_auths', 'required_active_auths', 'required_posting_auths'),
+    'decline_voting_rights': ('account', ),
+    'reset_account': ('reset_account', 'account_to_reset'),
+    'set_reset_account': ('account', 'current_reset_account', 'reset_account'),
+    'claim_reward_balance': ('account', ),
+    'delegate_vesting_shares': ('delegator', 'delegatee'),
+    'account_create_with_delegation': ('creator', 'new_account_name'),
+    'witness_set_properties': ('owner', ),
+    'account_update2': ('account', ),
+    'create_proposal': ('creator', 'receiver'),
+    'update_proposal_votes': ('voter', ),
+    'remove_proposal': ('proposal_owner', ),
+    # virtual operations
+    'fill_convert_request': ('owner', ),
+    'author_reward': ('author', ),
+    'curation_reward': ('curator', 'comment_author'),
+    'comment_reward': ('author', ),
+    'liquidity_reward': ('owner', ),
+    'interest': ('owner', ),
+    'fill_vesting_withdraw': ('from_account', 'to_account'),
+    'fill_order': ('current_owner', 'open_owner'),
+    'shutdown_witness': ('owner', ),
+    'fill_transfer_from_savings': ('from', 'to'),
+    'hardfork': (),
+    'comment_payout_update': ('author', ),
+    'return_vesting_delegation': ('account', ),
+    'comment_benefactor_reward': ('benefactor', 'author'),
+    'producer_reward': ('producer', ),
+    'clear_null_account_balance': (),
+    'proposal_pay': ('receiver', ),
+    'sps_fund': (),
+    'hps_fund': (),
+    'hardfork_hive': ('account', 'treasury'),
+    'hardfork_hive_restore': ('account', 'treasury'),
+    'delayed_voting': ('voter', ),
+    'consolidate_treasury_balance': (),
+    'effective_comment_vote': ('voter', 'author'),
+    'ineffective_delete_comment': ('author', ),
+    'sps_convert': ('fund_account', ),
+}
+
+#: Fields which are checked for unknown operation types
+default_account_fields = ('account', 'from', 'to', 'author', 'voter', 'owner', 'creator',
+                          'required_auths', 'required_posting_auths')
+
+
+class AccountWatchlist(object):
+    """ Set of account names, which is used to select operations
+
+        :param list accounts: account names
+        :param dict fields: overwrites or extends the account fields
+            of the operation types (default is ``account_fields``)
+
+        Each operation is checked by looking up the account fields of
+        its type in the set, so the check does not depend on the
+        number of watched accounts. Accounts can be added and removed
+        while a stream is running.
+
+        .. code-block:: python
+
+            from bhive.blockchain import Blockchain
+            from bhive.watchlist import AccountWatchlist
+            watchlist = AccountWatchlist(["holger80", "gtg"])
+            b = Blockchain()
+            for op in b.stream(opNames=["transfer", "vote"], accounts=watchlist):
+                print(op)
+                if op["type"] == "transfer":
+                    # follow the money
+                    watchlist.add(op["to"])
+
+    """
+    def __init__(self, accounts=None, fields=None):
+        self.account_fields = dict(account_fields)
+        if fields is not None:
+            self.account_fields.update(fields)
+        self._lock = threading.Lock()
+        self._accounts = set()
+        if accounts is not None:
+            self.update(accounts)
+
+    def __contains__(self, account):
+        return account in self._accounts
+
+    def __len__(self):
+        return len(self._accounts)
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._accounts))
+
+    def add(self, account):
+        """Adds an account name"""
+        with self._lock:
+            self._accounts.add(str(account))
+
+    def remove(self, account):
+        """Removes an account name, no error is raised when it is not watched"""
+        with self._lock:
+            self._accounts.discard(str(account))
+
+    def update(self, accounts):
+        """Adds a list of account names"""
+        with self._lock:
+            self._accounts.update([str(account) for account in accounts])
+
+    def clear(self):
+        """Removes all accounts"""
+        with self._lock:
+            self._accounts.clear()
+
+    def get_fields(self, op_type):
+        """Returns the account fields of an operation type (with or without ``_operation`` suffix)"""
+        fields = self.account_fields.get(op_type)
+        if fields is None and op_type.endswith("_operation"):
+            fields = self.account_fields.get(op_type[:-10])
+        if fields is None:
+            return default_account_fields
+        return fields
+
+    def get_accounts(self, op_type, op):
+        """Returns all account names of an operation"""
+        accounts = []
+        for field in self.get_fields(op_type):
+            value = op.get(field)
+            if isinstance(value, string_types):
+                accounts.append(value)
+            elif isinstance(value, list):
+                accounts.extend(value)
+        return accounts
+
+    def matches(self, op_type, op):
+        """ Returns True, when one of the account fields of the operation
+            contains a watched account
+
+            :param str op_type: operation type
+            :param dict op: operation value
+        """
+        accounts = self._accounts
+        for field in self.get_fields(op_type):
+            value = op.get(field)
+            if value is None:
+                continue
+            if isinstance(value, list):
+                for account in value:
+                    if account in accounts:
+                        return True
+            elif value in accounts:
+                return True
+        return False
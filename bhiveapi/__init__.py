@@ -1,4 +1,5 @@
 """ bhiveapi."""
+import sys
 from .version import version as __version__
 __all__ = [
     "hivenoderpc",
@@ -7,4 +8,11 @@ __all__ = [
     "rpcutils",
     "graphenerpc",
     "node",
+    "wspipeline",
+    "codec",
+    "rpccache",
+    "metrics",
 ]
+# async/await needs Python 3.5
+if sys.version_info >= (3, 5):
+    __all__.append("asynchivenoderpc")
@@ -0,0 +1,412 @@
+# This Python file uses the following encoding: utf-8
+"""asyncio based HiveNodeRPC (Python 3 only)."""
+import asyncio
+import base64
+import logging
+import re
+import ssl
+import time
+from urllib.parse import urlsplit
+from .hivenoderpc import HiveNodeRPC
+from .node import Nodes, CallRetries
+from .rpcutils import (
+    is_network_appbase_ready,
+    get_api_name, get_query
+)
+from . import exceptions
+from . import codec
+from bhivegraphenebase.version import version as bhive_version
+
+log = logging.getLogger(__name__)
+
+
+class AsyncHTTPTransport(object):
+    """ Minimal HTTP/1.1 client with keep-alive connections for JSON-RPC posts
+
+        :param int max_connections: Maximum number of open connections per node (default is 100)
+        :param int timeout: Timeout in seconds for a single request (default is 60)
+    """
+    def __init__(self, max_connections=100, timeout=60):
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._idle = {}
+        self._semaphores = {}
+        self._ssl_context = None
+
+    def _get_ssl_context(self):
+        if self._ssl_context is None:
+            self._ssl_context = ssl.create_default_context()
+        return self._ssl_context
+
+    def _get_semaphore(self, key):
+        if key not in self._semaphores:
+            self._semaphores[key] = asyncio.Semaphore(self.max_connections)
+        return self._semaphores[key]
+
+    async def _open_connection(self, scheme, host, port):
+        if scheme == "https":
+            return await asyncio.open_connection(host, port, ssl=self._get_ssl_context())
+        return await asyncio.open_connection(host, port)
+
+    async def _read_response(self, reader):
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError("Connection closed by node")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            key, _, value = line.decode("latin1").partition(":")
+            headers[key.strip().lower()] = value.strip()
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            body = bytearray()
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    await reader.readline()
+                    break
+                body += await reader.readexactly(size)
+                await reader.readline()
+            body = bytes(body)
+        elif "content-length" in headers:
+            body = await reader.readexactly(int(headers["content-length"]))
+        else:
+            body = await reader.read()
+            headers["connection"] = "close"
+        keep_alive = headers.get("connection", "keep-alive").lower() != "close"
+        return status, body, keep_alive
+
+    async def post(self, url, data, headers, auth=None):
+        """ Posts data to url and returns the tuple (status, body)
+
+            :param str url: Node url
+            :param bytes data: Request body
+            :param dict headers: Additional request headers
+            :param tuple auth: (user, password) for basic authentication
+        """
+        parts = urlsplit(url)
+        scheme = parts.scheme
+        host = parts.hostname
+        port = parts.port or (443 if scheme == "https" else 80)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        key = (scheme, host, port)
+        request = ["POST %s HTTP/1.1" % path, "Host: %s" % parts.netloc,
+                   "Content-Length: %d" % len(data), "Connection: keep-alive"]
+        for k, v in headers.items():
+            request.append("%s: %s" % (k, v))
+        if auth is not None:
+            token = base64.b64encode(("%s:%s" % auth).encode("utf8")).decode("ascii")
+            request.append("Authorization: Basic %s" % token)
+        request = ("\r\n".join(request) + "\r\n\r\n").encode("latin1") + data
+
+        async with self._get_semaphore(key):
+            idle = self._idle.setdefault(key, [])
+            while True:
+                reused = len(idle) > 0
+                if reused:
+                    reader, writer = idle.pop()
+                else:
+                    reader, writer = await asyncio.wait_for(self._open_connection(scheme, host, port), self.timeout)
+                try:
+                    writer.write(request)
+                    await writer.drain()
+                    status, body, keep_alive = await asyncio.wait_for(self._read_response(reader), self.timeout)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    writer.close()
+                    if reused:
+                        # stale keep-alive connection, try again with a fresh one
+                        continue
+                    raise
+                except BaseException:
+                    writer.close()
+                    raise
+                break
+            if keep_alive:
+                idle.append((reader, writer))
+            else:
+                writer.close()
+        return status, body
+
+    async def close(self):
+        """Closes all idle connections"""
+        for key in list(self._idle):
+            for reader, writer in self._idle.pop(key):
+                writer.close()
+
+
+class AsyncHiveNodeRPC(HiveNodeRPC):
+    """ This class allows to call API methods exposed by the witness node
+        from an asyncio event loop. All rpc calls are coroutines.
+
+        :param str urls: Either a single Http URL, or a list of URLs
+        :param str user: Username for Authentication
+        :param str password: Password for Authentication
+        :param int num_retries: Try x times to num_retries to a node on disconnect, -1 for indefinitely
+        :param int num_retries_call: Repeat num_retries_call times a rpc call on node error (default is 5)
+        :param int timeout: Timeout setting for https nodes (default is 60)
+        :param int max_connections: Maximum number of parallel connections per node (default is 100)
+        :param bool use_condenser: Use the old condenser_api rpc protocol on nodes with version
+            0.19.4 or higher. The settings has no effect on nodes with version of 0.19.3 or lower.
+
+        Only http(s) nodes are supported, websocket urls are ignored.
+        The connection to the first node is established on the first call
+        (or by awaiting :func:`rpcconnect`).
+
+        .. code-block:: python
+
+            import asyncio
+            from bhiveapi.asynchivenoderpc import AsyncHiveNodeRPC
+
+            async def main():
+                rpc = AsyncHiveNodeRPC(["https://api.hive.blog", "https://anyx.io"])
+                blocks = await asyncio.gather(*[rpc.get_block({"block_num": n}, api="block")
+                                                for n in range(1, 101)])
+                await rpc.close()
+
+            asyncio.run(main())
+
+        Returned dicts can be passed on to ``Block``, ``Account`` and
+        other ``BlockchainObject`` classes.
+
+    """
+
+    def __init__(self, urls, user=None, password=None, **kwargs):
+        kwargs["autoconnect"] = False
+        super(AsyncHiveNodeRPC, self).__init__(urls, user, password, **kwargs)
+        http_urls = [self.nodes[i].url for i in range(len(self.nodes)) if self.nodes[i].url[:4] == "http"]
+        if len(http_urls) < len(self.nodes):
+            log.warning("AsyncHiveNodeRPC supports only http(s) nodes, websocket nodes are ignored")
+        self.nodes = Nodes(http_urls, self.nodes.num_retries, self.nodes.num_retries_call)
+        if self.nodes.working_nodes_count == 0:
+            self.current_rpc = self.rpc_methods["offline"]
+        self.transport = AsyncHTTPTransport(max_connections=kwargs.get("max_connections", 100),
+                                            timeout=self.timeout)
+        self.headers = {'User-Agent': 'bhive v%s' % (bhive_version),
+                        'content-type': 'application/json; charset=utf-8'}
+        self._connect_lock = None
+        self._connected = False
+
+    async def __aenter__(self):
+        await self.rpcconnect(next_url=False)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        """Closes all open connections"""
+        await self.transport.close()
+
+    def next(self):
+        """ Switches to the next node url
+
+            As this is not a coroutine, the rpc protocol of the new node is not
+            detected here. The connection is marked as not connected, so that
+            :func:`rpcconnect` detects it before the next call. A call in
+            progress is sent unchanged to the new node; its query uses the format
+            of the previous node, which appbase nodes accept in both protocols.
+        """
+        self.url = next(self.nodes)
+        self._connected = False
+        log.debug("Switched to node %s" % self.url)
+
+    def _switch_node_after_error(self, msg, url=None, call=None):
+        """ Counts an error of the current node and switches to the next node,
+            unless another coroutine has already switched away from url.
+            No lock is needed, as nothing is awaited in between.
+        """
+        if url is not None and url != self.url:
+            return False
+        self.nodes.increase_error_cnt()
+        self.nodes.sleep_and_check_retries(msg, sleep=False, call_retry=False, call=call)
+        self.next()
+        return True
+
+    @staticmethod
+    async def _wait(call):
+        """Awaits the wait time before the next retry of call"""
+        sleeptime = call.sleeptime
+        call.sleeptime = 0
+        if sleeptime > 0:
+            await asyncio.sleep(sleeptime)
+
+    def rpcclose(self):
+        pass
+
+    async def rpcconnect(self, next_url=True):
+        """Connect to next url and detect the rpc protocol of the node"""
+        if self.nodes.working_nodes_count == 0:
+            return
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            if not next_url and self._connected:
+                return
+            self._connected = False
+            # retry state of the connection attempts, the wait time is awaited
+            connect_call = CallRetries(self.nodes.num_retries_call, defer_sleep=True)
+            while True:
+                if next_url or self.url is None:
+                    self.next()
+                    self.current_rpc = self.rpc_methods["jsonrpc"]
+                try:
+                    if self.disable_chain_detection:
+                        self.current_rpc = self.rpc_methods['appbase']
+                        break
+                    try:
+                        props = None
+                        if not self.use_condenser:
+                            props = await self._call("get_config", (), {"api": "database"})
+                        else:
+                            props = await self._call("get_config", (), {})
+                    except Exception as e:
+                        if re.search("Bad Cast:Invalid cast from type", str(e)):
+                            self.current_rpc = self.rpc_methods['appbase']
+                            props = await self._call("get_config", (), {"api": "database"})
+                    if props is None:
+                        raise exceptions.RPCError("Could not receive answer for get_config")
+                    if is_network_appbase_ready(props):
+                        self.current_rpc = self.rpc_methods["appbase"]
+                    break
+                except (KeyboardInterrupt, asyncio.CancelledError):
+                    raise
+                except Exception as e:
+                    self.nodes.increase_error_cnt()
+                    do_sleep = not next_url or (next_url and self.nodes.working_nodes_count == 1)
+                    self.nodes.sleep_and_check_retries(str(e), sleep=do_sleep, call=connect_call)
+                    await self._wait(connect_call)
+                    next_url = True
+            self._connected = True
+
+    async def request_send(self, payload):
+        auth = None
+        if self.user is not None and self.password is not None:
+            auth = (self.user, self.password)
+        status, body = await self.transport.post(self.url, payload, self.headers, auth=auth)
+        if status == 401:
+            raise exceptions.UnauthorizedError
+        return body
+
+    async def _rpcexec_node(self, payload, call):
+        """Sends the payload and handles connection errors (see GrapheneRPC.rpcexec)"""
+        if self.nodes.working_nodes_count == 0:
+            raise exceptions.WorkingNodeMissing
+        if self.url is None:
+            raise exceptions.RPCConnection("RPC is not connected!")
+        data = codec.dumps(payload)
+        reply = None
+        while True:
+            call.increase_error_cnt_call()
+            call.url = self.url
+            start_time = time.time()
+            try:
+                reply = await self.request_send(data)
+                if not bool(reply):
+                    try:
+                        self.nodes.sleep_and_check_retries("Empty Reply", call_retry=True, call=call)
+                    except exceptions.CallRetriesReached:
+                        self._retry_on_next_node("Empty Reply", call=call)
+                    await self._wait(call)
+                else:
+                    self.nodes.record_latency(time.time() - start_time)
+                    break
+            except (KeyboardInterrupt, asyncio.CancelledError):
+                raise
+            except exceptions.UnauthorizedError:
+                raise
+            except Exception as e:
+                self._retry_on_next_node(str(e) or e.__class__.__name__, call=call)
+
+        ret = {}
+        try:
+            ret = codec.loads(reply)
+        except ValueError:
+            self._check_for_server_error(reply.decode("utf8", "replace"))
+        return self._get_result_from_reply(ret)
+
+    async def rpcexec(self, payload, call=None):
+        """ Execute a call by sending the payload.
+            In here, we mostly deal with Hive specific error handling
+            (see HiveNodeRPC.rpcexec)
+
+            :param json payload: Payload data
+            :param CallRetries call: retry state of this call (default is a new one
+                with ``num_retries_call`` retries)
+            :raises ValueError: if the server does not respond in proper JSON format
+            :raises RPCError: if the server returns an error
+        """
+        if self.url is None:
+            raise exceptions.RPCConnection("RPC is not connected!")
+        if call is None:
+            call = CallRetries(self.nodes.num_retries_call, defer_sleep=True)
+        next_node_on_empty_reply = self.next_node_on_empty_reply
+        self.next_node_on_empty_reply = False
+        doRetry = True
+        maxRetryCountReached = False
+        while doRetry and not maxRetryCountReached:
+            doRetry = False
+            try:
+                reply = await self._rpcexec_node(payload, call)
+                if next_node_on_empty_reply and not bool(reply) and self.nodes.working_nodes_count > 1:
+                    self._retry_on_next_node("Empty Reply", call=call)
+                    doRetry = True
+                else:
+                    return reply
+            except exceptions.RPCErrorDoRetry as e:
+                msg = exceptions.decodeRPCErrorMsg(e).strip()
+                try:
+                    self.nodes.sleep_and_check_retries(str(msg), call_retry=True, call=call)
+                    doRetry = True
+                except exceptions.CallRetriesReached:
+                    if self.nodes.working_nodes_count > 1:
+                        self._retry_on_next_node(msg, call=call)
+                        doRetry = True
+                    else:
+                        raise exceptions.CallRetriesReached
+            except exceptions.RPCError as e:
+                try:
+                    doRetry = self._check_error_message(e, call.error_cnt_call, call=call)
+                except exceptions.CallRetriesReached:
+                    msg = exceptions.decodeRPCErrorMsg(e).strip()
+                    if self.nodes.working_nodes_count > 1:
+                        self._retry_on_next_node(msg, call=call)
+                        doRetry = True
+                    else:
+                        raise exceptions.CallRetriesReached
+            await self._wait(call)
+            maxRetryCountReached = call.num_retries_call_reached
+
+    async def _call(self, name, args, kwargs):
+        api_name = get_api_name(self.is_appbase_ready(), *args, **kwargs)
+        if self.is_appbase_ready() and self.use_condenser:
+            api_name = "condenser_api"
+        if (api_name is None):
+            api_name = 'database_api'
+
+        # let's be able to define the num_retries per query
+        call = CallRetries(kwargs.get("num_retries_call", self.nodes.num_retries_call), defer_sleep=True)
+        add_to_queue = kwargs.get("add_to_queue", False)
+        query = get_query(self.is_appbase_ready() and not self.use_condenser, self.get_request_id(), api_name, name, args)
+        if add_to_queue:
+            self.rpc_queue.append(query)
+            return None
+        elif len(self.rpc_queue) > 0:
+            self.rpc_queue.append(query)
+            query = self.rpc_queue
+            self.rpc_queue = []
+        return await self.rpcexec(query, call=call)
+
+    def __getattr__(self, name):
+        """Map all methods to awaitable RPC calls and pass through the arguments."""
+        if name.startswith("__"):
+            raise AttributeError(name)
+
+        async def method(*args, **kwargs):
+            if not self._connected:
+                await self.rpcconnect(next_url=False)
+            return await self._call(name, args, kwargs)
+        return method
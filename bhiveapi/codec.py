@@ -0,0 +1,117 @@
+# This Python file uses the following encoding: utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+import json
+import logging
+JSON_MODULE = None
+if not JSON_MODULE:
+    try:
+        import orjson
+        JSON_MODULE = "orjson"
+    except ImportError:
+        JSON_MODULE = None
+if not JSON_MODULE:
+    try:
+        import ujson
+        JSON_MODULE = "ujson"
+    except ImportError:
+        JSON_MODULE = None
+if not JSON_MODULE:
+    JSON_MODULE = "json"
+
+log = logging.getLogger(__name__)
+
+
+def _orjson_default(obj):
+    # subclasses of dict may compute items lazily (e.g. bhive.blockchain.StreamOperation)
+    if isinstance(obj, dict):
+        return dict(obj.items())
+    if isinstance(obj, list):
+        return list(obj)
+    raise TypeError
+
+
+class JsonCodec(object):
+    """ Encodes and decodes JSON-RPC payloads with the fastest installed JSON library
+
+        :param str module: ``orjson``, ``ujson`` or ``json`` (default is the
+            fastest installed module, see ``JSON_MODULE``)
+
+        Payloads which the fast library cannot handle (e.g. integers with more
+        than 64 bit or control characters in strings) are processed by
+        the stdlib ``json`` module.
+    """
+    def __init__(self, module=None):
+        self.module = module or JSON_MODULE
+        if self.module == "orjson":
+            self._dumps = self._orjson_dumps
+            self._loads = orjson.loads
+        elif self.module == "ujson":
+            self._dumps = self._ujson_dumps
+            self._loads = ujson.loads
+        elif self.module == "json":
+            self._dumps = self._json_dumps
+            self._loads = self._json_loads
+        else:
+            raise ValueError("Unknown JSON module %s" % str(self.module))
+
+    @staticmethod
+    def _json_dumps(obj):
+        return json.dumps(obj, ensure_ascii=False).encode('utf8')
+
+    @staticmethod
+    def _json_loads(data):
+        if isinstance(data, bytes):
+            data = data.decode('utf8')
+        return json.loads(data, strict=False)
+
+    @staticmethod
+    def _orjson_dumps(obj):
+        return orjson.dumps(obj, default=_orjson_default, option=orjson.OPT_PASSTHROUGH_SUBCLASS)
+
+    @staticmethod
+    def _ujson_dumps(obj):
+        return ujson.dumps(obj, ensure_ascii=False).encode('utf8')
+
+    def dumps(self, obj):
+        """Returns obj as utf8 encoded JSON bytes"""
+        try:
+            return self._dumps(obj)
+        except (TypeError, ValueError, OverflowError):
+            return self._json_dumps(obj)
+
+    def loads(self, data):
+        """Decodes JSON given as str or as utf8 encoded bytes"""
+        try:
+            return self._loads(data)
+        except (ValueError, OverflowError):
+            return self._json_loads(data)
+
+
+_codec = JsonCodec()
+
+
+def set_json_module(module):
+    """ Selects the JSON library used by :func:`dumps` and :func:`loads`
+
+        :param str module: ``orjson``, ``ujson`` or ``json``
+    """
+    global _codec
+    _codec = JsonCodec(module)
+
+
+def get_json_module():
+    """Returns the name of the JSON library in use"""
+    return _codec.module
+
+
+def dumps(obj):
+    """Returns obj as utf8 encoded JSON bytes"""
+    return _codec.dumps(obj)
+
+
+def loads(data):
+    """Decodes JSON given as str or as utf8 encoded bytes"""
+    return _codec.loads(data)
@@ -7,6 +7,8 @@ from builtins import next
 from builtins import str
 from builtins import object
 from itertools import cycle
+from collections import deque
+import copy
 import threading
 import sys
 import json
@@ -21,10 +23,14 @@ from .exceptions import (
     UnauthorizedError, RPCConnection, RPCError, RPCErrorDoRetry, NumRetriesReached, CallRetriesReached, WorkingNodeMissing, TimeoutException
 )
 from .rpcutils import (
-    is_network_appbase_ready,
+    is_network_appbase_ready, is_broadcast_query, sort_batch_reply, get_api_method,
     get_api_name, get_query
 )
-from .node import Nodes
+from .node import Nodes, CallRetries
+from . import codec
+from .rpccache import RPCCache
+from .metrics import RPCMetrics
+from .wspipeline import WebsocketPipeline, get_request_ids
 from bhivegraphenebase.version import version as bsteem_version
 from bhivegraphenebase.chains import known_chains
 if sys.version_info[0] < 3:
@@ -39,6 +45,13 @@ if not WEBSOCKET_MODULE:
         WEBSOCKET_MODULE = "websocket"
     except ImportError:
         WEBSOCKET_MODULE = None
+FUTURES_MODULE = None
+if not FUTURES_MODULE:
+    try:
+        from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+        FUTURES_MODULE = "futures"
+    except ImportError:
+        FUTURES_MODULE = None
 REQUEST_MODULE = None
 if not REQUEST_MODULE:
     try:
@@ -72,6 +85,17 @@ def shared_session_instance():
     return SessionInstance.instance
 
 
+def create_session_instance(pool_maxsize=10, pool_connections=10):
+    """Returns a new session, which keeps up to pool_maxsize connections per node alive"""
+    if REQUEST_MODULE is None:
+        raise Exception()
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
 def create_ws_instance(use_ssl=True, enable_multithread=True):
     """Get websocket instance"""
     if WEBSOCKET_MODULE is None:
@@ -84,6 +108,40 @@ def create_ws_instance(use_ssl=True, enable_multithread=True):
         return websocket.WebSocket(enable_multithread=enable_multithread)
 
 
+class NodeConnection(object):
+    """ Transport to a node, which is replaced as a whole when the node is switched
+
+        A call reads the connection once for each try, so that it never uses the
+        url of one node together with the transport or rpc format of another one.
+    """
+    __slots__ = ["url", "node", "ws", "ws_pipeline", "session", "headers", "current_rpc"]
+
+    def __init__(self, url, node=None, ws=None, ws_pipeline=None, session=None, headers=None, current_rpc=None):
+        self.url = url
+        self.node = node
+        self.ws = ws
+        self.ws_pipeline = ws_pipeline
+        self.session = session
+        self.headers = headers
+        self.current_rpc = current_rpc
+
+    def replace(self, **kwargs):
+        """Returns a copy in which the given attributes are replaced"""
+        conn = NodeConnection(**dict((key, getattr(self, key)) for key in self.__slots__))
+        for key, value in kwargs.items():
+            setattr(conn, key, value)
+        return conn
+
+
+class InFlightCall(object):
+    """A call which is in progress, identical calls wait for its result"""
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
 class GrapheneRPC(object):
     """
     This class allows to call API methods synchronously, without callbacks.
@@ -100,6 +158,38 @@ class GrapheneRPC(object):
     :param bool use_condenser: Use the old condenser_api rpc protocol on nodes with version
         0.19.4 or higher. The settings has no effect on nodes with version of 0.19.3 or lower.
     :param dict custom_chains: custom chain which should be added to the known chains
+    :param bool ws_pipelining: When True, websocket requests from several threads are sent
+        without waiting for earlier replies, the replies are matched by their id (default is False)
+    :param int node_reschedule_interval: Every node_reschedule_interval calls, it is checked if
+        a https node with a clearly lower measured latency score is available, which is then used.
+        A node without measurement is probed instead by sending the call to it in the background,
+        the current connection is kept. Disabled for 0 and when only one node is given (default is 0)
+    :param bool hedge_requests: When True, a read-only call to a https node, which has not returned
+        within the hedge_percentile of the observed latencies, is sent to a second node as well.
+        The first reply is used. Broadcast calls are never hedged (default is False)
+    :param float hedge_percentile: Latency percentile after which a call is hedged (default is 95)
+    :param int hedge_min_samples: Number of measured calls needed before hedging starts (default is 20)
+    :param int hedge_max_calls: Number of calls which can be hedged at the same time, further calls
+        are sent without hedging. The losing request of a hedged call keeps running until it
+        has finished or the remaining timeout of the call has passed (default is 8)
+    :param bool batch_fanout: When True, a queued batch call (``add_to_queue``) to https nodes is split
+        into sub-batches, which are sent in parallel to several working nodes (default is False)
+    :param int fanout_batch_size: Maximum number of calls in a sub-batch (default is 50)
+    :param int fanout_max_nodes: Maximum number of nodes used in parallel for a batch (default is 4)
+    :param RPCCache rpc_cache: Stores results which can never change (e.g. irreversible blocks) on disk
+        and answers repeated calls from it. Results are stored separately for the chain id of the
+        connected node. A directory name can be given instead of a
+        :class:`bhiveapi.rpccache.RPCCache` object (default is None)
+    :param int pool_maxsize: When set, the client uses its own session which keeps up to pool_maxsize
+        connections per node alive. Should be set to the number of threads using the client.
+        When not set, the shared session is used (default is None)
+    :param bool metrics: When True, call counts, latencies, bytes, retries, node switches and
+        empty replies are recorded per api.method and per node in ``metrics``
+        (:class:`bhiveapi.metrics.RPCMetrics`). An existing RPCMetrics object can be given
+        to share it between clients (default is False)
+    :param bool coalesce_requests: When True, identical calls (same api, method and params) which
+        are sent at the same time from several threads share a single request. Every
+        caller receives its own copy of the result (default is False)
 
     Available APIs:
 
@@ -129,6 +219,7 @@ class GrapheneRPC(object):
         self.rpc_methods = {'offline': -1, 'ws': 0, 'jsonrpc': 1, 'wsappbase': 2, 'appbase': 3}
         self.current_rpc = self.rpc_methods["ws"]
         self._request_id = 0
+        self._request_id_lock = threading.Lock()
         self.timeout = kwargs.get('timeout', 60)
         num_retries = kwargs.get("num_retries", 100)
         num_retries_call = kwargs.get("num_retries_call", 5)
@@ -142,18 +233,99 @@ class GrapheneRPC(object):
                     self.known_chains[c] = custom_chain[c]
 
         self.nodes = Nodes(urls, num_retries, num_retries_call)
+        self.node_reschedule_interval = kwargs.get("node_reschedule_interval", 0)
+        self._calls_since_reschedule = 0
+        self.hedge_requests = kwargs.get("hedge_requests", False) and FUTURES_MODULE is not None
+        self.hedge_percentile = kwargs.get("hedge_percentile", 95)
+        self.hedge_min_samples = kwargs.get("hedge_min_samples", 20)
+        self.hedge_max_calls = kwargs.get("hedge_max_calls", 8)
+        self.hedge_stats = {"hedged": 0, "hedge_wins": 0}
+        self._hedge_lock = threading.Lock()
+        # a hedged call holds a slot until both of its requests have finished
+        self._hedge_slots = threading.Semaphore(self.hedge_max_calls)
+        self._latencies = deque(maxlen=500)
+        self._hedge_executor = None
+        self._probe_executor = None
+        self.batch_fanout = kwargs.get("batch_fanout", False) and FUTURES_MODULE is not None
+        self.fanout_batch_size = kwargs.get("fanout_batch_size", 50)
+        self.fanout_max_nodes = kwargs.get("fanout_max_nodes", 4)
+        self.rpc_cache = kwargs.get("rpc_cache", None)
+        if isinstance(self.rpc_cache, six.string_types):
+            self.rpc_cache = RPCCache(self.rpc_cache)
+        self.coalesce_requests = kwargs.get("coalesce_requests", False)
+        self.metrics = kwargs.get("metrics", False)
+        if self.metrics is True:
+            self.metrics = RPCMetrics()
+        elif not self.metrics:
+            self.metrics = None
+        self.coalesce_stats = {"hits": 0, "misses": 0}
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
         if self.nodes.working_nodes_count == 0:
             self.current_rpc = self.rpc_methods["offline"]
 
         self.user = user
         self.password = password
         self.ws = None
+        self.ws_pipelining = kwargs.get("ws_pipelining", False)
+        self.ws_pipeline = None
         self.url = None
         self.session = None
-        self.rpc_queue = []
+        self.headers = {'User-Agent': 'bhive v%s' % (bsteem_version),
+                        'content-type': 'application/json; charset=utf-8'}
+        # url, ws, session and current_rpc of the connected node, published together
+        self._connection = None
+        self.pool_maxsize = kwargs.get("pool_maxsize", None)
+        self._connect_lock = threading.RLock()
+        self._ws_lock = threading.RLock()
+        self._local = threading.local()
         if kwargs.get("autoconnect", True):
             self.rpcconnect()
 
+    @property
+    def rpc_queue(self):
+        """Queued calls of the calling thread (see ``add_to_queue``)"""
+        if not hasattr(self._local, "rpc_queue"):
+            self._local.rpc_queue = []
+        return self._local.rpc_queue
+
+    @rpc_queue.setter
+    def rpc_queue(self, rpc_queue):
+        self._local.rpc_queue = rpc_queue
+
+    @property
+    def last_response_size(self):
+        """Size in bytes of the last reply received by the calling thread (0 for websocket replies)"""
+        return getattr(self._local, "last_response_size", 0)
+
+    def get_session(self):
+        """Returns the own session, when pool_maxsize is set, otherwise the shared session"""
+        if self.pool_maxsize is None:
+            return shared_session_instance()
+        if self.session is None or self.session is SessionInstance.instance:
+            self.session = create_session_instance(pool_maxsize=self.pool_maxsize,
+                                                   pool_connections=max(len(self.nodes), 1))
+        return self.session
+
+    def resize_connection_pool(self, pool_maxsize):
+        """ Makes sure that at least pool_maxsize connections per node are kept alive,
+            so that pool_maxsize threads can share this client
+        """
+        if self.pool_maxsize is not None and self.pool_maxsize >= pool_maxsize:
+            return
+        self.pool_maxsize = pool_maxsize
+        with self._connect_lock:
+            conn = self._connection
+            if conn is not None and conn.ws is None:
+                # calls in progress keep using the old session
+                self.session = create_session_instance(pool_maxsize=self.pool_maxsize,
+                                                       pool_connections=max(len(self.nodes), 1))
+                self._connection = conn.replace(session=self.session)
+
+    def is_thread_safe(self):
+        """Returns True, when several threads can send calls at the same time"""
+        return self.ws is None or self.ws_pipeline is not None
+
     @property
     def num_retries(self):
         return self.nodes.num_retries
@@ -164,16 +336,49 @@ class GrapheneRPC(object):
 
     @property
     def error_cnt_call(self):
-        return self.nodes.error_cnt_call
+        """Error count of the rpc call in progress in the calling thread"""
+        call = getattr(self._local, "call_retries", None)
+        if call is None:
+            return 0
+        return call.error_cnt_call
+
+    def _get_call_retries(self):
+        """ Returns the retry state of the rpc call of the calling thread
+
+            Calls from several threads keep separate retry counters, a
+            nested call (e.g. get_config while connecting) has its own.
+        """
+        call = getattr(self._local, "call_retries", None)
+        if call is None:
+            call = CallRetries(self.nodes.num_retries_call)
+            self._local.call_retries = call
+        return call
+
+    def _switch_node_after_error(self, msg, url=None, call=None):
+        """ Counts an error of the current node and switches to the next node
+
+            :param str url: node url the failed request was sent to. When another
+                thread has already switched away from it, nothing is done.
+            :returns: True when the node was switched
+        """
+        with self._connect_lock:
+            if url is not None and url != self.url:
+                return False
+            self.nodes.increase_error_cnt()
+            self.nodes.sleep_and_check_retries(msg, sleep=False, call_retry=False, call=call)
+            self.next()
+            return True
 
     @property
     def error_cnt(self):
         return self.nodes.error_cnt
 
-    def get_request_id(self):
-        """Get request id."""
-        self._request_id += 1
-        return self._request_id
+    def get_request_id(self, count=1):
+        """Get request id, count ids are reserved"""
+        with self._request_id_lock:
+            request_id = self._request_id + 1
+            self._request_id += count
+        return request_id
 
     def next(self):
         """Switches to the next node url"""
@@ -194,67 +399,162 @@ class GrapheneRPC(object):
 
     def rpcconnect(self, next_url=True):
         """Connect to next url in a loop."""
+        with self._connect_lock:
+            self._rpcconnect(next_url=next_url)
+
+    def _rpcconnect(self, next_url=True):
         if self.nodes.working_nodes_count == 0:
             return
+        old_conn = self._connection
         while True:
-            if next_url:
-                self.url = next(self.nodes)
-                self.nodes.reset_error_cnt_call()
-                log.debug("Trying to connect to node %s" % self.url)
-                if self.url[:3] == "wss":
-                    self.ws = create_ws_instance(use_ssl=True)
-                    self.ws.settimeout(self.timeout)
-                    self.current_rpc = self.rpc_methods["ws"]
-                elif self.url[:2] == "ws":
-                    self.ws = create_ws_instance(use_ssl=False)
-                    self.ws.settimeout(self.timeout)
-                    self.current_rpc = self.rpc_methods["ws"]
-                else:
-                    self.ws = None
-                    self.session = shared_session_instance()
-                    self.current_rpc = self.rpc_methods["jsonrpc"]
-                    self.headers = {'User-Agent': 'bhive v%s' % (bsteem_version),
-                                    'content-type': 'application/json; charset=utf-8'}
+            if next_url or old_conn is None:
+                url = next(self.nodes)
+                call = getattr(self._local, "call_retries", None)
+                if call is not None:
+                    call.reset_error_cnt_call()
+            else:
+                url = old_conn.url
+            log.debug("Trying to connect to node %s" % url)
+            # the new connection is used by other calls only after get_config has succeeded
+            conn = self._create_connection(url)
             try:
-                if self.ws:
-                    self.ws.connect(self.url)
-                    self.rpclogin(self.user, self.password)
-                if self.disable_chain_detection:
-                    # Set to appbase rpc format
-                    if self.current_rpc == self.rpc_methods['ws']:
-                        self.current_rpc = self.rpc_methods['wsappbase']
-                    else:
-                        self.current_rpc = self.rpc_methods['appbase']
-                    break
-                try:
-                    props = None
-                    if not self.use_condenser:
-                        props = self.get_config(api="database")
-                    else:
-                        props = self.get_config()
-                except Exception as e:
-                    if re.search("Bad Cast:Invalid cast from type", str(e)):
-                        # retry with appbase
-                        if self.current_rpc == self.rpc_methods['ws']:
-                            self.current_rpc = self.rpc_methods['wsappbase']
-                        else:
-                            self.current_rpc = self.rpc_methods['appbase']
-                        props = self.get_config(api="database")
-                if props is None:
-                    raise RPCError("Could not receive answer for get_config")
-                if is_network_appbase_ready(props):
-                    if self.ws:
-                        self.current_rpc = self.rpc_methods["wsappbase"]
-                    else:
-                        self.current_rpc = self.rpc_methods["appbase"]
+                props = self._open_connection(conn)
                 break
             except KeyboardInterrupt:
                 raise
             except Exception as e:
+                self._close_connection(conn)
                 self.nodes.increase_error_cnt()
                 do_sleep = not next_url or (next_url and self.nodes.working_nodes_count == 1)
                 self.nodes.sleep_and_check_retries(str(e), sleep=do_sleep)
                 next_url = True
+        if self.rpc_cache is not None and props is not None:
+            chain_ids = [props[key] for key in props if key[-8:] == "CHAIN_ID"]
+            if len(chain_ids) > 0:
+                self.rpc_cache = self.rpc_cache.for_chain(chain_ids[0])
+        self._publish_connection(conn)
+        if self.metrics is not None and old_conn is not None and old_conn.url != conn.url:
+            self.metrics.record_node_switch(old_conn.url, conn.url)
+        if old_conn is not None and old_conn.ws is not None and old_conn.ws is not conn.ws:
+            # calls in progress on the old websocket are retried on the new one
+            self._close_connection(old_conn)
+
+    def _create_connection(self, url):
+        """Returns a not yet connected :class:`NodeConnection` to url"""
+        conn = NodeConnection(url, node=self.nodes.node, headers=self.headers)
+        if url[:3] == "wss":
+            conn.ws = create_ws_instance(use_ssl=True)
+            conn.ws.settimeout(self.timeout)
+            conn.current_rpc = self.rpc_methods["ws"]
+        elif url[:2] == "ws":
+            conn.ws = create_ws_instance(use_ssl=False)
+            conn.ws.settimeout(self.timeout)
+            conn.current_rpc = self.rpc_methods["ws"]
+        else:
+            conn.session = self.get_session()
+            conn.current_rpc = self.rpc_methods["jsonrpc"]
+        return conn
+
+    def _open_connection(self, conn):
+        """ Connects conn and detects the rpc format of the node
+
+            :returns: the get_config result, None when chain detection is disabled
+        """
+        if conn.ws is not None:
+            conn.ws.connect(conn.url)
+            if self.ws_pipelining:
+                conn.ws_pipeline = WebsocketPipeline(conn.ws, timeout=self.timeout)
+            if conn.current_rpc == self.rpc_methods['ws'] and self.user and self.password:
+                self._connection_call(conn, "login", [self.user, self.password], api="login_api")
+        if self.disable_chain_detection:
+            # Set to appbase rpc format
+            if conn.current_rpc == self.rpc_methods['ws']:
+                conn.current_rpc = self.rpc_methods['wsappbase']
+            else:
+                conn.current_rpc = self.rpc_methods['appbase']
+            return None
+        try:
+            props = None
+            if not self.use_condenser:
+                props = self._connection_call(conn, "get_config", api="database")
+            else:
+                props = self._connection_call(conn, "get_config")
+        except Exception as e:
+            if re.search("Bad Cast:Invalid cast from type", str(e)):
+                # retry with appbase
+                if conn.current_rpc == self.rpc_methods['ws']:
+                    conn.current_rpc = self.rpc_methods['wsappbase']
+                else:
+                    conn.current_rpc = self.rpc_methods['appbase']
+                props = self._connection_call(conn, "get_config", api="database")
+        if props is None:
+            raise RPCError("Could not receive answer for get_config")
+        if is_network_appbase_ready(props):
+            if conn.ws is not None:
+                conn.current_rpc = self.rpc_methods["wsappbase"]
+            else:
+                conn.current_rpc = self.rpc_methods["appbase"]
+        return props
+
+    def _connection_call(self, conn, name, args=(), api=None):
+        """ Sends a single call through a connection which is not used by other calls yet
+
+            The call is not retried, errors are raised.
+        """
+        appbase = conn.current_rpc in [self.rpc_methods['wsappbase'], self.rpc_methods['appbase']]
+        api_name = get_api_name(appbase, api=api) if api else get_api_name(appbase)
+        if appbase and self.use_condenser:
+            api_name = "condenser_api"
+        if api_name is None:
+            api_name = 'database_api'
+        query = get_query(appbase and not self.use_condenser, self.get_request_id(), api_name, name, args)
+        data = codec.dumps(query)
+        if conn.ws is not None:
+            reply = self.ws_send(data, request_ids=get_request_ids(query), connection=conn)
+        else:
+            reply = self.request_send(data, connection=conn).content
+        if not bool(reply):
+            raise RPCError("Empty Reply")
+        if isinstance(reply, (dict, list)):
+            ret = reply
+        else:
+            try:
+                ret = codec.loads(reply)
+            except ValueError:
+                if isinstance(reply, bytes):
+                    reply = reply.decode('utf8', 'replace')
+                self._check_for_server_error(reply)
+        if isinstance(ret, dict) and 'error' in ret:
+            raise RPCError(ret['error'].get('detail', ret['error'].get('message')))
+        if isinstance(ret, dict) and "result" in ret:
+            return ret["result"]
+        return ret
+
+    def _publish_connection(self, conn):
+        """Makes conn the connection used by all calls"""
+        self.url = conn.url
+        self.ws = conn.ws
+        self.ws_pipeline = conn.ws_pipeline
+        if conn.session is not None:
+            self.session = conn.session
+        self.current_rpc = conn.current_rpc
+        self._connection = conn
+
+    def _close_connection(self, conn):
+        """Closes the websocket of conn, errors are logged"""
+        if conn.ws_pipeline is not None:
+            conn.ws_pipeline.close()
+        if conn.ws is not None:
+            try:
+                conn.ws.close()
+            except Exception as e:
+                log.debug("Closing websocket of %s failed: %s" % (conn.url, str(e)))
+
+    def _reconnect(self, conn):
+        """Connects again to the node of conn, when no other thread has done it already"""
+        with self._connect_lock:
+            if self._connection is conn:
+                self._rpcconnect(next_url=False)
 
     def rpclogin(self, user, password):
         """Login into Websocket"""
@@ -263,32 +563,342 @@ class GrapheneRPC(object):
 
     def rpcclose(self):
         """Close Websocket"""
-        if self.ws is None:
+        conn = self._connection
+        if conn is None or conn.ws is None:
             return
+        if conn.ws_pipeline is not None:
+            conn.ws_pipeline.close()
+            self.ws_pipeline = None
         # if self.ws.connected:
-        self.ws.close()
+        conn.ws.close()
 
-    def request_send(self, payload):
+    def request_send(self, payload, url=None, timeout=None, connection=None):
+        if connection is None:
+            connection = self._connection
+        if connection is None:
+            raise RPCConnection("RPC is not connected!")
+        if url is None:
+            url = connection.url
+        if timeout is None:
+            timeout = self.timeout
+        session = connection.session if connection.session is not None else self.get_session()
         if self.user is not None and self.password is not None:
-            response = self.session.post(self.url,
-                                         data=payload,
-                                         headers=self.headers,
-                                         timeout=self.timeout,
-                                         auth=(self.user, self.password))
+            response = session.post(url,
+                                    data=payload,
+                                    headers=connection.headers,
+                                    timeout=timeout,
+                                    auth=(self.user, self.password))
         else:
-            response = self.session.post(self.url,
-                                         data=payload,
-                                         headers=self.headers,
-                                         timeout=self.timeout)
+            response = session.post(url,
+                                    data=payload,
+                                    headers=connection.headers,
+                                    timeout=timeout)
         if response.status_code == 401:
             raise UnauthorizedError
         return response
 
-    def ws_send(self, payload):
-        if self.ws is None:
+    def get_hedge_threshold(self):
+        """Returns the latency in seconds after which a call is hedged, None when not enough calls were measured"""
+        latencies = sorted(self._latencies)
+        if len(latencies) < self.hedge_min_samples or len(latencies) == 0:
+            return None
+        index = int(round(self.hedge_percentile / 100. * (len(latencies) - 1)))
+        return latencies[min(max(index, 0), len(latencies) - 1)]
+
+    def _hedged_request_send(self, payload, query, connection=None):
+        """ Sends the payload and, when the reply is late, also to a second https node.
+            The first reply wins.
+
+            :returns: the response and the node which has sent it, the latency of
+                a winning hedge is already recorded
+        """
+        if connection is None:
+            connection = self._connection
+        threshold = self.get_hedge_threshold()
+        if threshold is None or is_broadcast_query(query):
+            return self.request_send(payload, connection=connection), connection.node
+        if not self._hedge_slots.acquire(False):
+            # all workers are busy, the call is not queued behind other hedged calls
+            return self.request_send(payload, connection=connection), connection.node
+        with self._hedge_lock:
+            if self._hedge_executor is None:
+                # each hedged call uses up to two workers
+                self._hedge_executor = ThreadPoolExecutor(max_workers=2 * self.hedge_max_calls)
+        call_start = time.time()
+        futures = []
+        try:
+            primary = self._hedge_executor.submit(self.request_send, payload, connection.url, None, connection)
+            futures.append(primary)
+            done, not_done = wait([primary], timeout=threshold)
+            if len(done) > 0:
+                return primary.result(), connection.node
+            exclude = [i for i in range(len(self.nodes)) if self.nodes[i] is connection.node or
+                       self.nodes[i].url[:2] == "ws"]
+            hedge_index = self.nodes.best_node_index(exclude=exclude)
+            remaining = self.timeout - (time.time() - call_start)
+            if hedge_index is None or remaining <= 0:
+                return primary.result(), connection.node
+            with self._hedge_lock:
+                self.hedge_stats["hedged"] += 1
+            log.debug("Hedging call after %.3f s on node %s" % (threshold, self.nodes[hedge_index].url))
+            start_time = time.time()
+            # the hedge ends not later than the primary request
+            hedge = self._hedge_executor.submit(self.request_send, payload, self.nodes[hedge_index].url, remaining,
+                                                connection)
+            futures.append(hedge)
+            not_done = set([primary, hedge])
+            error = None
+            while len(not_done) > 0:
+                done, not_done = wait(not_done, return_when=FIRST_COMPLETED)
+                for f in done:
+                    try:
+                        response = f.result()
+                    except Exception as e:
+                        error = e
+                        continue
+                    if f is hedge:
+                        with self._hedge_lock:
+                            self.hedge_stats["hedge_wins"] += 1
+                        # the latency of the hedge is counted from its own start
+                        self.nodes.record_latency(time.time() - start_time, node=self.nodes[hedge_index])
+                        return response, self.nodes[hedge_index]
+                    return response, connection.node
+            raise error
+        finally:
+            self._release_hedge_slot(futures)
+
+    def _release_hedge_slot(self, futures):
+        """Releases the slot of a hedged call, when all of its requests have finished"""
+        remaining = [len(futures)]
+        lock = threading.Lock()
+
+        def done_callback(future):
+            with lock:
+                remaining[0] -= 1
+                if remaining[0] > 0:
+                    return
+            self._hedge_slots.release()
+
+        if len(futures) == 0:
+            self._hedge_slots.release()
+        for future in futures:
+            future.add_done_callback(done_callback)
+
+    def _reschedule_node(self, data, payload):
+        """ Probes a https node without latency measurement, or switches to a
+            node with a clearly lower measured score
+        """
+        exclude = [i for i in range(len(self.nodes)) if self.nodes[i].url[:2] == "ws"]
+        probe_index = self.nodes.probe_node_index(exclude=exclude)
+        if probe_index is not None:
+            if not is_broadcast_query(payload):
+                if FUTURES_MODULE is None:
+                    self._probe_node(data, probe_index)
+                else:
+                    if self._probe_executor is None:
+                        self._probe_executor = ThreadPoolExecutor(max_workers=1)
+                    self._probe_executor.submit(self._probe_node, data, probe_index)
+        elif self.nodes.should_switch_node():
+            log.debug("Switching to node with lower latency score")
+            self.rpcconnect()
+
+    def _probe_node(self, data, node_index):
+        """Sends a read-only call to a node to measure its latency, the reply is not used"""
+        node = self.nodes[node_index]
+        start_time = time.time()
+        try:
+            response = self.request_send(data, node.url)
+            codec.loads(response.content)
+        except Exception as e:
+            log.debug("Probing node %s failed: %s" % (node.url, str(e)))
+            self.nodes.record_error(node=node)
+            return
+        self.nodes.record_latency(time.time() - start_time, node=node)
+
+    def _get_fanout_node_indices(self, max_nodes):
+        """Returns up to max_nodes indices of working https nodes, best score first"""
+        indices = []
+        while len(indices) < max_nodes:
+            index = self.nodes.best_node_index(exclude=indices)
+            if index is None:
+                break
+            indices.append(index)
+        return [i for i in indices if self.nodes[i].url[:2] != "ws"]
+
+    def _send_sub_batch(self, sub_batch, node_index):
+        """Sends a sub-batch to a node and returns the replies sorted in request order"""
+        node = self.nodes[node_index]
+        start_time = time.time()
+        try:
+            data = codec.dumps(sub_batch)
+            response = self.request_send(data, node.url)
+            try:
+                reply = codec.loads(response.content)
+            except ValueError:
+                self._check_for_server_error(response.text)
+            if not isinstance(reply, list) or len(reply) != len(sub_batch):
+                raise RPCErrorDoRetry("Batch reply with %d instead of %d results" % (
+                    len(reply) if isinstance(reply, list) else 1, len(sub_batch)))
+        except Exception:
+            self.nodes.record_error(node=node)
+            if self.metrics is not None:
+                self.metrics.record_error(sub_batch, node.url)
+            raise
+        latency = time.time() - start_time
+        self.nodes.record_latency(latency, node=node)
+        if self.metrics is not None:
+            self.metrics.record_call(sub_batch, node.url, latency, len(data), len(response.content))
+        return sort_batch_reply(reply, get_request_ids(sub_batch))
+
+    def rpcexec_fanout(self, queries, batch_size=None, max_nodes=None):
+        """ Sends a batch of queries split into sub-batches in parallel to several nodes.
+
+            :param list queries: list of JSON-RPC queries
+            :param int batch_size: Maximum number of queries in a sub-batch (default is fanout_batch_size)
+            :param int max_nodes: Maximum number of nodes used in parallel (default is fanout_max_nodes)
+
+            A failed sub-batch is sent again to another node, when all nodes
+            have failed, it is executed with :func:`rpcexec`. The results are
+            returned in the order of the queries. When a sub-batch fails there
+            as well, the exception of :func:`rpcexec` is raised, e.g.
+            :class:`bhiveapi.exceptions.NumRetriesReached`,
+            :class:`bhiveapi.exceptions.RPCErrorDoRetry` or
+            :class:`bhiveapi.exceptions.RPCError`.
+        """
+        batch_size = batch_size or self.fanout_batch_size
+        max_nodes = max_nodes or self.fanout_max_nodes
+        flat_queries = []
+        for query in queries:
+            if isinstance(query, list):
+                flat_queries.extend(query)
+            else:
+                flat_queries.append(query)
+        sub_batches = [flat_queries[i:i + batch_size] for i in range(0, len(flat_queries), batch_size)]
+        node_indices = self._get_fanout_node_indices(max_nodes)
+        if self.ws is not None or FUTURES_MODULE is None or len(node_indices) < 2 or len(sub_batches) < 2:
+            return self.rpcexec(flat_queries)
+        log.debug("Sending %d calls in %d sub-batches to %d nodes" % (len(flat_queries), len(sub_batches), len(node_indices)))
+        replies = [None] * len(sub_batches)
+        tried = [[] for i in range(len(sub_batches))]
+        with ThreadPoolExecutor(max_workers=len(node_indices)) as executor:
+            futures = {}
+            for i, sub_batch in enumerate(sub_batches):
+                node_index = node_indices[i % len(node_indices)]
+                tried[i].append(node_index)
+                futures[executor.submit(self._send_sub_batch, sub_batch, node_index)] = i
+            while len(futures) > 0:
+                done, not_done = wait(list(futures), return_when=FIRST_COMPLETED)
+                for f in done:
+                    i = futures.pop(f)
+                    try:
+                        replies[i] = f.result()
+                        continue
+                    except Exception as e:
+                        log.warning("Sub-batch failed on node %s: %s" % (self.nodes[tried[i][-1]].url, str(e)))
+                    retry_nodes = [n for n in node_indices if n not in tried[i]]
+                    if len(retry_nodes) == 0:
+                        continue
+                    tried[i].append(retry_nodes[0])
+                    futures[executor.submit(self._send_sub_batch, sub_batches[i], retry_nodes[0])] = i
+        ret = []
+        for i, sub_batch in enumerate(sub_batches):
+            if replies[i] is None or any(isinstance(r, dict) and "error" in r for r in replies[i]):
+                # all parallel tries failed or the node returned an error,
+                # use the retry and error handling of rpcexec
+                result = self.rpcexec(sub_batch)
+                if not isinstance(result, list) or len(result) != len(sub_batch):
+                    raise RPCError("Batch reply with %d instead of %d results" % (
+                        len(result) if isinstance(result, list) else 1, len(sub_batch)))
+                ret.extend(result)
+            else:
+                ret.extend(self._get_result_from_reply(replies[i]))
+        return ret
+
+    def _rpcexec_query(self, query, fanout_batch_size):
+        """Sends the query, batches are fanned out to several nodes when enabled"""
+        if isinstance(query, list) and self.batch_fanout and self.ws is None and len(query) > fanout_batch_size:
+            return self.rpcexec_fanout(query, batch_size=fanout_batch_size)
+        return self.rpcexec(query)
+
+    def _rpcexec_cached(self, query, fanout_batch_size):
+        """Answers the query from rpc_cache, only missing results are requested from the node"""
+        queries = query if isinstance(query, list) else [query]
+        results = [None] * len(queries)
+        missing = []
+        for i, q in enumerate(queries):
+            found = False
+            if self.rpc_cache.is_cacheable_method(q):
+                found, results[i] = self.rpc_cache.get(q)
+            if not found:
+                missing.append(i)
+        if len(missing) == 0:
+            return results if isinstance(query, list) else results[0]
+        if not isinstance(query, list):
+            replies = [self._rpcexec_query(query, fanout_batch_size)]
+        elif len(missing) == len(queries):
+            replies = self._rpcexec_query(query, fanout_batch_size)
+            if not isinstance(replies, list) or len(replies) != len(queries):
+                return replies
+        else:
+            replies = self._rpcexec_query([queries[i] for i in missing], fanout_batch_size)
+            if not isinstance(replies, list) or len(replies) != len(missing):
+                replies = [None] * len(missing)
+        for i, reply in zip(missing, replies):
+            results[i] = reply
+            self.rpc_cache.store(queries[i], reply)
+        return results if isinstance(query, list) else results[0]
+
+    def _rpcexec_coalesced(self, query, fanout_batch_size):
+        """Sends the query, identical queries from other threads wait for its result"""
+        # params of identical calls are built the same way, encoding them is
+        # cheaper than the normalized hash of rpcutils.get_query_key
+        api, method, params = get_api_method(query)
+        key = (api, method, codec.dumps(params))
+        with self._inflight_lock:
+            call = self._inflight.get(key)
+            if call is None:
+                call = InFlightCall()
+                self._inflight[key] = call
+                self.coalesce_stats["misses"] += 1
+                leader = True
+            else:
+                call.waiters += 1
+                self.coalesce_stats["hits"] += 1
+                leader = False
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+        try:
+            if self.rpc_cache is not None:
+                call.result = self._rpcexec_cached(query, fanout_batch_size)
+            else:
+                call.result = self._rpcexec_query(query, fanout_batch_size)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._inflight_lock:
+                del self._inflight[key]
+                has_waiters = call.waiters > 0
+            call.event.set()
+        if has_waiters:
+            # the waiters copy call.result, it must not be changed by the caller
+            return copy.deepcopy(call.result)
+        return call.result
+
+    def ws_send(self, payload, request_ids=None, connection=None):
+        if connection is None:
+            connection = self._connection
+        if connection is None or connection.ws is None:
             raise RPCConnection("No websocket available!")
-        self.ws.send(payload)
-        reply = self.ws.recv()
+        if connection.ws_pipeline is not None and request_ids is not None:
+            return connection.ws_pipeline.request(payload, request_ids)
+        with self._ws_lock:
+            # without pipelining, the reply must be read before the next request is sent
+            connection.ws.send(payload)
+            reply = connection.ws.recv()
         return reply
 
     def version_string_to_int(self, network_version):
@@ -366,65 +976,110 @@ class GrapheneRPC(object):
         :raises ValueError: if the server does not respond in proper JSON format
         :raises RPCError: if the server returns an error
         """
-        log.debug(json.dumps(payload))
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug(json.dumps(payload))
         if self.nodes.working_nodes_count == 0:
             raise WorkingNodeMissing
-        if self.url is None:
+        if self._connection is None:
             raise RPCConnection("RPC is not connected!")
         reply = {}
         response = None
+        data = codec.dumps(payload)
+        if self.node_reschedule_interval > 0 and len(self.nodes) > 1 and self._connection.ws is None:
+            self._calls_since_reschedule += 1
+            if self._calls_since_reschedule > self.node_reschedule_interval:
+                self._calls_since_reschedule = 0
+                self._reschedule_node(data, payload)
+        call = self._get_call_retries()
+        attempt = 0
         while True:
-            self.nodes.increase_error_cnt_call()
+            # url, transport and node of this try are taken from the same connection
+            conn = self._connection
+            call.increase_error_cnt_call()
+            call.url = conn.url
+            if attempt > 0 and self.metrics is not None:
+                self.metrics.record_retry(payload, conn.url)
+            attempt += 1
+            start_time = time.time()
+            answer_node = conn.node
             try:
-                if self.current_rpc == self.rpc_methods['ws'] or \
-                   self.current_rpc == self.rpc_methods['wsappbase']:
-                    reply = self.ws_send(json.dumps(payload, ensure_ascii=False).encode('utf8'))
+                if conn.current_rpc == self.rpc_methods['ws'] or \
+                   conn.current_rpc == self.rpc_methods['wsappbase']:
+                    reply = self.ws_send(data, request_ids=get_request_ids(payload), connection=conn)
+                elif self.hedge_requests:
+                    response, answer_node = self._hedged_request_send(data, payload, connection=conn)
+                    reply = response.content
                 else:
-                    response = self.request_send(json.dumps(payload, ensure_ascii=False).encode('utf8'))
-                    reply = response.text
+                    response = self.request_send(data, connection=conn)
+                    reply = response.content
                 if not bool(reply):
+                    if self.metrics is not None:
+                        self.metrics.record_empty_reply(payload, conn.url)
                     try:
-                        self.nodes.sleep_and_check_retries("Empty Reply", call_retry=True)
+                        self.nodes.sleep_and_check_retries("Empty Reply", call_retry=True, call=call)
                     except CallRetriesReached:
-                        self.nodes.increase_error_cnt()
-                        self.nodes.sleep_and_check_retries("Empty Reply", sleep=False, call_retry=False)
-                        self.rpcconnect()
+                        self._switch_node_after_error("Empty Reply", url=call.url)
                 else:
+                    latency = time.time() - start_time
+                    self._local.last_response_size = 0 if isinstance(reply, (dict, list)) else len(reply)
+                    if answer_node is conn.node:
+                        self.nodes.record_latency(latency, node=conn.node)
+                    if conn.ws is None:
+                        self._latencies.append(latency)
+                    if self.metrics is not None:
+                        self.metrics.record_call(payload, answer_node.url if answer_node is not None else conn.url,
+                                                 latency, len(data),
+                                                 0 if isinstance(reply, (dict, list)) else len(reply))
                     break
             except KeyboardInterrupt:
                 raise
             except WebSocketConnectionClosedException as e:
-                if self.nodes.num_retries_call_reached:
-                    self.nodes.increase_error_cnt()
-                    self.nodes.sleep_and_check_retries(str(e), sleep=False, call_retry=False)
-                    self.rpcconnect()
+                self._record_error(payload, conn.url)
+                if call.num_retries_call_reached:
+                    self._switch_node_after_error(str(e), url=call.url)
                 else:
                     # self.nodes.sleep_and_check_retries(str(e), sleep=True, call_retry=True)
-                    self.rpcconnect(next_url=False)
+                    self._reconnect(conn)
             except ConnectionError as e:
-                self.nodes.increase_error_cnt()
-                self.nodes.sleep_and_check_retries(str(e), sleep=False, call_retry=False)
-                self.rpcconnect()
+                self._record_error(payload, conn.url)
+                self._switch_node_after_error(str(e), url=call.url)
             except WebSocketTimeoutException as e:
-                self.nodes.increase_error_cnt()
-                self.nodes.sleep_and_check_retries(str(e), sleep=False, call_retry=False)
-                self.rpcconnect()
+                self._record_error(payload, conn.url)
+                self._switch_node_after_error(str(e), url=call.url)
             except Exception as e:
-                self.nodes.increase_error_cnt()
-                self.nodes.sleep_and_check_retries(str(e), sleep=False, call_retry=False)
-                self.rpcconnect()
+                self._record_error(payload, conn.url)
+                self._switch_node_after_error(str(e), url=call.url)
 
         ret = {}
         try:
-            if response is None:
-                ret = json.loads(reply, strict=False, encoding="utf-8")
+            if isinstance(reply, (dict, list)):
+                # already decoded by the websocket pipeline
+                ret = reply
             else:
-                ret = response.json()
+                ret = codec.loads(reply)
         except ValueError:
+            if isinstance(reply, bytes):
+                reply = reply.decode('utf8', 'replace')
             self._check_for_server_error(reply)
 
-        log.debug(json.dumps(reply))
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug(json.dumps(ret))
+        if isinstance(payload, list) and isinstance(ret, list):
+            ret = sort_batch_reply(ret, get_request_ids(payload))
+
+        return self._get_result_from_reply(ret)
+
+    def _record_error(self, payload, url=None):
+        if self.metrics is not None:
+            self.metrics.record_error(payload, url or self.url)
 
+    def _reset_error_cnt_call(self):
+        call = getattr(self._local, "call_retries", None)
+        if call is not None:
+            call.reset_error_cnt_call()
+
+    def _get_result_from_reply(self, ret):
+        """Raises RPCError for error replies and extracts the result(s)"""
         if isinstance(ret, dict) and 'error' in ret:
             if 'detail' in ret['error']:
                 raise RPCError(ret['error']['detail'])
@@ -443,15 +1098,15 @@ class GrapheneRPC(object):
                         ret_list.append(r["result"])
                     else:
                         ret_list.append(r)
-                self.nodes.reset_error_cnt_call()
+                self._reset_error_cnt_call()
                 return ret_list
             elif isinstance(ret, dict) and "result" in ret:
-                self.nodes.reset_error_cnt_call()
+                self._reset_error_cnt_call()
                 return ret["result"]
             elif isinstance(ret, int):
                 raise RPCError("Client returned invalid format. Expected JSON! Output: %s" % (str(ret)))
             else:
-                self.nodes.reset_error_cnt_call()
+                self._reset_error_cnt_call()
                 return ret
         return ret
 
@@ -467,20 +1122,30 @@ class GrapheneRPC(object):
             if (api_name is None):
                 api_name = 'database_api'
 
-            # let's be able to define the num_retries per query
-            stored_num_retries_call = self.nodes.num_retries_call
-            self.nodes.num_retries_call = kwargs.get("num_retries_call", stored_num_retries_call)
             add_to_queue = kwargs.get("add_to_queue", False)
-            query = get_query(self.is_appbase_ready() and not self.use_condenser, self.get_request_id(), api_name, name, args)
+            request_id = self.get_request_id()
+            query = get_query(self.is_appbase_ready() and not self.use_condenser, request_id, api_name, name, args)
+            if isinstance(query, list) and len(query) > 1:
+                # reserve the ids used by get_query for the list of requests
+                self.get_request_id(len(query) - 1)
             if add_to_queue:
                 self.rpc_queue.append(query)
-                self.nodes.num_retries_call = stored_num_retries_call
                 return None
             elif len(self.rpc_queue) > 0:
                 self.rpc_queue.append(query)
                 query = self.rpc_queue
                 self.rpc_queue = []
-            r = self.rpcexec(query)
-            self.nodes.num_retries_call = stored_num_retries_call
-            return r
+            fanout_batch_size = kwargs.get("fanout_batch_size", self.fanout_batch_size)
+            # the retry state is kept per call, num_retries_call can be set per query
+            stored_call = getattr(self._local, "call_retries", None)
+            self._local.call_retries = CallRetries(kwargs.get("num_retries_call", self.nodes.num_retries_call))
+            try:
+                if self.coalesce_requests and not isinstance(query, list) and not is_broadcast_query(query):
+                    return self._rpcexec_coalesced(query, fanout_batch_size)
+                elif self.rpc_cache is not None:
+                    return self._rpcexec_cached(query, fanout_batch_size)
+                else:
+                    return self._rpcexec_query(query, fanout_batch_size)
+            finally:
+                self._local.call_retries = stored_call
         return method
@@ -40,6 +40,15 @@ class HiveNodeRPC(GrapheneRPC):
         super(HiveNodeRPC, self).__init__(*args, **kwargs)
         self.next_node_on_empty_reply = False
 
+    @property
+    def next_node_on_empty_reply(self):
+        """Switch to next node on empty reply, stored for each thread"""
+        return getattr(self._local, "next_node_on_empty_reply", False)
+
+    @next_node_on_empty_reply.setter
+    def next_node_on_empty_reply(self, next_node_on_empty_reply):
+        self._local.next_node_on_empty_reply = next_node_on_empty_reply
+
     def set_next_node_on_empty_reply(self, next_node_on_empty_reply=True):
         """Switch to next node on empty reply for the next rpc call"""
         self.next_node_on_empty_reply = next_node_on_empty_reply
@@ -55,39 +64,48 @@ class HiveNodeRPC(GrapheneRPC):
         """
         if self.url is None:
             raise exceptions.RPCConnection("RPC is not connected!")
+        call = self._get_call_retries()
         doRetry = True
         maxRetryCountReached = False
+        first_try = True
         while doRetry and not maxRetryCountReached:
             doRetry = False
+            if not first_try and self.metrics is not None:
+                self.metrics.record_retry(payload, self.url)
+            first_try = False
             try:
                 # Forward call to GrapheneWebsocketRPC and catch+evaluate errors
                 reply = super(HiveNodeRPC, self).rpcexec(payload)
                 if self.next_node_on_empty_reply and not bool(reply) and self.nodes.working_nodes_count > 1:
-                    self._retry_on_next_node("Empty Reply")
+                    if self.metrics is not None:
+                        self.metrics.record_empty_reply(payload, self.url)
+                    self._retry_on_next_node("Empty Reply", call=call)
                     doRetry = True
                     self.next_node_on_empty_reply = True
                 else:
                     self.next_node_on_empty_reply = False
                     return reply
             except exceptions.RPCErrorDoRetry as e:
+                self._record_error(payload)
                 msg = exceptions.decodeRPCErrorMsg(e).strip()
                 try:
-                    self.nodes.sleep_and_check_retries(str(msg), call_retry=True)
+                    self.nodes.sleep_and_check_retries(str(msg), call_retry=True, call=call)
                     doRetry = True
                 except exceptions.CallRetriesReached:
                     if self.nodes.working_nodes_count > 1:
-                        self._retry_on_next_node(msg)
+                        self._retry_on_next_node(msg, call=call)
                         doRetry = True
                     else:
                         self.next_node_on_empty_reply = False
                         raise exceptions.CallRetriesReached
             except exceptions.RPCError as e:
+                self._record_error(payload)
                 try:
-                    doRetry = self._check_error_message(e, self.error_cnt_call)
+                    doRetry = self._check_error_message(e, call.error_cnt_call, call=call)
                 except exceptions.CallRetriesReached:
                     msg = exceptions.decodeRPCErrorMsg(e).strip()
                     if self.nodes.working_nodes_count > 1:
-                        self._retry_on_next_node(msg)
+                        self._retry_on_next_node(msg, call=call)
                         doRetry = True
                     else:
                         self.next_node_on_empty_reply = False
@@ -95,16 +113,23 @@ class HiveNodeRPC(GrapheneRPC):
             except Exception as e:
                 self.next_node_on_empty_reply = False
                 raise e
-            maxRetryCountReached = self.nodes.num_retries_call_reached
+            maxRetryCountReached = call.num_retries_call_reached
         self.next_node_on_empty_reply = False
 
-    def _retry_on_next_node(self, error_msg):
-        self.nodes.increase_error_cnt()
-        self.nodes.sleep_and_check_retries(error_msg, sleep=False, call_retry=False)
-        self.next()
+    def _retry_on_next_node(self, error_msg, call=None):
+        """ Continues the call on the next node, or on the node to which
+            another thread or coroutine has already switched
+        """
+        self._switch_node_after_error(error_msg, url=None if call is None else call.url, call=call)
+        if call is not None:
+            call.reset_error_cnt_call()
+
+    def _check_error_message(self, e, cnt, call=None):
+        """ Check error message and decide what to do
 
-    def _check_error_message(self, e, cnt):
-        """Check error message and decide what to do"""
+            :param CallRetries call: retry state of the call (default is the
+                call error count of the current node)
+        """
         doRetry = False
         msg = exceptions.decodeRPCErrorMsg(e).strip()
         if re.search("missing required active authority", msg):
@@ -118,8 +143,8 @@ class HiveNodeRPC(GrapheneRPC):
         elif re.search("Could not find API", msg):
             if self._check_api_name(msg):
                 if self.nodes.working_nodes_count > 1 and self.nodes.num_retries > -1:
-                    self.nodes.disable_node()
-                    self._switch_to_next_node(msg, "ApiNotSupported")
+                    self._disable_node(call)
+                    self._switch_to_next_node(msg, "ApiNotSupported", call=call)
                     doRetry = True
                 else:
                     raise exceptions.ApiNotSupported(msg)
@@ -127,7 +152,7 @@ class HiveNodeRPC(GrapheneRPC):
                 raise exceptions.NoApiWithName(msg)
         elif re.search("follow_api_plugin not enabled", msg):
             if self.nodes.working_nodes_count > 1 and self.nodes.num_retries > -1:
-                self._switch_to_next_node(str(e))
+                self._switch_to_next_node(str(e), call=call)
                 doRetry = True
             else:
                 raise exceptions.FollowApiNotEnabled(msg)
@@ -136,19 +161,19 @@ class HiveNodeRPC(GrapheneRPC):
         elif re.search("WinError", msg):
             raise exceptions.RPCError(msg)
         elif re.search("Unable to acquire database lock", msg):
-            self.nodes.sleep_and_check_retries(str(msg), call_retry=True)
+            self.nodes.sleep_and_check_retries(str(msg), call_retry=True, call=call)
             doRetry = True
         elif re.search("Request Timeout", msg):
-            self.nodes.sleep_and_check_retries(str(msg), call_retry=True)
+            self.nodes.sleep_and_check_retries(str(msg), call_retry=True, call=call)
             doRetry = True
         elif re.search("Bad or missing upstream response", msg):
-            self.nodes.sleep_and_check_retries(str(msg), call_retry=True)
+            self.nodes.sleep_and_check_retries(str(msg), call_retry=True, call=call)
             doRetry = True
         elif re.search("Internal Error", msg) or re.search("Unknown exception", msg):
-            self.nodes.sleep_and_check_retries(str(msg), call_retry=True)
+            self.nodes.sleep_and_check_retries(str(msg), call_retry=True, call=call)
             doRetry = True
         elif re.search("!check_max_block_age", str(e)):
-            self._switch_to_next_node(str(e))
+            self._switch_to_next_node(str(e), call=call)
             doRetry = True
         elif re.search("Can only vote once every 3 seconds", msg):
             raise exceptions.VotedBeforeWaitTimeReached(msg)
@@ -158,8 +183,8 @@ class HiveNodeRPC(GrapheneRPC):
             raise exceptions.UnhandledRPCError("Use Operation(op, appbase=True) to prevent error: " + msg)
         elif re.search("Client returned invalid format. Expected JSON!", msg):
             if self.nodes.working_nodes_count > 1 and self.nodes.num_retries > -1:
-                self.nodes.disable_node()
-                self._switch_to_next_node(msg)
+                self._disable_node(call)
+                self._switch_to_next_node(msg, call=call)
                 doRetry = True
             else:
                 raise exceptions.UnhandledRPCError(msg)
@@ -169,15 +194,22 @@ class HiveNodeRPC(GrapheneRPC):
             raise e
         return doRetry
 
-    def _switch_to_next_node(self, msg, error_type="UnhandledRPCError"):
+    def _disable_node(self, call=None):
+        """No further retries of the call on the current node"""
+        if call is not None:
+            call.disable_node()
+        else:
+            self.nodes.disable_node()
+
+    def _switch_to_next_node(self, msg, error_type="UnhandledRPCError", call=None):
         if self.nodes.working_nodes_count == 1:
             if error_type == "UnhandledRPCError":
                 raise exceptions.UnhandledRPCError(msg)
             elif error_type == "ApiNotSupported":
                 raise exceptions.ApiNotSupported(msg)
-        self.nodes.increase_error_cnt()
-        self.nodes.sleep_and_check_retries(str(msg), sleep=False)
-        self.next()
+        self._switch_node_after_error(str(msg), url=None if call is None else call.url, call=call)
+        if call is not None:
+            call.reset_error_cnt_call()
 
     def _check_api_name(self, msg):
         error_start = "Could not find API"
@@ -0,0 +1,193 @@
+# This Python file uses the following encoding: utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+import bisect
+import json
+import threading
+import time
+from .rpcutils import get_api_method
+
+
+class Histogram(object):
+    """ Histogram with fixed bucket upper bounds
+
+        :param list buckets: sorted upper bounds of the buckets, larger
+            values are counted in an additional overflow bucket
+    """
+    def __init__(self, buckets):
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def percentile(self, percentile):
+        """Returns the upper bound of the bucket containing the percentile (max for the overflow bucket)"""
+        if self.count == 0:
+            return None
+        rank = percentile / 100. * self.count
+        cnt = 0
+        for i, bucket_count in enumerate(self.counts):
+            cnt += bucket_count
+            if cnt >= rank and bucket_count > 0:
+                if i < len(self.buckets):
+                    return min(self.buckets[i], self.max)
+                return self.max
+        return self.max
+
+    def json(self):
+        return {"count": self.count, "sum": self.sum, "min": self.min, "max": self.max,
+                "mean": self.sum / self.count if self.count > 0 else None,
+                "p50": self.percentile(50), "p95": self.percentile(95), "p99": self.percentile(99),
+                "buckets": self.buckets, "counts": self.counts}
+
+
+class CallStats(object):
+    """Counters of a single api.method or node"""
+    def __init__(self, buckets):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.empty_replies = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.latency = Histogram(buckets)
+
+    def json(self):
+        return {"calls": self.calls, "errors": self.errors, "retries": self.retries,
+                "empty_replies": self.empty_replies, "request_bytes": self.request_bytes,
+                "response_bytes": self.response_bytes, "latency": self.latency.json()}
+
+
+class RPCMetrics(object):
+    """ Collects call counts, latencies, bytes, batch sizes, retries,
+        node switches and empty replies of a rpc client
+
+        :param list latency_buckets: upper bounds of the latency
+            histogram buckets in seconds
+
+        All recorded values are kept per ``api.method`` and per node url.
+        The latency of a batch request is added once to every method in
+        the batch.
+
+        .. code-block:: python
+
+            from bhive import Hive
+            hv = Hive(metrics=True)
+            hv.get_dynamic_global_properties()
+            print(hv.rpc.metrics.snapshot()["methods"])
+
+    """
+    latency_buckets = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]
+    batch_size_buckets = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000]
+
+    def __init__(self, latency_buckets=None):
+        if latency_buckets is not None:
+            self.latency_buckets = sorted(latency_buckets)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Removes all recorded values"""
+        with self._lock:
+            self.start_time = time.time()
+            self.methods = {}
+            self.nodes = {}
+            self.batch_sizes = Histogram(self.batch_size_buckets)
+            self.node_switches = 0
+
+    def _get_stats(self, stats_dict, key):
+        stats = stats_dict.get(key)
+        if stats is None:
+            stats = CallStats(self.latency_buckets)
+            stats_dict[key] = stats
+        return stats
+
+    @staticmethod
+    def get_method_names(payload):
+        """Returns the list of api.method names of a request or of a batch request"""
+        if not isinstance(payload, list):
+            payload = [payload]
+        names = []
+        for query in payload:
+            api, method, params = get_api_method(query)
+            names.append("%s.%s" % (api, method) if api else str(method))
+        return names
+
+    def record_call(self, payload, url, latency, request_bytes=0, response_bytes=0):
+        """Records a successful request"""
+        names = self.get_method_names(payload)
+        with self._lock:
+            self.batch_sizes.add(len(names))
+            node = self._get_stats(self.nodes, url)
+            node.calls += 1
+            node.request_bytes += request_bytes
+            node.response_bytes += response_bytes
+            node.latency.add(latency)
+            for name in names:
+                self._get_stats(self.methods, name).calls += 1
+            for name in set(names):
+                stats = self.methods[name]
+                # bytes of a batch are split between its calls
+                stats.request_bytes += request_bytes * names.count(name) // len(names)
+                stats.response_bytes += response_bytes * names.count(name) // len(names)
+                stats.latency.add(latency)
+
+    def _record(self, payload, url, attr):
+        with self._lock:
+            if url is not None:
+                stats = self._get_stats(self.nodes, url)
+                setattr(stats, attr, getattr(stats, attr) + 1)
+            if payload is not None:
+                for name in set(self.get_method_names(payload)):
+                    stats = self._get_stats(self.methods, name)
+                    setattr(stats, attr, getattr(stats, attr) + 1)
+
+    def record_error(self, payload, url):
+        """Records a failed request"""
+        self._record(payload, url, "errors")
+
+    def record_retry(self, payload, url):
+        """Records a request which is sent again"""
+        self._record(payload, url, "retries")
+
+    def record_empty_reply(self, payload, url):
+        """Records an empty reply"""
+        self._record(payload, url, "empty_replies")
+
+    def record_node_switch(self, old_url, new_url):
+        """Records a switch to another node"""
+        with self._lock:
+            self.node_switches += 1
+
+    def snapshot(self):
+        """Returns all recorded values as dict"""
+        with self._lock:
+            return {"start_time": self.start_time, "duration": time.time() - self.start_time,
+                    "methods": dict((k, v.json()) for k, v in self.methods.items()),
+                    "nodes": dict((k, v.json()) for k, v in self.nodes.items()),
+                    "batch_sizes": self.batch_sizes.json(),
+                    "node_switches": self.node_switches}
+
+    def top_methods(self, n=10):
+        """Returns the n (api.method, total latency) tuples with the highest total latency"""
+        with self._lock:
+            totals = [(k, v.latency.sum) for k, v in self.methods.items()]
+        return sorted(totals, key=lambda x: x[1], reverse=True)[:n]
+
+    def dump(self, filename):
+        """Writes a snapshot as JSON into filename"""
+        with open(filename, "w") as f:
+            json.dump(self.snapshot(), f, indent=2, sort_keys=True)
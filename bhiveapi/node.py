@@ -22,13 +22,87 @@ class Node(object):
         self.url = url
         self.error_cnt = 0
         self.error_cnt_call = 0
+        # EWMA of the call latency in seconds, None when not measured yet
+        self.latency = None
+        # EWMA of the error rate (0 .. 1)
+        self.error_rate = 0.
+        self.consecutive_errors = 0
+        # circuit breaker: node is skipped until open_until (time.time())
+        self.open_until = None
+        self.cooldown = 0
+
+    @property
+    def circuit(self):
+        """Returns the circuit breaker state: ``closed``, ``open`` or ``half-open``"""
+        if self.open_until is None:
+            return "closed"
+        elif time.time() < self.open_until:
+            return "open"
+        return "half-open"
+
+    @property
+    def score(self):
+        """Lower is better, nodes without latency measurement have a score of 0"""
+        if self.latency is None:
+            return 0.
+        return self.latency * (1. + 5. * self.error_rate)
 
     def __repr__(self):
         return self.url
 
 
+class CallRetries(object):
+    """ Retry state of a single rpc call
+
+        :param int num_retries_call: Repeat the call num_retries_call times on node error
+        :param bool defer_sleep: When True, the wait time before a retry is added to
+            ``sleeptime`` instead of sleeping, so that it can be awaited (default is False)
+
+        Each call keeps its own retry counter, so that calls which are sent at the
+        same time from several threads or coroutines do not use up each other's retries.
+        ``url`` is the node url the call was last sent to.
+    """
+    __slots__ = ["num_retries_call", "error_cnt_call", "defer_sleep", "sleeptime", "url"]
+
+    def __init__(self, num_retries_call, defer_sleep=False):
+        self.num_retries_call = num_retries_call
+        self.error_cnt_call = 0
+        self.defer_sleep = defer_sleep
+        self.sleeptime = 0
+        self.url = None
+
+    @property
+    def num_retries_call_reached(self):
+        return self.error_cnt_call >= self.num_retries_call
+
+    def increase_error_cnt_call(self):
+        self.error_cnt_call += 1
+
+    def reset_error_cnt_call(self):
+        """Called when the call is sent to another node"""
+        self.error_cnt_call = 0
+
+    def disable_node(self):
+        """No further retries on the current node"""
+        if self.num_retries_call >= 0:
+            self.error_cnt_call = self.num_retries_call
+
+
 class Nodes(list):
-    """Stores Node URLs and error counts"""
+    """ Stores Node URLs, error counts and latencies
+
+        Switching to the next node (``next(nodes)``) selects the healthy node
+        with the lowest score (EWMA latency weighted with the EWMA error rate).
+        Nodes without measurement are probed first and ties are broken in
+        round-robin order. A node with ``breaker_threshold`` consecutive errors
+        is skipped for a cooldown time (circuit breaker), afterwards it is
+        probed again (half-open) and the cooldown doubles on a new failure.
+    """
+    ewma_alpha = 0.3
+    breaker_threshold = 3
+    breaker_cooldown = 10
+    breaker_max_cooldown = 300
+
     def __init__(self, urls, num_retries, num_retries_call):
         if isinstance(urls, str):
             url_list = re.split(r",|;", urls)
@@ -51,21 +125,131 @@ class Nodes(list):
     def __iter__(self):
         return self
 
+    def _is_working(self, node):
+        return self.num_retries < 0 or node.error_cnt <= self.num_retries
+
     def __next__(self):
-        next_node_count = 0
         if self.freeze_current_node:
             return self.url
-        while next_node_count == 0 and (self.num_retries < 0 or self.node.error_cnt < self.num_retries):
-            self.current_node_index += 1
-            if self.current_node_index >= self.working_nodes_count:
-                self.current_node_index = 0
-            next_node_count += 1
-            if next_node_count > self.working_nodes_count + 1:
-                raise StopIteration
+        n = len(self)
+        if n == 0:
+            raise StopIteration
+        now = time.time()
+        if self.current_node_index < 0:
+            order = list(range(n))
+        else:
+            order = [(self.current_node_index + 1 + k) % n for k in range(n)]
+        working = [i for i in order if self._is_working(self[i])]
+        if len(working) == 0:
+            return self.url
+        candidates = [i for i in working if self[i].open_until is None or self[i].open_until <= now]
+        if len(candidates) == 0:
+            # all circuits are open, take the one which opens first
+            candidates = [min(working, key=lambda i: self[i].open_until)]
+        if len(candidates) > 1 and self.current_node_index in candidates:
+            candidates.remove(self.current_node_index)
+        self.current_node_index = min(candidates, key=lambda i: self._selection_score(self[i]))
         return self.url
 
     next = __next__  # Python 2
 
+    def _selection_score(self, node):
+        if node.circuit == "half-open":
+            # probe the node again
+            return 0.
+        return node.score
+
+    def best_node_index(self, exclude=None):
+        """ Returns the index of the working node with the lowest score
+
+            :param list exclude: node indices which are not taken into account
+        """
+        now = time.time()
+        exclude = exclude or []
+        candidates = [i for i in range(len(self)) if self._is_working(self[i]) and i not in exclude and
+                      (self[i].open_until is None or self[i].open_until <= now)]
+        if len(candidates) == 0:
+            return None
+        current = max(self.current_node_index, 0)
+        candidates.sort(key=lambda i: (self._selection_score(self[i]), (i - current) % len(self)))
+        return candidates[0]
+
+    def should_switch_node(self, factor=0.5):
+        """ Returns True, when another working node has a measured score which
+            is at least ``1 / factor`` times better than the score of the current node
+
+            Nodes without latency measurement and half-open nodes are no reason
+            to switch, they are measured by :func:`probe_node_index` first.
+        """
+        if self.freeze_current_node or self.node is None or self.node.latency is None:
+            return False
+        current = max(self.current_node_index, 0)
+        scores = [self[i].score for i in range(len(self)) if i != current and self._is_working(self[i]) and
+                  self[i].latency is not None and self[i].circuit == "closed"]
+        if len(scores) == 0:
+            return False
+        return min(scores) < factor * self.node.score
+
+    def probe_node_index(self, exclude=None):
+        """ Returns the index of a working node which should be probed, as it
+            has no latency measurement or its circuit is half-open. None, when
+            no node has to be probed.
+
+            :param list exclude: node indices which are not taken into account
+        """
+        if self.freeze_current_node:
+            return None
+        exclude = exclude or []
+        current = max(self.current_node_index, 0)
+        for k in range(1, len(self) + 1):
+            i = (current + k) % len(self)
+            if i == current or i in exclude or not self._is_working(self[i]):
+                continue
+            if self[i].latency is None or self[i].circuit == "half-open":
+                return i
+        return None
+
+    def record_latency(self, latency, node=None):
+        """Stores a successful call with its latency in seconds"""
+        node = node or self.node
+        if node is None:
+            return
+        if node.latency is None:
+            node.latency = latency
+        else:
+            node.latency = self.ewma_alpha * latency + (1. - self.ewma_alpha) * node.latency
+        node.error_rate = (1. - self.ewma_alpha) * node.error_rate
+        node.consecutive_errors = 0
+        if node.open_until is not None:
+            log.debug("Closing circuit of node %s" % node.url)
+            node.open_until = None
+            node.cooldown = 0
+
+    def record_error(self, node=None):
+        """Stores a failed call, opens the circuit breaker when needed"""
+        node = node or self.node
+        if node is None:
+            return
+        node.error_rate = self.ewma_alpha + (1. - self.ewma_alpha) * node.error_rate
+        node.consecutive_errors += 1
+        if node.consecutive_errors >= self.breaker_threshold or node.circuit == "half-open":
+            if node.cooldown == 0:
+                node.cooldown = self.breaker_cooldown
+            else:
+                node.cooldown = min(2 * node.cooldown, self.breaker_max_cooldown)
+            node.open_until = time.time() + node.cooldown
+            log.debug("Opening circuit of node %s for %d s" % (node.url, node.cooldown))
+
+    def node_scores(self):
+        """Returns latency, error rate, score and circuit state for all nodes"""
+        scores = []
+        for i in range(len(self)):
+            node = self[i]
+            scores.append({"url": node.url, "latency": node.latency, "error_rate": node.error_rate,
+                           "score": node.score, "circuit": node.circuit,
+                           "error_cnt": node.error_cnt, "working": self._is_working(node)})
+        return scores
+
     def export_working_nodes(self):
         nodes_list = []
         for i in range(len(self)):
@@ -129,6 +313,7 @@ class Nodes(list):
         """Increase node error count for current node"""
         if self.node is not None:
             self.node.error_cnt += 1
+            self.record_error()
 
     def increase_error_cnt_call(self):
         """Increase call error count for current node"""
@@ -145,13 +330,18 @@ class Nodes(list):
         if self.node is not None:
             self.node.error_cnt = 0
 
-    def sleep_and_check_retries(self, errorMsg=None, sleep=True, call_retry=False, showMsg=True):
-        """Sleep and check if num_retries is reached"""
+    def sleep_and_check_retries(self, errorMsg=None, sleep=True, call_retry=False, showMsg=True, call=None):
+        """ Sleep and check if num_retries is reached
+
+            :param CallRetries call: retry state of the call, which is used instead of
+                the call error count of the current node
+        """
         if errorMsg:
             log.warning("Error: {}".format(errorMsg))
         if call_retry:
-            cnt = self.error_cnt_call
-            if (self.num_retries_call >= 0 and self.error_cnt_call > self.num_retries_call):
+            cnt = self.error_cnt_call if call is None else call.error_cnt_call
+            num_retries_call = self.num_retries_call if call is None else call.num_retries_call
+            if (num_retries_call >= 0 and cnt > num_retries_call):
                 raise CallRetriesReached()
         else:
             cnt = self.error_cnt
@@ -160,7 +350,7 @@ class Nodes(list):
 
         if showMsg:
             if call_retry:
-                log.warning("Retry RPC Call on node: %s (%d/%d) \n" % (self.url, cnt, self.num_retries_call))
+                log.warning("Retry RPC Call on node: %s (%d/%d) \n" % (self.url, cnt, num_retries_call))
             else:
                 log.warning("Lost connection or internal error on node: %s (%d/%d) \n" % (self.url, cnt, self.num_retries))
         if not sleep:
@@ -173,4 +363,11 @@ class Nodes(list):
             sleeptime = 10
         if sleeptime:
             log.warning("Retrying in %d seconds\n" % sleeptime)
-            time.sleep(sleeptime)
+            if call is not None and call.defer_sleep:
+                call.sleeptime += sleeptime
+            else:
+                self._sleep(sleeptime)
+
+    def _sleep(self, sleeptime):
+        """Waits sleeptime seconds before the next retry"""
+        time.sleep(sleeptime)
@@ -0,0 +1,248 @@
+# This Python file uses the following encoding: utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+import logging
+import os
+import sqlite3
+import threading
+import time
+from .rpcutils import get_api_method, get_query_key
+from . import codec
+log = logging.getLogger(__name__)
+
+
+def get_block_num_param(params, key="block_num"):
+    """Returns the block number of appbase (dict) and condenser (list) params"""
+    if isinstance(params, dict):
+        value = params.get(key)
+    elif isinstance(params, (list, tuple)) and len(params) > 0:
+        value = params[0]
+        if isinstance(value, dict):
+            value = value.get(key)
+    else:
+        value = None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class RPCCache(object):
+    """ Persistent cache for RPC results which can never change
+
+        :param str path: Directory in which the cache database is stored
+            (default is the bhive user cache directory)
+        :param int max_size: Maximum size of all stored results in bytes,
+            the least recently used results are removed (default is 1 GB)
+        :param str chain_id: Results and the last irreversible block number are
+            stored for this chain id. When not set, the chain id of the first
+            node connected with this cache is used (see :func:`for_chain`)
+
+        Blocks, block headers, ``get_ops_in_block`` results and transactions
+        are only stored when their block number is at or below the last
+        irreversible block. The last irreversible block number is taken from
+        ``get_dynamic_global_properties`` replies passing through
+        :func:`store` and is shared with all processes using the same
+        directory. The SQLite database is used in WAL mode, so that several
+        processes can read and write the cache at the same time.
+
+        .. code-block:: python
+
+            from bhive import Hive
+            from bhiveapi.rpccache import RPCCache
+            hv = Hive(rpc_cache=RPCCache("/tmp/hive_cache"))
+
+    """
+    database_name = "rpc_cache.sqlite"
+    evict_interval = 100
+    access_update_interval = 60
+    # method name: params key of the block number
+    block_num_methods = {
+        "get_block": "block_num",
+        "get_block_header": "block_num",
+        "get_ops_in_block": "block_num",
+    }
+
+    def __init__(self, path=None, max_size=1024 ** 3, chain_id=None):
+        if path is None:
+            from appdirs import user_cache_dir
+            path = user_cache_dir("bhive", "bhive")
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        self.path = path
+        self.filename = os.path.join(path, self.database_name)
+        self.max_size = max_size
+        self.chain_id = chain_id
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._last_irreversible_block_num = None
+        self._inserts = 0
+        self._lock = threading.Lock()
+        self._create_tables()
+
+    def _get_connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.filename, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _create_tables(self):
+        connection = self._get_connection()
+        connection.execute("CREATE TABLE IF NOT EXISTS rpc_cache (key TEXT PRIMARY KEY, "
+                           "value BLOB, size INTEGER, last_access REAL)")
+        connection.execute("CREATE INDEX IF NOT EXISTS rpc_cache_access ON rpc_cache (last_access)")
+        connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)")
+
+    def close(self):
+        """Closes the database connection of the calling thread"""
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def for_chain(self, chain_id):
+        """ Returns a cache for chain_id in the same directory
+
+            The own chain id is set, when it is not set yet. A new cache
+            is returned when the cache is used for another chain.
+        """
+        if self.chain_id is None:
+            self.chain_id = chain_id
+        if chain_id is None or chain_id == self.chain_id:
+            return self
+        return RPCCache(self.path, max_size=self.max_size, chain_id=chain_id)
+
+    @staticmethod
+    def get_key(query, chain_id=None):
+        """Returns the cache key of a JSON-RPC query, the request id is ignored"""
+        if chain_id is None:
+            return get_query_key(query)
+        return chain_id + ":" + get_query_key(query)
+
+    @property
+    def _last_irreversible_block_num_key(self):
+        if self.chain_id is None:
+            return "last_irreversible_block_num"
+        return "last_irreversible_block_num:" + self.chain_id
+
+    @property
+    def last_irreversible_block_num(self):
+        """Highest last irreversible block number of the chain seen by any process using the cache"""
+        row = self._get_connection().execute("SELECT value FROM meta WHERE key = ?",
+                                             (self._last_irreversible_block_num_key, )).fetchone()
+        if row is not None:
+            self._last_irreversible_block_num = max(row[0], self._last_irreversible_block_num or 0)
+        return self._last_irreversible_block_num
+
+    def set_last_irreversible_block_num(self, block_num):
+        """Stores block_num, when it is higher than the stored last irreversible block number"""
+        if self._last_irreversible_block_num is not None and block_num <= self._last_irreversible_block_num:
+            return
+        self._last_irreversible_block_num = block_num
+        connection = self._get_connection()
+        key = self._last_irreversible_block_num_key
+        connection.execute("INSERT OR IGNORE INTO meta (key, value) VALUES (?, ?)", (key, block_num))
+        connection.execute("UPDATE meta SET value = ? WHERE key = ? AND value < ?", (block_num, key, block_num))
+
+    def is_cacheable_method(self, query):
+        """Returns True, when results of the query method may be stored"""
+        api, method, params = get_api_method(query)
+        return method in self.block_num_methods or method in ["get_block_range", "get_transaction"]
+
+    def is_cacheable(self, query, result):
+        """Returns True, when the result of query can never change"""
+        if not result:
+            return False
+        api, method, params = get_api_method(query)
+        if method in self.block_num_methods:
+            block_num = get_block_num_param(params, self.block_num_methods[method])
+        elif method == "get_block_range":
+            block_num = get_block_num_param(params, "starting_block_num")
+            if block_num is not None and isinstance(params, dict):
+                block_num += int(params.get("count", 1)) - 1
+        elif method == "get_transaction" and isinstance(result, dict):
+            block_num = result.get("block_num")
+        else:
+            return False
+        if isinstance(result, dict) and len(result) == 1 and not list(result.values())[0]:
+            # e.g. {"block": {}} for blocks which are not yet available
+            return False
+        if block_num is None:
+            return False
+        lib = self._last_irreversible_block_num
+        if lib is None or block_num > lib:
+            # another process may have seen a newer block
+            lib = self.last_irreversible_block_num
+        return lib is not None and block_num <= lib
+
+    def get(self, query):
+        """Returns the tuple (found, result) for a JSON-RPC query"""
+        key = self.get_key(query, self.chain_id)
+        connection = self._get_connection()
+        row = connection.execute("SELECT value, last_access FROM rpc_cache WHERE key = ?", (key, )).fetchone()
+        if row is None:
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        now = time.time()
+        if now - row[1] > self.access_update_interval:
+            connection.execute("UPDATE rpc_cache SET last_access = ? WHERE key = ?", (now, key))
+        return True, codec.loads(bytes(row[0]))
+
+    def store(self, query, result):
+        """ Stores the result of query, when it can never change
+
+            :returns: True when the result was stored
+        """
+        api, method, params = get_api_method(query)
+        if method == "get_dynamic_global_properties" and isinstance(result, dict) and \
+           "last_irreversible_block_num" in result:
+            self.set_last_irreversible_block_num(int(result["last_irreversible_block_num"]))
+            return False
+        if not self.is_cacheable(query, result):
+            return False
+        value = codec.dumps(result)
+        self._get_connection().execute("INSERT OR REPLACE INTO rpc_cache (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                                       (self.get_key(query, self.chain_id), sqlite3.Binary(value), len(value), time.time()))
+        with self._lock:
+            self._inserts += 1
+            evict = self._inserts % self.evict_interval == 0
+        if evict:
+            self.evict()
+        return True
+
+    @property
+    def size(self):
+        """Size of all stored results in bytes"""
+        row = self._get_connection().execute("SELECT SUM(size) FROM rpc_cache").fetchone()
+        return row[0] or 0
+
+    def __len__(self):
+        return self._get_connection().execute("SELECT COUNT(*) FROM rpc_cache").fetchone()[0]
+
+    def evict(self):
+        """Removes the least recently used results until the cache is smaller than max_size"""
+        connection = self._get_connection()
+        size = self.size
+        if size <= self.max_size:
+            return
+        keys = []
+        for key, value_size in connection.execute("SELECT key, size FROM rpc_cache ORDER BY last_access, rowid"):
+            if size <= self.max_size:
+                break
+            keys.append(key)
+            size -= value_size
+        for i in range(0, len(keys), 500):
+            connection.execute("DELETE FROM rpc_cache WHERE key IN (%s)" % ",".join("?" * len(keys[i:i + 500])),
+                               keys[i:i + 500])
+        log.debug("RPC cache size: %d bytes" % size)
+
+    def clear(self):
+        """Removes all stored results"""
+        self._get_connection().execute("DELETE FROM rpc_cache")
@@ -5,6 +5,7 @@ from __future__ import print_function
 from __future__ import unicode_literals
 import time
 import json
+import hashlib
 import logging
 from .exceptions import (
     UnauthorizedError, RPCConnection, RPCError, NumRetriesReached, CallRetriesReached
@@ -22,15 +23,28 @@ def is_network_appbase_ready(props):
         return True
 
 
+def copy_params(params):
+    """ Returns a deep copy of the call parameters, tuples are copied as lists
+
+        The query must not change, when the caller changes its parameters
+        after the call (e.g. while the query waits in a batch queue).
+    """
+    if isinstance(params, dict):
+        return dict((key, copy_params(value)) for key, value in params.items())
+    if isinstance(params, (list, tuple)):
+        return [copy_params(value) for value in params]
+    return params
+
+
 def get_query(appbase, request_id, api_name, name, args):
     query = []
     if not appbase or api_name == "condenser_api":
         query = {"method": "call",
-                 "params": [api_name, name, list(args)],
+                 "params": [api_name, name, copy_params(args)],
                  "jsonrpc": "2.0",
                  "id": request_id}
     else:
-        args = json.loads(json.dumps(args))
+        args = copy_params(args)
         # print(args)
         if len(args) > 0 and isinstance(args, list) and isinstance(args[0], dict):
             query = {"method": api_name + "." + name,
@@ -63,6 +77,54 @@ def get_query(appbase, request_id, api_name, name, args):
     return query
 
 
+def get_api_method(query):
+    """ Returns the tuple (api, method, params) of a single JSON-RPC query
+
+        Both query formats created by :func:`get_query` are supported.
+    """
+    method = query.get("method", "")
+    if method == "call":
+        params = query.get("params", [])
+        if len(params) >= 3:
+            return params[0], params[1], params[2]
+        elif len(params) == 2:
+            return params[0], params[1], []
+        return None, None, params
+    api, _, name = method.rpartition(".")
+    return api or None, name, query.get("params")
+
+
+def get_query_key(query):
+    """Returns a hash of api, method and params of a query, the request id is ignored"""
+    api, method, params = get_api_method(query)
+    data = json.dumps([api, method, params], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(data.encode("utf8")).hexdigest()
+
+
+def is_broadcast_query(payload):
+    """Returns True when the query (or one of the batched queries) broadcasts a transaction"""
+    if not isinstance(payload, list):
+        payload = [payload]
+    for query in payload:
+        api, method, params = get_api_method(query)
+        if api == "network_broadcast_api" or (method is not None and method.startswith("broadcast_transaction")):
+            return True
+    return False
+
+
+def sort_batch_reply(reply, request_ids):
+    """ Sorts the replies of a batch request into the order of request_ids
+
+        The JSON-RPC specification allows to return the replies of a
+        batch in any order, replies are matched by their ``id``.
+    """
+    order = dict((request_id, i) for i, request_id in enumerate(request_ids))
+    if len(order) != len(request_ids):
+        # ids are not unique, keep the order of the node
+        return reply
+    return sorted(reply, key=lambda r: order.get(r.get("id") if isinstance(r, dict) else None, len(order)))
+
+
 def get_api_name(appbase, *args, **kwargs):
     if not appbase:
         # Sepcify the api to talk to
@@ -19,6 +19,7 @@ from bhiveapi.rpcutils import (
     RPCConnection, RPCError, NumRetriesReached
 )
 from bhiveapi.node import Nodes
+from bhiveapi import codec
 from events import Events
 
 log = logging.getLogger(__name__)
@@ -168,7 +169,7 @@ class HiveWebsocket(Events):
         log.debug("Received message: %s" % str(reply))
         data = {}
         try:
-            data = json.loads(reply, strict=False)
+            data = codec.loads(reply)
         except ValueError:
             raise ValueError("API node returned invalid format. Expected JSON!")
 
@@ -278,8 +279,9 @@ class HiveWebsocket(Events):
         :raises ValueError: if the server does not respond in proper JSON format
         :raises RPCError: if the server returns an error
         """
-        log.debug(json.dumps(payload))
-        self.ws.send(json.dumps(payload, ensure_ascii=False).encode('utf8'))
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug(json.dumps(payload))
+        self.ws.send(codec.dumps(payload))
 
     def __getattr__(self, name):
         """ Map all methods to RPC calls and pass through the arguments
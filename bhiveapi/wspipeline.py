@@ -0,0 +1,186 @@
+# This Python file uses the following encoding: utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+import logging
+import threading
+import time
+from .exceptions import RPCConnection, RPCError
+from . import codec
+from .rpcutils import sort_batch_reply
+try:
+    from websocket._exceptions import WebSocketConnectionClosedException, WebSocketTimeoutException
+except ImportError:
+    WebSocketConnectionClosedException = RPCConnection
+    WebSocketTimeoutException = RPCConnection
+
+log = logging.getLogger(__name__)
+
+
+def get_request_ids(payload):
+    """Returns the list of JSON-RPC ids of a request or of a batch request"""
+    if isinstance(payload, list):
+        return [p.get("id") for p in payload]
+    return [payload.get("id")]
+
+
+class PendingRequest(object):
+    """ A sent request which waits for its reply
+
+        :param list request_ids: JSON-RPC ids of the request
+        :param float timeout: seconds to wait for the reply, counted from now
+    """
+    def __init__(self, request_ids, timeout=None):
+        self.request_ids = request_ids
+        self.deadline = None if timeout is None else time.time() + timeout
+        self.event = threading.Event()
+        self.reply = None
+        self.error = None
+
+    def set_reply(self, reply):
+        self.reply = reply
+        self.event.set()
+
+    def set_error(self, error):
+        self.error = error
+        self.event.set()
+
+
+class WebsocketPipeline(object):
+    """ Keeps many JSON-RPC requests outstanding on a single websocket connection.
+
+        :param ws: connected websocket (``websocket.WebSocket``)
+        :param int timeout: Seconds to wait for a reply (default is 60)
+
+        A reader thread receives all replies and hands them over to the
+        waiting callers by their JSON-RPC ``id``. Replies are returned
+        decoded, batch replies are sorted into the order of the request.
+        :func:`request` can be called from several threads at once.
+        Each request has its own deadline of timeout seconds after it was
+        sent, a request without reply until then fails alone and the
+        connection stays open.
+    """
+    def __init__(self, ws, timeout=60):
+        self.ws = ws
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._closed = False
+        self._reader = threading.Thread(target=self._read_loop, name="ws-pipeline-reader")
+        self._reader.daemon = True
+        self._reader.start()
+
+    @property
+    def pending_count(self):
+        """Returns the number of requests waiting for a reply"""
+        with self._lock:
+            return len(set(id(p) for p in self._pending.values()))
+
+    def send(self, payload, request_ids):
+        """ Sends the encoded payload without waiting for the reply
+
+            :param bytes payload: encoded request or batch request
+            :param list request_ids: JSON-RPC ids of the request
+            :returns: :class:`PendingRequest`
+        """
+        pending = PendingRequest(request_ids, timeout=self.timeout)
+        with self._lock:
+            if self._closed:
+                raise WebSocketConnectionClosedException("Websocket pipeline is closed")
+            for request_id in request_ids:
+                if request_id in self._pending:
+                    raise RPCError("Request id %s is already waiting for a reply" % str(request_id))
+            for request_id in request_ids:
+                self._pending[request_id] = pending
+            try:
+                self.ws.send(payload)
+            except Exception:
+                for request_id in request_ids:
+                    self._pending.pop(request_id, None)
+                raise
+        return pending
+
+    def wait(self, pending):
+        """ Waits for the reply of a :class:`PendingRequest` until its deadline and returns it"""
+        if pending.deadline is None:
+            timeout = self.timeout
+        else:
+            timeout = max(0., pending.deadline - time.time())
+        if not pending.event.wait(timeout):
+            with self._lock:
+                for request_id in pending.request_ids:
+                    if self._pending.get(request_id) is pending:
+                        del self._pending[request_id]
+            raise WebSocketTimeoutException("No reply received within %s s" % str(self.timeout))
+        if pending.error is not None:
+            raise pending.error
+        return pending.reply
+
+    def request(self, payload, request_ids):
+        """Sends the payload and waits for its reply"""
+        return self.wait(self.send(payload, request_ids))
+
+    def close(self):
+        """Fails all waiting requests, the websocket itself is not closed"""
+        self._fail_all(WebSocketConnectionClosedException("Websocket pipeline is closed"))
+
+    def _fail_all(self, error):
+        with self._lock:
+            self._closed = True
+            pending_list = set(self._pending.values())
+            self._pending = {}
+        for pending in pending_list:
+            pending.set_error(error)
+
+    def _dispatch(self, reply):
+        if isinstance(reply, list):
+            ids = [r.get("id") for r in reply if isinstance(r, dict)]
+        elif isinstance(reply, dict):
+            ids = [reply.get("id")]
+        else:
+            ids = []
+        with self._lock:
+            pending = None
+            for request_id in ids:
+                if request_id in self._pending:
+                    pending = self._pending[request_id]
+                    break
+            if pending is None and all(request_id is None for request_id in ids) and \
+                    len(set(id(p) for p in self._pending.values())) == 1:
+                # e.g. parse errors are returned with id null
+                pending = list(self._pending.values())[0]
+            if pending is None:
+                # e.g. the late reply of a request which has timed out
+                log.warning("Dropping reply without waiting request: %s" % str(reply)[:200])
+                return
+            for request_id in pending.request_ids:
+                self._pending.pop(request_id, None)
+        if isinstance(reply, list) and len(pending.request_ids) > 1:
+            reply = sort_batch_reply(reply, pending.request_ids)
+        pending.set_reply(reply)
+
+    def _read_loop(self):
+        while True:
+            try:
+                reply = self.ws.recv()
+            except WebSocketTimeoutException:
+                # no reply within the socket timeout, the deadline of each
+                # request is checked by its waiting caller
+                if self._closed:
+                    return
+                continue
+            except Exception as e:
+                self._fail_all(e)
+                return
+            if self._closed:
+                return
+            if not reply:
+                self._fail_all(WebSocketConnectionClosedException("Empty reply, connection is closed"))
+                return
+            try:
+                reply = codec.loads(reply)
+            except ValueError:
+                log.warning("Dropping reply which is not valid JSON: %s" % str(reply)[:200])
+                continue
+            self._dispatch(reply)
@@ -109,6 +109,52 @@ ops_wls = [
 ]
 operations_wls = {o: ops_wls.index(o) for o in ops_wls}
 
+#: Bit flags of the virtual operations for the ``filter`` parameter of
+#: ``account_history_api.enum_virtual_ops``
+virtual_op_filter = {
+    'fill_convert_request': 0x000001,
+    'author_reward': 0x000002,
+    'curation_reward': 0x000004,
+    'comment_reward': 0x000008,
+    'liquidity_reward': 0x000010,
+    'interest': 0x000020,
+    'fill_vesting_withdraw': 0x000040,
+    'fill_order': 0x000080,
+    'shutdown_witness': 0x000100,
+    'fill_transfer_from_savings': 0x000200,
+    'hardfork': 0x000400,
+    'comment_payout_update': 0x000800,
+    'return_vesting_delegation': 0x001000,
+    'comment_benefactor_reward': 0x002000,
+    'producer_reward': 0x004000,
+    'clear_null_account_balance': 0x008000,
+    'proposal_pay': 0x010000,
+    'sps_fund': 0x020000,
+    'hardfork_hive': 0x040000,
+    'hardfork_hive_restore': 0x080000,
+    'delayed_voting': 0x100000,
+    'consolidate_treasury_balance': 0x200000,
+    'effective_comment_vote': 0x400000,
+    'ineffective_delete_comment': 0x800000,
+    'sps_convert': 0x1000000,
+}
+
+
+def getVirtualOperationFilter(opNames):
+    """ Returns the ``enum_virtual_ops`` filter for a list of virtual operation names
+
+        Names with ``_operation`` suffix are accepted. Raises ValueError
+        for names which are not virtual operations.
+    """
+    op_filter = 0
+    for op_name in opNames:
+        if op_name.endswith("_operation"):
+            op_name = op_name[:-10]
+        if op_name not in virtual_op_filter:
+            raise ValueError("%s is not a virtual operation" % op_name)
+        op_filter |= virtual_op_filter[op_name]
+    return op_filter
+
 
 def getOperationNameForId(i):
     """ Convert an operation id into the corresponding string
@@ -0,0 +1,40 @@
+from __future__ import print_function
+import sys
+import time
+from datetime import timedelta
+from bhive.blockchain import Blockchain
+from bhive.blockarchive import BlockArchive
+import logging
+log = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        path = sys.argv[1]
+    else:
+        path = "blocks_archive"
+    blockchain = Blockchain()
+    cur_block = blockchain.get_current_block()
+    stop = cur_block.identifier
+    startdate = cur_block.time() - timedelta(seconds=3600)
+    start = blockchain.get_estimated_block_num(startdate, accurate=True)
+
+    archive = BlockArchive(path)
+    # missing blocks are received from the node and stored in the archive
+    t1 = time.time()
+    blocks = 0
+    for block in blockchain.blocks(start=start, stop=stop, threading=True, thread_num=8, block_archive=archive):
+        blocks += 1
+        if blocks % 200 == 0:
+            print(blocks, "blocks streamed")
+    t2 = time.time()
+    print("Received %d blocks in %.2f s" % (blocks, t2 - t1))
+
+    # the second run reads all blocks from the archive
+    ops = 0
+    for op in blockchain.stream(start=start, stop=stop, block_archive=archive):
+        ops += 1
+    t3 = time.time()
+    print("Read %d operations from the archive in %.2f s" % (ops, t3 - t2))
+    archive.close()
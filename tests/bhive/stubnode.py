@@ -0,0 +1,241 @@
+# This Python file uses the following encoding: utf-8
+"""Local appbase node with generated blocks for tests which must run without network"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from bhiveapi.rpcutils import get_api_method
+
+GENESIS_TIME = datetime(2020, 3, 20, 0, 0, 0)
+VIRTUAL_OP_FILTER = {"fill_vesting_withdraw_operation": 0x000040, "producer_reward_operation": 0x004000}
+
+
+def block_id(block_num, fork=0):
+    return "%08x" % block_num + "%02x" % fork + "ab" * 15 + "cd"
+
+
+def block_time(block_num):
+    return (GENESIS_TIME + timedelta(seconds=3 * block_num)).strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def amount(value, nai="@@000000021"):
+    return {"amount": str(value), "precision": 3, "nai": nai}
+
+
+def get_operations(block_num, trx_num):
+    """Deterministic operations of a transaction"""
+    n = block_num * 10 + trx_num
+    ops = [{"type": "transfer_operation",
+            "value": {"from": "alice", "to": "bob" if n % 2 else "carol", "amount": amount(n), "memo": "memo %d" % n}}]
+    if n % 3 == 0:
+        ops.append({"type": "vote_operation",
+                    "value": {"voter": "carol", "author": "alice", "permlink": "post-%d" % (n % 7), "weight": 10000}})
+    if n % 4 == 1:
+        ops.append({"type": "custom_json_operation",
+                    "value": {"required_auths": [], "required_posting_auths": ["dave"],
+                              "id": "follow" if n % 8 == 1 else "sm_find_match",
+                              "json": json.dumps(["follow", {"follower": "dave", "following": "alice", "what": ["blog"]}])}})
+    return ops
+
+
+def get_virtual_operations(block_num):
+    """Deterministic virtual operations of a block"""
+    ops = [{"type": "producer_reward_operation",
+            "value": {"producer": "gtg", "vesting_shares": {"amount": "1000000", "precision": 6, "nai": "@@000000037"}}}]
+    if block_num % 5 == 0:
+        ops.append({"type": "fill_vesting_withdraw_operation",
+                    "value": {"from_account": "alice", "to_account": "alice",
+                              "withdrawn": {"amount": "1000000", "precision": 6, "nai": "@@000000037"},
+                              "deposited": amount(block_num)}})
+    return ops
+
+
+class StubHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        node = self.server.node
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])).decode("utf8"))
+        if node.delay:
+            time.sleep(node.delay)
+        if isinstance(payload, list):
+            body = [node.answer(q) for q in payload]
+        else:
+            body = node.answer(payload)
+        body = json.dumps(body).encode("utf8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class StubServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class StubHiveNode(object):
+    """ Appbase node answering with generated blocks
+
+        :param int head_block_number: head block, the last irreversible block is 20 blocks behind
+        :param int n_trx: number of transactions per block
+
+        All received calls are stored in ``calls`` as ``api.method``.
+    """
+    def __init__(self, head_block_number=1000, n_trx=3, delay=0):
+        self.head_block_number = head_block_number
+        self.n_trx = n_trx
+        self.delay = delay
+        # block_num: delay in seconds for get_block
+        self.block_delays = {}
+        # block_num: number of get_block calls which return an empty reply
+        self.block_failures = {}
+        # block_num: fork number, changes the block id
+        self.forks = {}
+        # block_num: number of missed block slots before the block, delays all following blocks
+        self.missed_slots = {}
+        # methods which are answered with "Could not find method"
+        self.disabled_methods = set()
+        self.calls = []
+        self.lock = threading.Lock()
+        self.server = StubServer(("127.0.0.1", 0), StubHandler)
+        self.server.node = self
+        self.url = "http://127.0.0.1:%d" % self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def count_calls(self, method):
+        with self.lock:
+            return len([c for c in self.calls if c.endswith("." + method)])
+
+    def answer(self, query):
+        api, method, params = get_api_method(query)
+        with self.lock:
+            self.calls.append("%s.%s" % (api, method))
+        handler = getattr(self, "rpc_" + method, None)
+        if handler is None or method in self.disabled_methods:
+            return {"jsonrpc": "2.0", "id": query.get("id"),
+                    "error": {"code": -32003, "message": "Could not find method %s" % method}}
+        return {"jsonrpc": "2.0", "id": query.get("id"), "result": handler(params)}
+
+    @property
+    def last_irreversible_block_num(self):
+        return self.head_block_number - 20
+
+    def get_block_time(self, block_num):
+        missed = sum([n for missed_num, n in self.missed_slots.items() if missed_num <= block_num])
+        return block_time(block_num + missed)
+
+    def get_block(self, block_num):
+        if block_num < 1 or block_num > self.head_block_number:
+            return None
+        fork = self.forks.get(block_num, 0)
+        transactions = []
+        transaction_ids = []
+        for trx_num in range(self.n_trx):
+            transactions.append({"ref_block_num": (block_num - 1) % 65536, "ref_block_prefix": 1234,
+                                 "expiration": block_time(block_num + 10),
+                                 "operations": get_operations(block_num, trx_num),
+                                 "extensions": [], "signatures": ["1f" + "00" * 64]})
+            transaction_ids.append("%08x%02x" % (block_num, trx_num) + "ef" * 15)
+        return {"previous": block_id(block_num - 1, self.forks.get(block_num - 1, 0)),
+                "timestamp": self.get_block_time(block_num), "witness": "gtg",
+                "transaction_merkle_root": "00" * 20, "extensions": [],
+                "witness_signature": "20" + "00" * 64, "transactions": transactions,
+                "block_id": block_id(block_num, fork),
+                "signing_key": "STM5ys4KvLasF8zEr4RyaCbVcP8ubHnedxT2uhXfAvBjNmvzFnKNE",
+                "transaction_ids": transaction_ids}
+
+    def get_ops(self, block_num, only_virtual=False):
+        ops = []
+        if not only_virtual:
+            for trx_num in range(self.n_trx):
+                for op_in_trx, op in enumerate(get_operations(block_num, trx_num)):
+                    ops.append({"trx_id": "%08x%02x" % (block_num, trx_num) + "ef" * 15, "block": block_num,
+                                "trx_in_block": trx_num, "op_in_trx": op_in_trx, "virtual_op": 0,
+                                "timestamp": self.get_block_time(block_num), "op": op})
+        for op in get_virtual_operations(block_num):
+            ops.append({"trx_id": "0" * 40, "block": block_num, "trx_in_block": 4294967295, "op_in_trx": 0,
+                        "virtual_op": 1, "timestamp": self.get_block_time(block_num), "op": op})
+        return ops
+
+    def rpc_get_config(self, params):
+        return {"HIVE_CHAIN_ID": "beeab0de" + "0" * 56, "HIVE_BLOCKCHAIN_VERSION": "0.23.0",
+                "HIVE_BLOCK_INTERVAL": 3, "HIVE_ADDRESS_PREFIX": "STM", "HIVE_100_PERCENT": 10000}
+
+    def rpc_get_dynamic_global_properties(self, params):
+        return {"head_block_number": self.head_block_number, "head_block_id": block_id(self.head_block_number),
+                "time": self.get_block_time(self.head_block_number),
+                "last_irreversible_block_num": self.last_irreversible_block_num}
+
+    def rpc_get_witness_schedule(self, params):
+        return {"current_shuffled_witnesses": ["gtg"], "median_props": {"account_creation_fee": amount(3000)}}
+
+    def rpc_get_reward_funds(self, params):
+        return {"funds": [{"id": 0, "name": "post", "reward_balance": amount(1000000), "recent_claims": "1000000000",
+                           "last_update": block_time(self.head_block_number), "content_constant": "2000000000000",
+                           "percent_curation_rewards": 5000, "percent_content_rewards": 10000,
+                           "author_reward_curve": "linear", "curation_reward_curve": "sqrt"}]}
+
+    def rpc_get_block(self, params):
+        block_num = params["block_num"]
+        delay = self.block_delays.get(block_num, 0)
+        if delay:
+            time.sleep(delay)
+        with self.lock:
+            if self.block_failures.get(block_num, 0) > 0:
+                self.block_failures[block_num] -= 1
+                return {}
+        block = self.get_block(block_num)
+        if block is None:
+            return {}
+        return {"block": block}
+
+    def rpc_get_block_range(self, params):
+        blocks = []
+        for block_num in range(params["starting_block_num"], params["starting_block_num"] + params["count"]):
+            block = self.get_block(block_num)
+            if block is None:
+                break
+            blocks.append(block)
+        return {"blocks": blocks}
+
+    def rpc_enum_virtual_ops(self, params):
+        ops = []
+        for block_num in range(params["block_range_begin"], min(params["block_range_end"], self.head_block_number + 1)):
+            for i, op in enumerate(self.get_ops(block_num, only_virtual=True)):
+                op["operation_id"] = block_num * 100 + i
+                if params.get("filter") and not params["filter"] & VIRTUAL_OP_FILTER[op["op"]["type"]]:
+                    continue
+                if op["operation_id"] >= params.get("operation_begin", 0):
+                    ops.append(op)
+        limit = params.get("limit", 1000)
+        if len(ops) > limit:
+            return {"ops": ops[:limit], "ops_by_block": [], "next_block_range_begin": ops[limit]["block"],
+                    "next_operation_begin": ops[limit]["operation_id"]}
+        return {"ops": ops, "ops_by_block": [], "next_block_range_begin": params["block_range_end"],
+                "next_operation_begin": 0}
+
+    def rpc_get_block_header(self, params):
+        block = self.get_block(params["block_num"])
+        if block is None:
+            return {}
+        return {"header": dict((k, block[k]) for k in ["previous", "timestamp", "witness", "transaction_merkle_root", "extensions"])}
+
+    def rpc_get_ops_in_block(self, params):
+        if params["block_num"] > self.head_block_number:
+            return {"ops": []}
+        return {"ops": self.get_ops(params["block_num"], params.get("only_virtual", False))}
@@ -0,0 +1,111 @@
+# This Python file uses the following encoding: utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+import os
+import shutil
+import tempfile
+import unittest
+from bhive import Hive
+from bhive.block import Block
+from bhive.blockarchive import BlockArchive, COMPRESSION_MODULES
+from .stubnode import StubHiveNode
+
+
+class Testcases(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.node = StubHiveNode(head_block_number=1000)
+        cls.hv = Hive(node=cls.node.url, num_retries=3, num_retries_call=3, timeout=10)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.node.stop()
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_append_and_get(self):
+        archive = BlockArchive(self.path)
+        self.assertEqual(len(archive), 0)
+        self.assertIsNone(archive.get(1))
+        for block_num in range(10, 20):
+            self.assertTrue(archive.append(self.node.get_block(block_num)))
+        self.assertFalse(archive.append(self.node.get_block(15)))
+        self.assertEqual(len(archive), 10)
+        self.assertIn(10, archive)
+        self.assertNotIn(20, archive)
+        self.assertEqual(archive.first_block_num, 10)
+        self.assertEqual(archive.last_block_num, 19)
+        self.assertEqual(archive.get(12), self.node.get_block(12))
+        block = archive.get_block(12, hive_instance=self.hv)
+        self.assertEqual(block.identifier, 12)
+        self.assertEqual(block["transactions"], Block(self.node.get_block(12), hive_instance=self.hv)["transactions"])
+        self.assertEqual([b.block_num for b in archive.blocks(start=15, hive_instance=self.hv)], list(range(15, 20)))
+        archive.close()
+
+        archive = BlockArchive(self.path, read_only=True)
+        self.assertEqual(len(archive), 10)
+        self.assertEqual(archive.get(19), self.node.get_block(19))
+        with self.assertRaises(ValueError):
+            archive.append(self.node.get_block(20))
+        archive.close()
+
+    def test_append_out_of_order(self):
+        with BlockArchive(self.path) as archive:
+            archive.extend([self.node.get_block(block_num) for block_num in [30, 10, 20]])
+            self.assertEqual(archive.next_block_num(11), 20)
+            self.assertIsNone(archive.next_block_num(31))
+        with BlockArchive(self.path) as archive:
+            self.assertEqual(list(archive._block_nums), [10, 20, 30])
+            self.assertEqual(archive.get(20), self.node.get_block(20))
+
+    def test_append_block(self):
+        with BlockArchive(self.path) as archive:
+            block = Block(self.node.get_block(40), hive_instance=self.hv)
+            archive.append(block)
+            archived_block = archive.get_block(40, hive_instance=self.hv)
+            self.assertEqual(archived_block["transactions"], block["transactions"])
+            self.assertEqual(archived_block["timestamp"], block["timestamp"])
+            with self.assertRaises(ValueError):
+                archive.append({"block": 41, "operations": []})
+
+    def test_compression(self):
+        for compression in [None] + list(COMPRESSION_MODULES):
+            path = os.path.join(self.path, str(compression))
+            with BlockArchive(path, compression=compression) as archive:
+                archive.append(self.node.get_block(50))
+            # the compression of an existing archive is kept
+            with BlockArchive(path, compression="zlib") as archive:
+                self.assertEqual(archive.compression, compression)
+                self.assertEqual(archive.get(50), self.node.get_block(50))
+        with self.assertRaises(ValueError):
+            BlockArchive(os.path.join(self.path, "unknown"), compression="unknown")
+
+    def test_segments(self):
+        with BlockArchive(self.path, segment_size=2000) as archive:
+            for block_num in range(100, 120):
+                archive.append(self.node.get_block(block_num))
+                # blocks of older segments can still be read
+                self.assertEqual(archive.get(100), self.node.get_block(100))
+        segments = [f for f in os.listdir(self.path) if f.startswith("segment_")]
+        self.assertGreater(len(segments), 1)
+        with BlockArchive(self.path, segment_size=2000) as archive:
+            archive.append(self.node.get_block(120))
+            self.assertEqual([archive.get(n) for n in range(100, 121)], [self.node.get_block(n) for n in range(100, 121)])
+
+    def test_incomplete_index(self):
+        with BlockArchive(self.path) as archive:
+            archive.extend([self.node.get_block(block_num) for block_num in range(60, 65)])
+        # index record of a block which was not written
+        with open(os.path.join(self.path, BlockArchive.index_name), "ab") as f:
+            f.write(BlockArchive.index_record.pack(65, 0, 10 ** 6, 100))
+        with BlockArchive(self.path) as archive:
+            self.assertEqual(len(archive), 5)
+            self.assertTrue(archive.append(self.node.get_block(65)))
+            self.assertEqual(archive.get(65), self.node.get_block(65))
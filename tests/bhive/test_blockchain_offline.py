@@ -0,0 +1,274 @@
+# This Python file uses the following encoding: utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+import json
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from bhive import Hive
+from bhiveapi import codec
+from bhive.blockchain import Blockchain, BlockRangeSize, StreamOperation
+from bhive.blockarchive import BlockArchive
+from bhive.exceptions import BlockDoesNotExistsException
+from bhive.headfollower import HeadPoller
+from .stubnode import StubHiveNode, block_id
+
+
+class Testcases(unittest.TestCase):
+    """Blockchain tests which use a local stub node"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.node = StubHiveNode(head_block_number=1000)
+        cls.hv = Hive(node=cls.node.url, num_retries=3, num_retries_call=3, timeout=10, metrics=True)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.node.stop()
+
+    def setUp(self):
+        self.node.block_delays = {}
+        self.node.block_failures = {}
+
+    def test_blocks(self):
+        b = Blockchain(hive_instance=self.hv)
+        blocks = list(b.blocks(start=100, stop=120))
+        self.assertEqual([block.block_num for block in blocks], list(range(100, 121)))
+        self.assertEqual(blocks[0]["block_id"], block_id(100))
+
+    def test_blocks_threading(self):
+        b = Blockchain(hive_instance=self.hv)
+        blocks = list(b.blocks(start=100, stop=120))
+        blocks_threading = list(b.blocks(start=100, stop=120, threading=True, thread_num=4))
+        self.assertEqual([block.block_num for block in blocks_threading], list(range(100, 121)))
+        self.assertEqual([block["block_id"] for block in blocks_threading], [block["block_id"] for block in blocks])
+
+    def test_blocks_threading_slow_blocks(self):
+        b = Blockchain(hive_instance=self.hv)
+        for block_num in [205, 209, 213, 217]:
+            self.node.block_delays[block_num] = 0.4
+        start = time.time()
+        blocks = list(b.blocks(start=200, stop=230, threading=True, thread_num=4))
+        duration = time.time() - start
+        self.assertEqual([block.block_num for block in blocks], list(range(200, 231)))
+        # the slow blocks are requested at the same time, other requests are not stalled
+        self.assertLess(duration, 4 * 0.4)
+
+    def test_blocks_threading_retry(self):
+        b = Blockchain(hive_instance=self.hv)
+        self.node.block_failures = {303: 1, 310: 2}
+        blocks = list(b.blocks(start=300, stop=320, threading=True, thread_num=4))
+        self.assertEqual([block.block_num for block in blocks], list(range(300, 321)))
+        self.assertEqual(self.node.block_failures, {303: 0, 310: 0})
+
+    def test_blocks_threading_retry_instance(self):
+        b = Blockchain(hive_instance=self.hv)
+        hv = Hive(node=self.node.url, num_retries=3, num_retries_call=3, timeout=10)
+        get_blocks = b._get_blocks
+        calls = []
+
+        def failing_get_blocks(start, count, hive_instance, **kwargs):
+            calls.append((start, hive_instance))
+            if start == 101 and len([c for c in calls if c[0] == 101]) == 1:
+                raise BlockDoesNotExistsException(str(start))
+            return get_blocks(start, count, hive_instance, **kwargs)
+        b._get_blocks = failing_get_blocks
+        blocks = list(b._prefetch_blocks(100, 105, 2, [self.hv, hv]))
+        self.assertEqual([block.block_num for block in blocks], list(range(100, 106)))
+        # the retry uses the instance of the worker and not the shared one
+        self.assertEqual([c[1] for c in calls if c[0] == 101], [hv, hv])
+
+    def test_blocks_threading_batch(self):
+        b = Blockchain(hive_instance=self.hv)
+        blocks = list(b.blocks(start=400, stop=420))
+        self.hv.rpc.metrics.reset()
+        blocks_batch = list(b.blocks(start=400, stop=420, max_batch_size=5, threading=True, thread_num=3,
+                                     use_block_range=False))
+        self.assertEqual([block.block_num for block in blocks_batch], list(range(400, 421)))
+        self.assertEqual([block["block_id"] for block in blocks_batch], [block["block_id"] for block in blocks])
+        self.assertEqual(self.hv.rpc.metrics.snapshot()["batch_sizes"]["max"], 5)
+
+    def test_blocks_threading_batch_retry(self):
+        b = Blockchain(hive_instance=self.hv)
+        self.node.block_failures = {503: 1}
+        blocks = list(b.blocks(start=500, stop=520, max_batch_size=4, threading=True, thread_num=3))
+        self.assertEqual([block.block_num for block in blocks], list(range(500, 521)))
+
+    def test_blocks_threading_batch_virtual_ops(self):
+        b = Blockchain(hive_instance=self.hv)
+        blocks = list(b.blocks(start=600, stop=610, max_batch_size=4, threading=True, thread_num=2, only_virtual_ops=True))
+        self.assertEqual([block.block_num for block in blocks], list(range(600, 611)))
+        self.assertEqual(len(blocks[0].operations), 2)
+        self.assertEqual(len(blocks[1].operations), 1)
+
+    def test_blocks_block_range(self):
+        b = Blockchain(hive_instance=self.hv)
+        blocks = list(b.blocks(start=700, stop=760, use_block_range=False))
+        cnt = self.node.count_calls("get_block_range")
+        blocks_range = list(b.blocks(start=700, stop=760))
+        self.assertGreater(self.node.count_calls("get_block_range"), cnt)
+        self.assertEqual([block.block_num for block in blocks_range], list(range(700, 761)))
+        self.assertEqual([block.json() for block in blocks_range], [block.json() for block in blocks])
+        self.assertEqual([block.identifier for block in blocks_range], [block.identifier for block in blocks])
+
+    def test_blocks_block_range_only_ops(self):
+        b = Blockchain(hive_instance=self.hv)
+        blocks = list(b.blocks(start=10, stop=12, only_ops=True, use_block_range=False))
+        blocks_range = list(b.blocks(start=10, stop=12, only_ops=True))
+        blocks_batch = list(b.blocks(start=10, stop=12, only_ops=True, max_batch_size=3, threading=True, thread_num=2))
+        self.assertEqual([block.operations for block in blocks_range], [block.operations for block in blocks])
+        self.assertEqual([block.operations for block in blocks_batch], [block.operations for block in blocks])
+        ops = list(b.stream(start=10, stop=10, only_ops=True, use_block_range=False))
+        ops_range = list(b.stream(start=10, stop=10, only_ops=True))
+        self.assertEqual(len(ops_range), len(ops))
+        # 5 operations of the transactions and 2 virtual operations
+        self.assertEqual(len(ops_range), 7)
+        self.assertEqual(len([op for op in ops_range if op["type"] in ["producer_reward", "fill_vesting_withdraw"]]), 2)
+
+    def test_blocks_block_range_above_irreversible(self):
+        node = StubHiveNode(head_block_number=1000)
+        stop_event = threading.Event()
+
+        def produce():
+            while not stop_event.wait(0.1):
+                node.head_block_number += 1
+
+        try:
+            hv = Hive(node=node.url, num_retries=3, num_retries_call=3, timeout=10)
+            b = Blockchain(hive_instance=hv, head_poller=HeadPoller(block_interval=0.1, delay=0.02, min_wait=0.02))
+            producer = threading.Thread(target=produce)
+            producer.daemon = True
+            producer.start()
+            block_nums = []
+            # the last irreversible block is 980
+            for block in b.blocks(start=975, stop=995):
+                self.assertLessEqual(block.block_num, node.head_block_number - 20)
+                block_nums.append(block.block_num)
+            self.assertEqual(block_nums, list(range(975, 996)))
+            self.assertGreater(node.count_calls("get_block_range"), 0)
+        finally:
+            stop_event.set()
+            node.stop()
+
+    def test_blocks_block_range_not_supported(self):
+        self.node.disabled_methods.add("get_block_range")
+        try:
+            b = Blockchain(hive_instance=self.hv)
+            blocks = list(b.blocks(start=800, stop=810))
+            blocks_batch = list(b.blocks(start=800, stop=810, max_batch_size=5, threading=True, thread_num=2))
+        finally:
+            self.node.disabled_methods.discard("get_block_range")
+        self.assertEqual([block.block_num for block in blocks], list(range(800, 811)))
+        self.assertEqual([block.block_num for block in blocks_batch], list(range(800, 811)))
+        self.assertFalse(b._supports_block_range(self.hv))
+
+    def test_blocks_threading_block_range(self):
+        b = Blockchain(hive_instance=self.hv)
+        cnt = self.node.count_calls("get_block_range")
+        blocks = list(b.blocks(start=850, stop=870, max_batch_size=5, threading=True, thread_num=3))
+        self.assertEqual([block.block_num for block in blocks], list(range(850, 871)))
+        self.assertEqual(self.node.count_calls("get_block_range") - cnt, 5)
+
+    def test_block_range_size(self):
+        size = BlockRangeSize(size=50, max_size=1000, target_latency=1., target_bytes=1000000)
+        self.assertEqual(size.update(50, 0.1, 10000), 100)
+        self.assertEqual(size.update(100, 5., 10000), 50)
+        self.assertEqual(size.update(50, 0.5, 2000000), 25)
+        self.assertEqual(size.update(25, 0.5, 500000), 50)
+        size = BlockRangeSize(size=800, max_size=1000)
+        self.assertEqual(size.update(800, 0.01, 0), 1000)
+
+    def test_stream_virtual_ops(self):
+        b = Blockchain(hive_instance=self.hv)
+        b.enum_virtual_ops_range = 7
+        b.enum_virtual_ops_limit = 4
+        cnt = self.node.count_calls("enum_virtual_ops")
+        ops = list(b.stream(start=900, stop=920, only_virtual_ops=True))
+        self.assertGreater(self.node.count_calls("enum_virtual_ops"), cnt)
+        ops_per_block = list(b.stream(start=900, stop=920, only_virtual_ops=True, enum_virtual_ops=False))
+        self.assertEqual(len(ops), 21 + 5)
+        self.assertEqual(ops, ops_per_block)
+
+    def test_stream_virtual_ops_filter(self):
+        b = Blockchain(hive_instance=self.hv)
+        ops = list(b.stream(opNames=["fill_vesting_withdraw"], start=900, stop=920, only_virtual_ops=True))
+        self.assertEqual([op["block_num"] for op in ops], [900, 905, 910, 915, 920])
+        self.assertEqual(ops[0]["type"], "fill_vesting_withdraw")
+        self.assertEqual(ops[0]["trx_num"], 0)
+        ops = list(b.stream(start=900, stop=920, only_virtual_ops=True, virtual_op_filter=["producer_reward"]))
+        self.assertEqual(len(ops), 21)
+
+    def test_stream_virtual_ops_not_supported(self):
+        self.node.disabled_methods.add("enum_virtual_ops")
+        try:
+            b = Blockchain(hive_instance=self.hv)
+            ops = list(b.stream(start=900, stop=910, only_virtual_ops=True))
+        finally:
+            self.node.disabled_methods.discard("enum_virtual_ops")
+        self.assertEqual(len(ops), 11 + 3)
+        self.assertFalse(b._supports_enum_virtual_ops())
+
+    def test_blocks_block_archive(self):
+        path = tempfile.mkdtemp()
+        try:
+            archive = BlockArchive(path)
+            archive.extend([self.node.get_block(block_num) for block_num in list(range(100, 110)) + list(range(115, 120))])
+            b = Blockchain(hive_instance=self.hv)
+            cnt = self.node.count_calls("get_block_range") + self.node.count_calls("get_block")
+            blocks = list(b.blocks(start=100, stop=125, block_archive=archive))
+            self.assertEqual([block.block_num for block in blocks], list(range(100, 126)))
+            self.assertEqual(blocks, list(b.blocks(start=100, stop=125)))
+            self.assertEqual(list(archive._block_nums), list(range(100, 126)))
+            # all blocks are read from the archive
+            cnt = self.node.count_calls("get_block_range") + self.node.count_calls("get_block")
+            blocks = list(b.blocks(start=100, stop=125, block_archive=archive))
+            self.assertEqual(self.node.count_calls("get_block_range") + self.node.count_calls("get_block"), cnt)
+            self.assertEqual(len(blocks), 26)
+            # the operations of archived blocks match the operations of the node
+            self.assertEqual(list(b.stream(start=100, stop=125, block_archive=archive)),
+                             list(b.stream(start=100, stop=125)))
+            with self.assertRaises(ValueError):
+                list(b.blocks(start=100, stop=125, only_ops=True, block_archive=archive))
+            archive.close()
+        finally:
+            shutil.rmtree(path)
+
+    def test_stream_op_names(self):
+        b = Blockchain(hive_instance=self.hv)
+        all_ops = list(b.stream(start=100, stop=105))
+        self.assertEqual(set(op["type"] for op in all_ops), set(["transfer", "vote", "custom_json"]))
+        for opNames in [["transfer"], ["vote", "custom_json"], ["transfer_operation"], ["unknown"]]:
+            ops = list(b.stream(opNames=opNames, start=100, stop=105))
+            self.assertEqual(ops, [op for op in all_ops if op["type"] in opNames])
+        ops = list(b.stream(opNames=["vote"], raw_ops=True, start=100, stop=105))
+        self.assertEqual([op["op"][0] for op in ops], ["vote"] * len(ops))
+        self.assertEqual([op["block_num"] for op in ops], [op["block_num"] for op in all_ops if op["type"] == "vote"])
+
+    def test_stream_operation(self):
+        event = {"type": "vote_operation", "value": {"voter": "a", "author": "b", "permlink": "c", "weight": 1}}
+        expected = {"type": "vote", "voter": "a", "author": "b", "permlink": "c", "weight": 1,
+                    "_id": Blockchain.hash_op(event)}
+        op = StreamOperation(event, type="vote")
+        dict.update(op, event["value"])
+        self.assertEqual(dict.__len__(op), 5)
+        self.assertIn("_id", op)
+        self.assertEqual(op["_id"], expected["_id"])
+        self.assertEqual(op, expected)
+        for method in [dict, lambda op: op.copy(), lambda op: dict(op.items()), lambda op: json.loads(json.dumps(op)),
+                       lambda op: codec.loads(codec.dumps(op)), lambda op: pickle.loads(pickle.dumps(op))]:
+            op = StreamOperation(event, type="vote")
+            dict.update(op, event["value"])
+            self.assertEqual(method(op), expected)
+        op = StreamOperation(event, type="vote")
+        self.assertEqual(op.get("_id"), expected["_id"])
+        op = StreamOperation(event, type="vote")
+        op["_id"] = "own id"
+        self.assertEqual(op["_id"], "own id")
+        self.assertEqual(len(op), 2)
+        with self.assertRaises(KeyError):
+            op["unknown"]
@@ -0,0 +1,148 @@
+# This Python file uses the following encoding: utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from bhive import Hive
+from bhive.blockchain import Blockchain
+from bhive.blocktimeindex import BlockTimeIndex, to_seconds
+from bhive.utils import formatTimeString
+from .stubnode import StubHiveNode, block_time
+
+
+class Testcases(unittest.TestCase):
+
+    def test_sparse_anchors(self):
+        index = BlockTimeIndex(block_interval=3)
+        for block_num in range(1, 101):
+            index.add(block_num, 3 * block_num)
+        # a regular range is kept as its first and last block
+        self.assertEqual(len(index), 2)
+        self.assertEqual(index.get_time(50), formatTimeString("1970-01-01T00:02:30"))
+        self.assertEqual(to_seconds(index.get_time(50)), 150)
+        self.assertEqual(index.get_block_num(151), 50)
+        # block 101 was missed by one slot
+        index.add(101, 3 * 102)
+        self.assertEqual(len(index), 3)
+        self.assertEqual(index.get_block_num(302), 100)
+        self.assertEqual(index.get_block_num(306), 101)
+        self.assertIsNone(index.get_time(102))
+        for block_num in range(102, 201):
+            index.add(block_num, 3 * (block_num + 1))
+        self.assertEqual([n for n, t in index.anchors()], [1, 100, 101, 200])
+        self.assertEqual(to_seconds(index.get_time(150)), 453)
+        self.assertIsNone(index.get_block_num(700))
+        self.assertEqual(index.estimate_block_num(3 * 211), 210)
+
+    def test_add_formats(self):
+        index = BlockTimeIndex()
+        self.assertTrue(index.add(10, "1970-01-01T00:00:30"))
+        self.assertFalse(index.add(10, 30))
+        self.assertTrue(index.add(20, formatTimeString("1970-01-01T00:01:00")))
+        self.assertEqual(to_seconds(index.get_time(15)), 45)
+        index.add_block({"block_id": "%08x" % 30 + "00" * 16, "timestamp": "1970-01-01T00:01:30"})
+        self.assertEqual(index.last_block_num, 30)
+
+    def test_save_load(self):
+        path = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(path, "block_times.dat")
+            with BlockTimeIndex(filename) as index:
+                index.add(1, 3)
+                index.add(100, 303)
+                index.add(200, 603)
+            self.assertTrue(os.path.isfile(filename))
+            index = BlockTimeIndex(filename)
+            self.assertEqual([n for n, t in index.anchors()], [1, 100, 200])
+            self.assertEqual(to_seconds(index.get_time(150)), 453)
+        finally:
+            shutil.rmtree(path)
+
+
+class BlockchainTestcases(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.node = StubHiveNode(head_block_number=10000)
+        # blocks from 5001 on are delayed by 2 slots, from 8001 on by 3 slots
+        cls.node.missed_slots = {5001: 2, 8001: 1}
+        cls.hv = Hive(node=cls.node.url, num_retries=3, num_retries_call=3, timeout=10)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.node.stop()
+
+    def get_block_time(self, block_num):
+        return formatTimeString(self.node.get_block_time(block_num))
+
+    def test_block_time(self):
+        b = Blockchain(hive_instance=self.hv)
+        calls = self.node.count_calls("get_block_header")
+        self.assertEqual(b.block_time(100), self.get_block_time(100))
+        self.assertEqual(b.block_time(200), self.get_block_time(200))
+        self.assertEqual(self.node.count_calls("get_block_header"), calls + 2)
+        # known from the index
+        self.assertEqual(b.block_time(150), self.get_block_time(150))
+        self.assertEqual(b.block_timestamp(150), int(time.mktime(self.get_block_time(150).timetuple())))
+        self.assertEqual(self.node.count_calls("get_block_header"), calls + 2)
+        # a missed slot is between the anchors
+        self.assertEqual(b.block_time(6000), self.get_block_time(6000))
+        self.assertEqual(b.block_time(5000), self.get_block_time(5000))
+        self.assertEqual(self.node.count_calls("get_block_header"), calls + 4)
+
+    def test_estimated_block_num(self):
+        b = Blockchain(hive_instance=self.hv)
+        for block_num in [9000, 5000, 5001, 5002, 7000, 8000, 8001, 1, 2, 9980]:
+            self.assertEqual(b.get_estimated_block_num(self.get_block_time(block_num)), block_num)
+            self.assertEqual(b.get_estimated_block_num(self.get_block_time(block_num), estimateForwards=True), block_num)
+        # dates between blocks return the block before
+        date = formatTimeString(block_time(5002))
+        self.assertEqual(b.get_estimated_block_num(date), 5000)
+        calls = self.node.count_calls("get_block_header")
+        for block_num in [4000, 6000, 8500]:
+            self.assertEqual(b.get_estimated_block_num(self.get_block_time(block_num)), block_num)
+        self.assertEqual(self.node.count_calls("get_block_header"), calls)
+        # dates outside of the chain are limited to the existing blocks
+        self.assertEqual(b.get_estimated_block_num(formatTimeString(block_time(0))), 1)
+        self.assertEqual(b.get_estimated_block_num(formatTimeString(block_time(20000))), 9980)
+        self.assertEqual(b.get_estimated_block_num(self.get_block_time(3000), accurate=False), 3000)
+
+    def test_index_from_blocks(self):
+        b = Blockchain(hive_instance=self.hv)
+        for kwargs in [{}, {"raw_records": True}, {"only_ops": True}]:
+            block_nums = [block.block_num for block in b.blocks(start=4990, stop=5010, **kwargs)]
+            self.assertEqual(block_nums, list(range(4990, 5011)))
+        # the missed slot before block 5001 is kept
+        self.assertEqual([n for n, t in b.block_time_index.anchors()], [4990, 5000, 5001, 5010])
+        calls = self.node.count_calls("get_block_header")
+        for block_num in [4995, 5001, 5005]:
+            self.assertEqual(b.block_time(block_num), self.get_block_time(block_num))
+        self.assertEqual(self.node.count_calls("get_block_header"), calls)
+        # blocks of head mode may still be replaced by a fork
+        b = Blockchain(mode="head", hive_instance=self.hv)
+        list(b.blocks(start=4990, stop=5000))
+        self.assertEqual(len(b.block_time_index), 0)
+
+    def test_only_irreversible_blocks(self):
+        b = Blockchain(mode="head", hive_instance=self.hv)
+        # the head block 10000 is after the last irreversible block 9980
+        self.assertEqual(b.get_estimated_block_num(self.get_block_time(9990)), 9990)
+        self.assertEqual(b.get_estimated_block_num(self.get_block_time(9000)), 9000)
+        self.assertEqual(b.block_time(9995), self.get_block_time(9995))
+        self.assertEqual(b.block_time(9970), self.get_block_time(9970))
+        self.assertLessEqual(b.block_time_index.last_block_num, 9980)
+        self.assertIn(9970, [n for n, t in b.block_time_index.anchors()])
+
+    def test_few_header_calls(self):
+        b = Blockchain(hive_instance=self.hv)
+        calls = self.node.count_calls("get_block_header")
+        self.assertEqual(b.get_estimated_block_num(self.get_block_time(9000)), 9000)
+        self.assertLessEqual(self.node.count_calls("get_block_header") - calls, 2)
+        b = Blockchain(hive_instance=self.hv, block_time_index=False)
+        self.assertEqual(b.get_estimated_block_num(self.get_block_time(9000)), 9000)
+        self.assertEqual(b.block_time(6000), self.get_block_time(6000))
@@ -0,0 +1,102 @@
+# This Python file uses the following encoding: utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+import unittest
+from bhive import Hive
+from bhive.blockchain import Blockchain
+from bhive.customjsonrouter import CustomJson, CustomJsonRouter
+from .stubnode import StubHiveNode
+
+
+class Testcases(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.node = StubHiveNode(head_block_number=1000)
+        cls.hv = Hive(node=cls.node.url, num_retries=3, num_retries_call=3, timeout=10)
+        cls.b = Blockchain(hive_instance=cls.hv)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.node.stop()
+
+    def test_custom_json(self):
+        op = {"id": "follow", "json": '["follow", {"follower": "dave"}]', "required_auths": [],
+              "required_posting_auths": ["dave"], "block_num": 5}
+        custom_json = CustomJson(op)
+        self.assertEqual(custom_json.id, "follow")
+        self.assertEqual(custom_json.account, "dave")
+        self.assertEqual(custom_json.block_num, 5)
+        payload = custom_json.payload
+        self.assertEqual(payload, ["follow", {"follower": "dave"}])
+        self.assertIs(custom_json.payload, payload)
+        self.assertIsNone(CustomJson({"id": "follow", "json": "{invalid"}).payload)
+
+    def test_register(self):
+        router = CustomJsonRouter(hive_instance=self.hv)
+
+        def handler(custom_json):
+            pass
+
+        router.register("follow", handler)
+        router.register("follow", len)
+        router.register("sm_find_match", handler)
+        self.assertEqual(sorted(router.ids), ["follow", "sm_find_match"])
+        router.unregister("follow", handler)
+        self.assertEqual(router.handlers["follow"], [len])
+        router.unregister("follow", len)
+        router.unregister("sm_find_match")
+        self.assertEqual(router.ids, [])
+
+    def test_dispatch(self):
+        router = CustomJsonRouter(hive_instance=self.hv)
+        received = []
+
+        @router.route("follow")
+        def first(custom_json):
+            received.append(custom_json.payload)
+
+        @router.route("follow")
+        def second(custom_json):
+            received.append(custom_json.payload)
+
+        self.assertEqual(router.dispatch({"id": "follow", "json": '{"a": 1}'}), 2)
+        self.assertEqual(received, [{"a": 1}, {"a": 1}])
+        # both handlers get the same decoded object
+        self.assertIs(received[0], received[1])
+        # unregistered ids are not decoded
+        self.assertEqual(router.dispatch({"id": "unknown", "json": "{invalid"}), 0)
+
+    def test_stream_custom_json_ids(self):
+        all_ops = list(self.b.stream(opNames=["custom_json"], start=100, stop=110))
+        ops = list(self.b.stream(opNames=["custom_json"], start=100, stop=110, custom_json_ids=set(["follow"])))
+        self.assertGreater(len(ops), 0)
+        self.assertEqual(ops, [op for op in all_ops if op["id"] == "follow"])
+        # other operation types are not filtered
+        ops = list(self.b.stream(opNames=["custom_json", "vote"], start=100, stop=110, custom_json_ids=set()))
+        self.assertGreater(len(ops), 0)
+        self.assertEqual(set(op["type"] for op in ops), set(["vote"]))
+
+    def test_run(self):
+        router = CustomJsonRouter(blockchain=self.b, hive_instance=self.hv)
+        follows = []
+        matches = []
+        router.register("follow", lambda custom_json: follows.append(custom_json))
+        router.register("sm_find_match", lambda custom_json: matches.append(custom_json.payload))
+        cnt = router.run(start=100, stop=110)
+        all_ops = list(self.b.stream(opNames=["custom_json"], start=100, stop=110))
+        self.assertEqual(cnt, len(all_ops))
+        self.assertEqual([c.trx_id for c in follows], [op["trx_id"] for op in all_ops if op["id"] == "follow"])
+        self.assertEqual(len(matches), len([op for op in all_ops if op["id"] == "sm_find_match"]))
+        self.assertEqual(follows[0].account, "dave")
+
+        # only registered ids are dispatched
+        router.unregister("sm_find_match")
+        n_follows = len(follows)
+        self.assertEqual(router.run(start=100, stop=110), n_follows)
+        self.assertEqual(len(follows), 2 * n_follows)
+
+        # the stream can be combined with other stream parameters
+        self.assertEqual(router.run(start=100, stop=110, accounts=["eve"]), 0)
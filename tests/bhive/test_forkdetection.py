@@ -0,0 +1,87 @@
+# This Python file uses the following encoding: utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+import unittest
+from bhive import Hive
+from bhive.blockchain import Blockchain
+from bhive.block import Block
+from bhive.forkdetection import BlockRollback, BlockWindow
+from bhive.records import BlockRecord
+from bhive.streamcursor import StreamCursor
+from .stubnode import StubHiveNode, block_id
+
+
+class Testcases(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.node = StubHiveNode(head_block_number=1000)
+        cls.hv = Hive(node=cls.node.url, num_retries=3, num_retries_call=3, timeout=10)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.node.stop()
+
+    def setUp(self):
+        self.node.forks = {}
+
+    def test_window(self):
+        window = BlockWindow(size=3)
+        for block_num in range(1, 6):
+            window.add(block_num, block_id(block_num), previous=block_id(block_num - 1), timestamp="2020-03-20T00:00:00")
+        self.assertEqual(len(window), 3)
+        self.assertEqual(window.first_block_num, 3)
+        self.assertTrue(window.links(6, block_id(5)))
+        self.assertFalse(window.links(6, block_id(5, fork=1)))
+        # unknown blocks cannot be checked
+        self.assertTrue(window.links(2, block_id(1, fork=1)))
+        rollbacks = window.rollback(3)
+        self.assertEqual([r.block_num for r in rollbacks], [5, 4])
+        self.assertEqual(rollbacks[0], BlockRollback(5, block_id(5)))
+        self.assertEqual(rollbacks[0].json()["type"], "rollback")
+        self.assertEqual(len(window), 1)
+
+    def test_blocks(self):
+        b = Blockchain(mode="head", hive_instance=self.hv)
+        delivered = []
+        for block in b.blocks(start=990, stop=998, fork_detection=True):
+            delivered.append(block)
+            if isinstance(block, Block) and block.block_num == 995 and len(delivered) == 6:
+                # blocks 994 and 995 are replaced
+                self.node.forks = {994: 1, 995: 1}
+        self.assertEqual([block.block_num for block in delivered],
+                         [990, 991, 992, 993, 994, 995, 995, 994, 994, 995, 996, 997, 998])
+        self.assertEqual(delivered[6], BlockRollback(995, block_id(995)))
+        self.assertEqual(delivered[7], BlockRollback(994, block_id(994)))
+        self.assertEqual(delivered[8]["block_id"], block_id(994, fork=1))
+        self.assertEqual(delivered[10]["previous"], block_id(995, fork=1))
+        # irreversible mode ignores fork_detection
+        b = Blockchain(hive_instance=self.hv)
+        self.assertEqual([block.block_num for block in b.blocks(start=970, stop=972, fork_detection=True)], [970, 971, 972])
+        b = Blockchain(mode="head", hive_instance=self.hv)
+        records = list(b.blocks(start=990, stop=992, fork_detection=True, raw_records=True))
+        self.assertTrue(isinstance(records[0], BlockRecord))
+        with self.assertRaises(ValueError):
+            list(b.blocks(start=990, stop=992, fork_detection=True, only_ops=True))
+
+    def test_stream(self):
+        b = Blockchain(mode="head", hive_instance=self.hv)
+        cursor = StreamCursor()
+        ops = []
+        for op in b.stream(opNames=["transfer"], start=990, stop=997, fork_detection=True, cursor=cursor):
+            ops.append(op)
+            if op["block_num"] == 996 and not self.node.forks:
+                self.node.forks = {995: 2, 996: 2}
+            if op["type"] == "rollback" and op["block_num"] == 995:
+                self.assertEqual(cursor.position, (996, -1, -1))
+        types = [(op["type"], op["block_num"]) for op in ops]
+        rollback_pos = types.index(("rollback", 996))
+        self.assertEqual(types[rollback_pos + 1], ("rollback", 995))
+        # transfers of 996 which were delivered before the fork are delivered again after the rollback
+        self.assertEqual(types[rollback_pos + 2], ("transfer", 995))
+        self.assertEqual([t for t in types[rollback_pos + 2:] if t[1] == 996], [("transfer", 996)] * 3)
+        self.assertEqual(ops[rollback_pos]["block_id"], block_id(996))
+        self.assertEqual(ops[-1]["block_num"], 997)
+        self.assertEqual(cursor.position[0], 997)
@@ -0,0 +1,97 @@
+# This Python file uses the following encoding: utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+import threading
+import time
+import unittest
+from bhive import Hive
+from bhive.blockchain import Blockchain
+from bhive.headfollower import HeadPoller
+from .stubnode import StubHiveNode
+
+
+class Testcases(unittest.TestCase):
+
+    def test_get_wait(self):
+        poller = HeadPoller(block_interval=3, delay=0.5)
+        self.assertEqual(poller.get_wait(11), 3)
+        # block 10 has been produced at 1000 s and was seen at 1001 s
+        poller.update(10, "1970-01-01T00:16:40", now=1001.)
+        self.assertEqual(poller.lag, 1.)
+        self.assertEqual(poller.expected_time(11), 1004.)
+        self.assertAlmostEqual(poller.get_wait(11, now=1001.), 3.5)
+        self.assertAlmostEqual(poller.get_wait(11, now=1003.), 1.5)
+        self.assertEqual(poller.get_wait(11, now=1010.), 0)
+        self.assertEqual(poller.get_wait(10, now=1001.), 0)
+        # a smaller lag is kept
+        poller.update(11, "1970-01-01T00:16:43", now=1003.5)
+        self.assertEqual(poller.lag, 0.5)
+        poller.update(12, "1970-01-01T00:16:46", now=1010.)
+        self.assertEqual(poller.lag, 0.5)
+
+    def test_backoff(self):
+        poller = HeadPoller(block_interval=3, min_wait=0.2, backoff=2)
+        poller.update(10, "1970-01-01T00:16:40", available=False, now=1001.)
+        waits = [poller.get_wait(11, now=1001.)]
+        for i in range(5):
+            poller.miss()
+            waits.append(poller.get_wait(11, now=1001.))
+        self.assertEqual(waits, [0.2, 0.4, 0.8, 1.6, 3, 3])
+        self.assertEqual(poller.misses, 6)
+        poller.update(11, "1970-01-01T00:16:43", now=1004.)
+        self.assertAlmostEqual(poller.get_wait(12, now=1004.), 3.3)
+
+    def test_notify(self):
+        poller = HeadPoller(block_interval=10)
+        timer = threading.Timer(0.1, poller.notify, args=(1, ))
+        timer.start()
+        waited = poller.wait(1)
+        self.assertLess(waited, 5)
+        self.assertEqual(poller.polls, 1)
+
+    def test_irreversible_mode(self):
+        node = StubHiveNode(head_block_number=1000)
+        try:
+            hv = Hive(node=node.url, num_retries=3, num_retries_call=3, timeout=10)
+            poller = HeadPoller(block_interval=3)
+            b = Blockchain(mode="irreversible", hive_instance=hv, head_poller=poller)
+            self.assertEqual(b._poll_current_block_num(980), 980)
+            # the head block number is stored with the head block time
+            head_poller = HeadPoller(block_interval=3)
+            head_poller.update(1000, node.get_block_time(1000))
+            self.assertEqual(poller.ref_block_num, 1000)
+            self.assertEqual(poller.ref_time, head_poller.ref_time)
+            # block 981 is irreversible, when block 1001 is produced
+            self.assertEqual(b._head_offset, 20)
+            now = poller.expected_time(1000)
+            self.assertAlmostEqual(poller.get_wait(981 + b._head_offset, now=now), 3.3)
+        finally:
+            node.stop()
+
+    def test_follow_head(self):
+        node = StubHiveNode(head_block_number=1000)
+        stop_event = threading.Event()
+
+        def produce():
+            while not stop_event.wait(0.3):
+                node.head_block_number += 1
+
+        try:
+            hv = Hive(node=node.url, num_retries=3, num_retries_call=3, timeout=10)
+            poller = HeadPoller(block_interval=0.3, delay=0.05, min_wait=0.05)
+            b = Blockchain(mode="head", hive_instance=hv, head_poller=poller)
+            producer = threading.Thread(target=produce)
+            producer.daemon = True
+            producer.start()
+            start = time.time()
+            block_nums = [block.block_num for block in b.blocks(start=1000, stop=1006)]
+            self.assertEqual(block_nums, list(range(1000, 1007)))
+            self.assertLess(time.time() - start, 10)
+            # a few polls per produced block
+            self.assertLess(node.count_calls("get_dynamic_global_properties"), 40)
+            self.assertGreater(poller.polls, 0)
+        finally:
+            stop_event.set()
+            node.stop()
@@ -0,0 +1,106 @@
+# This Python file uses the following encoding: utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+import shutil
+import tempfile
+import unittest
+import bhivebase.operationids
+from bhive import Hive
+from bhive.blockarchive import BlockArchive
+from bhive.blockchain import Blockchain
+from bhive.opsstatistics import OpsStatistics, get_op_type
+from .stubnode import StubHiveNode
+
+
+class Testcases(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.node = StubHiveNode(head_block_number=1000)
+        cls.hv = Hive(node=cls.node.url, num_retries=3, num_retries_call=3, timeout=10)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.node.stop()
+
+    def get_reference(self, b, start, stop):
+        ops_stat = bhivebase.operationids.operations.copy()
+        for key in ops_stat:
+            ops_stat[key] = 0
+        for block in b.blocks(start=start, stop=stop):
+            ops_stat = block.ops_statistics(add_to_ops_stat=ops_stat)
+        for block in b.blocks(start=start, stop=stop, only_ops=True, only_virtual_ops=True):
+            ops_stat = block.ops_statistics(add_to_ops_stat=ops_stat)
+        return ops_stat
+
+    def test_get_op_type(self):
+        self.assertEqual(get_op_type(["vote", {}]), "vote")
+        self.assertEqual(get_op_type({"type": "vote_operation", "value": {}}), "vote")
+        self.assertEqual(get_op_type({"op": {"type": "producer_reward_operation", "value": {}}}), "producer_reward")
+        self.assertEqual(get_op_type({"op": ["transfer", {}]}), "transfer")
+
+    def test_merge(self):
+        stats = OpsStatistics(interval=60)
+        stats.add("vote", 130)
+        stats.add("vote", 150, count=2)
+        other = OpsStatistics(interval=60)
+        other.add("transfer", 10)
+        other.add("vote", 200)
+        stats.merge(other)
+        self.assertEqual(stats.counts, {"vote": 4, "transfer": 1})
+        self.assertEqual(len(stats), 4)
+        self.assertEqual(stats.get_series("vote"), [0, 0, 3, 1])
+        self.assertEqual(stats.get_series("transfer"), [1, 0, 0, 0])
+        self.assertEqual(stats.times()[2], stats.start_time.replace(minute=2))
+        self.assertEqual(stats.json()["vote"], 4)
+        self.assertEqual(stats.json()["comment"], 0)
+        self.assertRaises(ValueError, stats.merge, OpsStatistics())
+
+    def test_ops_statistics(self):
+        b = Blockchain(hive_instance=self.hv)
+        ops_stat = b.ops_statistics(1, 200)
+        self.assertEqual(ops_stat, self.get_reference(b, 1, 200))
+        self.assertEqual(ops_stat["vote"], 200)
+        ops_stat = b.ops_statistics(1, 200, with_virtual_ops=False, add_to_ops_stat={"vote": 1})
+        self.assertEqual(ops_stat, {"vote": 201, "transfer": 600, "custom_json": 100})
+        self.assertIsNone(b.ops_statistics(2000))
+
+    def test_interval(self):
+        b = Blockchain(hive_instance=self.hv)
+        stats = b.ops_statistics(1, 200, interval=300)
+        self.assertEqual(stats.blocks, 200)
+        # 100 blocks per interval, block 100 starts the second one
+        self.assertEqual(stats.get_series("vote"), [99, 100, 1])
+        for op_type, count in stats.counts.items():
+            self.assertEqual(sum(stats.get_series(op_type)), count)
+        total = b.ops_statistics(201, 300, interval=300, add_to_ops_stat=stats)
+        self.assertIs(total, stats)
+        self.assertEqual(total.get_series("vote"), [99, 100, 100, 1])
+
+    def test_processes(self):
+        b = Blockchain(hive_instance=self.hv)
+        ops_stat = b.ops_statistics(1, 250, processes=2, shard_size=100)
+        self.assertEqual(ops_stat, self.get_reference(b, 1, 250))
+        stats = b.ops_statistics(1, 250, interval=300, processes=2, shard_size=100)
+        single = b.ops_statistics(1, 250, interval=300)
+        self.assertEqual(stats.counts, single.counts)
+        self.assertEqual(stats.series, single.series)
+        self.assertEqual(stats.blocks, 250)
+
+    def test_block_archive(self):
+        path = tempfile.mkdtemp()
+        try:
+            b = Blockchain(hive_instance=self.hv)
+            archive = BlockArchive(path)
+            ops_stat = b.ops_statistics(1, 200, block_archive=archive)
+            self.assertEqual(ops_stat, self.get_reference(b, 1, 200))
+            archive.close()
+            calls = self.node.count_calls("get_block") + self.node.count_calls("get_block_range")
+            ops_stat_archive = b.ops_statistics(1, 200, processes=2, shard_size=100,
+                                                block_archive=BlockArchive(path, read_only=True))
+            self.assertEqual(ops_stat_archive, ops_stat)
+            self.assertEqual(self.node.count_calls("get_block") + self.node.count_calls("get_block_range"), calls)
+        finally:
+            shutil.rmtree(path)
@@ -0,0 +1,105 @@
+# This Python file uses the following encoding: utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+from bhive import Hive
+from bhive.blockchain import Blockchain
+from bhive.blockchainobject import BlockchainObject
+from bhive.block import Block, BlockHeader
+from bhive.blockarchive import BlockArchive
+from bhive.records import BlockRecord, OperationRecord
+from bhive.utils import addTzInfo
+from .stubnode import StubHiveNode
+
+
+class Testcases(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.node = StubHiveNode(head_block_number=1000)
+        cls.hv = Hive(node=cls.node.url, num_retries=3, num_retries_call=3, timeout=10)
+        cls.b = Blockchain(hive_instance=cls.hv)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.node.stop()
+
+    def test_block_record(self):
+        data = self.node.get_block(10)
+        record = BlockRecord(data)
+        self.assertEqual(record.block_num, 10)
+        self.assertEqual(record["id"], 10)
+        self.assertIn("transactions", record)
+        # the data is not changed
+        self.assertEqual(record["timestamp"], "2020-03-20T00:00:30")
+        self.assertEqual(record.timestamp, addTzInfo(datetime(2020, 3, 20, 0, 0, 30)))
+        self.assertEqual(record.json(), self.node.get_block(10))
+        block = record.to_block(hive_instance=self.hv)
+        self.assertTrue(isinstance(block, Block))
+        self.assertEqual(block.block_num, 10)
+        self.assertEqual(block["timestamp"], record.timestamp)
+        self.assertFalse(hasattr(record, "__dict__"))
+
+    def test_block_json_copy(self):
+        block = Block(self.node.get_block(11), hive_instance=self.hv)
+        data = block.json()
+        data["transactions"][0]["operations"][0]["value"]["memo"] = "changed"
+        data["transactions"][0]["signatures"].append("changed")
+        self.assertEqual(block.json(), Block(self.node.get_block(11), hive_instance=self.hv).json())
+        header = BlockHeader(dict(self.node.get_block(11), extensions=[["a", {"b": 1}]]), hive_instance=self.hv)
+        data = header.json()
+        data["extensions"][0][1]["b"] = 2
+        data["witness"] = "changed"
+        self.assertEqual(header.json()["extensions"], [["a", {"b": 1}]])
+        self.assertEqual(header["witness"], "gtg")
+
+    def test_operation_record(self):
+        event = {"type": "vote_operation", "value": {"voter": "carol", "author": "alice", "permlink": "p", "weight": 100}}
+        record = OperationRecord("vote", event["value"], 10, 1, 0, "ef" * 20, "2020-03-20T00:00:30", event)
+        self.assertEqual(record["voter"], "carol")
+        self.assertEqual(record["_id"], Blockchain.hash_op(event))
+        self.assertEqual(record.position, (10, 1, 0))
+        self.assertIsNone(record.get("memo"))
+        self.assertIn("timestamp", record)
+        self.assertEqual(record.json(), {"type": "vote", "voter": "carol", "author": "alice", "permlink": "p",
+                                         "weight": 100, "_id": Blockchain.hash_op(event),
+                                         "timestamp": addTzInfo(datetime(2020, 3, 20, 0, 0, 30)),
+                                         "block_num": 10, "trx_num": 1, "trx_id": "ef" * 20})
+
+    def test_blocks(self):
+        for kwargs in [{}, {"use_block_range": False}, {"max_batch_size": 5, "use_block_range": False},
+                       {"threading": True, "thread_num": 3}, {"only_ops": True, "use_block_range": False},
+                       {"only_virtual_ops": True}]:
+            blocks = list(self.b.blocks(start=100, stop=110, **kwargs))
+            BlockchainObject.clear_cache()
+            records = list(self.b.blocks(start=100, stop=110, raw_records=True, **kwargs))
+            self.assertEqual(len(BlockchainObject._cache), 0)
+            self.assertEqual([r.block_num for r in records], list(range(100, 111)))
+            for block, record in zip(blocks, records):
+                self.assertTrue(isinstance(record, BlockRecord))
+                self.assertEqual(block.json(), record.to_block(hive_instance=self.hv).json())
+
+    def test_stream(self):
+        for kwargs in [{}, {"only_virtual_ops": True}, {"threading": True, "thread_num": 3},
+                       {"opNames": ["custom_json"], "custom_json_ids": ["follow"]}]:
+            ops = list(self.b.stream(start=100, stop=110, **kwargs))
+            records = list(self.b.stream(start=100, stop=110, raw_records=True, **kwargs))
+            self.assertGreater(len(records), 0)
+            self.assertTrue(isinstance(records[0], OperationRecord))
+            self.assertEqual(ops, [record.json() for record in records])
+
+    def test_archive(self):
+        path = tempfile.mkdtemp()
+        try:
+            with BlockArchive(path) as archive:
+                records = list(self.b.blocks(start=100, stop=105, raw_records=True, block_archive=archive))
+                self.assertEqual(len(archive), 6)
+                self.assertEqual(list(self.b.blocks(start=100, stop=105, raw_records=True, block_archive=archive)), records)
+                self.assertEqual(archive.get(100), records[0].json())
+        finally:
+            shutil.rmtree(path)
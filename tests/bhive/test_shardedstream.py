@@ -0,0 +1,135 @@
+# This Python file uses the following encoding: utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+import threading
+import unittest
+from bhive import Hive
+from bhive.blockchain import Blockchain
+from bhive.block import Block
+from bhive.exceptions import ShardWorkerException
+from bhive.headfollower import HeadPoller
+from bhive.records import BlockRecord, OperationRecord
+from bhive.shardedstream import ShardedStream, get_shards, get_hive_config
+from bhive.streamcursor import StreamCursor, MemoryCursorStore
+from .stubnode import StubHiveNode
+
+
+class Testcases(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.node = StubHiveNode(head_block_number=1000)
+        cls.hv = Hive(node=cls.node.url, num_retries=3, num_retries_call=3, timeout=10)
+        cls.b = Blockchain(hive_instance=cls.hv)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.node.stop()
+
+    def setUp(self):
+        self.node.disabled_methods = set()
+
+    def test_get_shards(self):
+        self.assertEqual(get_shards(1, 25, 10), [(1, 10), (11, 20), (21, 25)])
+        self.assertEqual(get_shards(5, 5, 10), [(5, 5)])
+        self.assertEqual(get_shards(6, 5, 10), [])
+        config = get_hive_config(self.hv)
+        self.assertEqual(config["node"], [self.node.url])
+        self.assertEqual(config["num_retries"], 3)
+
+    def test_blocks(self):
+        blocks = list(self.b.blocks(start=100, stop=130))
+        sharded = list(self.b.blocks(start=100, stop=130, processes=3, shard_size=4))
+        self.assertTrue(isinstance(sharded[0], Block))
+        self.assertEqual([block.block_num for block in sharded], list(range(100, 131)))
+        self.assertEqual([block.json() for block in sharded], [block.json() for block in blocks])
+        records = list(self.b.blocks(start=100, stop=130, processes=2, shard_size=7, raw_records=True))
+        self.assertTrue(isinstance(records[0], BlockRecord))
+        self.assertEqual([record.to_block(hive_instance=self.hv).json() for record in records], [block.json() for block in blocks])
+        unordered = list(self.b.blocks(start=100, stop=130, processes=3, shard_size=4, ordered=False))
+        self.assertEqual(sorted(block.block_num for block in unordered), list(range(100, 131)))
+        vops = list(self.b.blocks(start=100, stop=110, only_virtual_ops=True, processes=2, shard_size=3))
+        self.assertEqual([block.json() for block in vops],
+                         [block.json() for block in self.b.blocks(start=100, stop=110, only_virtual_ops=True)])
+
+    def test_shard_until_current_block(self):
+        node = StubHiveNode(head_block_number=1000)
+        stop_event = threading.Event()
+
+        def produce():
+            while not stop_event.wait(0.1):
+                node.head_block_number += 1
+
+        try:
+            hv = Hive(node=node.url, num_retries=3, num_retries_call=3, timeout=10)
+            b = Blockchain(hive_instance=hv, head_poller=HeadPoller(block_interval=0.1, delay=0.02, min_wait=0.02))
+            shards = []
+            sharded_stream = b._sharded_stream
+
+            def get_sharded_stream(start, stop, *args):
+                shards.append((start, stop))
+                return sharded_stream(start, stop, *args)
+            b._sharded_stream = get_sharded_stream
+            producer = threading.Thread(target=produce)
+            producer.daemon = True
+            producer.start()
+            # the last irreversible block is 980, later blocks are not sharded
+            block_nums = []
+            for block in b.blocks(start=970, stop=984, processes=2, shard_size=5):
+                self.assertLessEqual(block.block_num, node.head_block_number - 20)
+                block_nums.append(block.block_num)
+            self.assertEqual(block_nums, list(range(970, 985)))
+            self.assertEqual(shards[0][1], 980)
+            current_block_num = b.get_current_block_num()
+            ops = list(b.stream(start=current_block_num - 5, stop=current_block_num + 2, processes=2, shard_size=2))
+            self.assertEqual(shards[1][0], current_block_num - 5)
+            self.assertLess(shards[1][1], current_block_num + 2)
+            self.assertEqual(sorted(set(op["block_num"] for op in ops)), list(range(current_block_num - 5, current_block_num + 3)))
+        finally:
+            stop_event.set()
+            node.stop()
+
+    def test_stream(self):
+        for kwargs in [{}, {"opNames": ["transfer"], "accounts": ["bob"]},
+                       {"opNames": ["custom_json"], "custom_json_ids": set(["follow"])},
+                       {"only_virtual_ops": True}, {"raw_ops": True}]:
+            ops = list(self.b.stream(start=100, stop=120, **kwargs))
+            sharded = list(self.b.stream(start=100, stop=120, processes=3, shard_size=5, **kwargs))
+            self.assertGreater(len(sharded), 0)
+            self.assertEqual(sharded, ops)
+        records = list(self.b.stream(start=100, stop=120, processes=2, shard_size=5, raw_records=True))
+        self.assertTrue(isinstance(records[0], OperationRecord))
+        self.assertEqual([record.json() for record in records], list(self.b.stream(start=100, stop=120)))
+        all_ops = list(self.b.stream(start=100, stop=120))
+        unordered = list(self.b.stream(start=100, stop=120, processes=3, shard_size=5, ordered=False))
+        self.assertEqual(sorted(op["_id"] for op in unordered), sorted(op["_id"] for op in all_ops))
+
+    def test_stream_cursor(self):
+        cursor = StreamCursor(MemoryCursorStore())
+        ops = list(self.b.stream(opNames=["transfer"], start=100, stop=120))
+        first = []
+        try:
+            for op in self.b.stream(opNames=["transfer"], start=100, stop=120, processes=2, shard_size=5, cursor=cursor):
+                if len(first) == 10:
+                    raise RuntimeError("crash")
+                first.append(op)
+        except RuntimeError:
+            pass
+        self.assertEqual(cursor.position[0], first[-1]["block_num"])
+        rest = list(self.b.stream(opNames=["transfer"], start=100, stop=120, processes=2, shard_size=5, cursor=cursor))
+        self.assertEqual(first + rest, ops)
+        with self.assertRaises(ValueError):
+            list(self.b.stream(start=100, stop=120, processes=2, ordered=False, cursor=cursor))
+
+    def test_worker_error(self):
+        self.node.disabled_methods = set(["get_block", "get_block_range"])
+        with self.assertRaises(ShardWorkerException):
+            list(self.b.blocks(start=100, stop=120, processes=2, shard_size=5))
+
+    def test_run(self):
+        stream = ShardedStream(get_hive_config(self.hv), processes=2, shard_size=3, chunk_size=2, queue_size=1)
+        items = list(stream.run("stream", 100, 110, {"opNames": ["vote"]}))
+        self.assertEqual([op for position, op in items], list(self.b.stream(opNames=["vote"], start=100, stop=110)))
+        self.assertEqual([position[0] for position, op in items], [op["block_num"] for position, op in items])
@@ -0,0 +1,96 @@
+# This Python file uses the following encoding: utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+import os
+import shutil
+import tempfile
+import unittest
+from bhive import Hive
+from bhive.blockchain import Blockchain
+from bhive.streamcursor import StreamCursor, CursorStore, MemoryCursorStore, FileCursorStore, SQLiteCursorStore
+from .stubnode import StubHiveNode
+
+
+class Testcases(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.node = StubHiveNode(head_block_number=1000)
+        cls.hv = Hive(node=cls.node.url, num_retries=3, num_retries_call=3, timeout=10)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.node.stop()
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def get_stores(self, name="cursor"):
+        return [MemoryCursorStore(),
+                FileCursorStore(os.path.join(self.path, name + ".json")),
+                SQLiteCursorStore(os.path.join(self.path, "cursor.sqlite"), name=name)]
+
+    def test_stores(self):
+        for store in self.get_stores():
+            self.assertIsNone(store.load())
+            store.save((10, 1, 2))
+            self.assertEqual(store.load(), (10, 1, 2))
+            store.save((11, 0, 0))
+            self.assertEqual(store.load(), (11, 0, 0))
+            store.close()
+        self.assertEqual(FileCursorStore(os.path.join(self.path, "cursor.json")).load(), (11, 0, 0))
+        self.assertFalse(os.path.isfile(os.path.join(self.path, "cursor.json.tmp")))
+        filename = os.path.join(self.path, "cursor.sqlite")
+        self.assertEqual(SQLiteCursorStore(filename, name="cursor").load(), (11, 0, 0))
+        self.assertIsNone(SQLiteCursorStore(filename, name="other").load())
+
+    def test_abstract_store(self):
+        self.assertRaises(TypeError, CursorStore)
+
+        class LoadOnlyStore(CursorStore):
+            def load(self):
+                return None
+        self.assertRaises(TypeError, LoadOnlyStore)
+        self.assertTrue(isinstance(MemoryCursorStore(), CursorStore))
+
+    def test_cursor(self):
+        store = MemoryCursorStore()
+        cursor = StreamCursor(store, save_interval=3, save_seconds=None)
+        self.assertIsNone(cursor.block_num)
+        self.assertFalse(cursor.is_processed((1, 0, 0)))
+        cursor.update((1, 0, 0))
+        cursor.update((1, 0, 1))
+        self.assertIsNone(store.load())
+        cursor.update((1, 1, 0))
+        self.assertEqual(store.load(), (1, 1, 0))
+        self.assertTrue(cursor.is_processed((1, 0, 5)))
+        self.assertFalse(cursor.is_processed((2, 0, 0)))
+        cursor.update((2, 0, 0))
+        cursor.save()
+        self.assertEqual(StreamCursor(store).position, (2, 0, 0))
+
+    def test_stream_resume(self):
+        b = Blockchain(hive_instance=self.hv)
+        for i, kwargs in enumerate([{}, {"opNames": ["vote", "custom_json"]}, {"only_virtual_ops": True}]):
+            all_ops = list(b.stream(start=100, stop=110, **kwargs))
+            for store in self.get_stores(name="stream_%d" % i):
+                ops = []
+                cursor = StreamCursor(store, save_interval=5)
+                try:
+                    for op in b.stream(start=100, stop=110, cursor=cursor, **kwargs):
+                        if len(ops) == 13:
+                            raise RuntimeError("crash")
+                        ops.append(op)
+                except RuntimeError:
+                    pass
+                # restart
+                cursor = StreamCursor(store, save_interval=5)
+                self.assertEqual(cursor.position[0], ops[-1]["block_num"])
+                ops.extend(b.stream(start=100, stop=110, cursor=cursor, **kwargs))
+                self.assertEqual(ops, all_ops)
+                self.assertEqual(store.load()[0], 110)
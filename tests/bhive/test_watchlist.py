@@ -0,0 +1,80 @@
+# This Python file uses the following encoding: utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+import unittest
+from bhive import Hive
+from bhive.blockchain import Blockchain
+from bhive.watchlist import AccountWatchlist, account_fields
+from bhivebase.operationids import ops, virtual_op_filter
+from .stubnode import StubHiveNode
+
+
+class Testcases(unittest.TestCase):
+
+    def test_watchlist(self):
+        watchlist = AccountWatchlist(["alice", "bob"])
+        self.assertEqual(len(watchlist), 2)
+        self.assertIn("alice", watchlist)
+        watchlist.add("carol")
+        watchlist.remove("bob")
+        watchlist.remove("unknown")
+        self.assertEqual(sorted(watchlist), ["alice", "carol"])
+        watchlist.update(["dave", "eve"])
+        self.assertEqual(len(watchlist), 4)
+        watchlist.clear()
+        self.assertEqual(len(watchlist), 0)
+
+    def test_matches(self):
+        watchlist = AccountWatchlist(["alice"])
+        self.assertTrue(watchlist.matches("transfer", {"from": "bob", "to": "alice"}))
+        self.assertTrue(watchlist.matches("transfer_operation", {"from": "alice", "to": "bob"}))
+        self.assertFalse(watchlist.matches("transfer", {"from": "bob", "to": "carol", "memo": "alice"}))
+        self.assertTrue(watchlist.matches("custom_json", {"required_auths": [], "required_posting_auths": ["alice"]}))
+        self.assertFalse(watchlist.matches("custom_json", {"required_auths": [], "required_posting_auths": ["bob"]}))
+        self.assertTrue(watchlist.matches("curation_reward", {"curator": "bob", "comment_author": "alice"}))
+        self.assertFalse(watchlist.matches("hardfork", {"hardfork_id": 23}))
+        # unknown operation types use the default fields
+        self.assertTrue(watchlist.matches("new_operation", {"account": "alice"}))
+        self.assertEqual(AccountWatchlist().get_accounts("escrow_release", {"from": "a", "to": "b", "agent": "c", "who": "a",
+                                                                            "receiver": "b"}), ["a", "b", "c", "a", "b"])
+        watchlist = AccountWatchlist(["alice"], fields={"transfer": ("memo", )})
+        self.assertTrue(watchlist.matches("transfer", {"from": "bob", "to": "carol", "memo": "alice"}))
+
+    def test_account_fields(self):
+        for op_name in list(ops) + list(virtual_op_filter):
+            self.assertIn(op_name, account_fields)
+
+    def test_stream(self):
+        node = StubHiveNode(head_block_number=1000)
+        try:
+            hv = Hive(node=node.url, num_retries=3, num_retries_call=3, timeout=10)
+            b = Blockchain(hive_instance=hv)
+            all_ops = list(b.stream(start=100, stop=105))
+            ops_bob = list(b.stream(start=100, stop=105, accounts=["bob"]))
+            self.assertGreater(len(ops_bob), 0)
+            self.assertEqual(ops_bob, [op for op in all_ops if op["type"] == "transfer" and op["to"] == "bob"])
+            ops_dave = list(b.stream(opNames=["custom_json"], start=100, stop=105, accounts=["dave"]))
+            self.assertEqual(ops_dave, [op for op in all_ops if op["type"] == "custom_json"])
+            vops = list(b.stream(start=100, stop=105, only_virtual_ops=True, accounts=["alice"]))
+            self.assertEqual([op["block_num"] for op in vops], [100, 105])
+
+            # the watchlist is changed while streaming
+            watchlist = AccountWatchlist(["bob"])
+            ops = []
+            for op in b.stream(opNames=["transfer"], start=100, stop=105, accounts=watchlist):
+                ops.append(op)
+                if op["block_num"] == 102:
+                    watchlist.add("carol")
+            expected = []
+            accounts = set(["bob"])
+            for op in all_ops:
+                if op["type"] == "transfer" and op["to"] in accounts:
+                    expected.append(op)
+                    if op["block_num"] == 102:
+                        accounts.add("carol")
+            self.assertEqual(ops, expected)
+            self.assertIn("carol", [op["to"] for op in ops])
+        finally:
+            node.stop()
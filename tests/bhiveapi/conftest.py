@@ -0,0 +1,7 @@
+# This Python file uses the following encoding: utf-8
+import sys
+
+collect_ignore = []
+# bhiveapi.asynchivenoderpc uses async/await, which needs Python 3.5
+if sys.version_info < (3, 5):
+    collect_ignore.append("test_asynchivenoderpc.py")
@@ -0,0 +1,188 @@
+# This Python file uses the following encoding: utf-8
+import asyncio
+import json
+import time
+import unittest
+from bhiveapi.asynchivenoderpc import AsyncHiveNodeRPC
+from bhiveapi import exceptions
+
+
+class StubNode(object):
+    """Local asyncio JSON-RPC node answering a few appbase calls"""
+    def __init__(self, delay=0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        # number of get_block calls which are answered with an internal error
+        self.internal_errors = 0
+        self.calls = 0
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        return "http://127.0.0.1:%d" % self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    def answer(self, query):
+        if query["method"] == "call":
+            api, name, params = query["params"]
+        else:
+            api, name = query["method"].split(".")
+            params = query["params"]
+        if name == "get_config":
+            result = {"HIVE_BLOCKCHAIN_VERSION": "0.23.0", "HIVE_CHAIN_ID": "beeab0de" + "0" * 56}
+        elif name == "get_block" and self.internal_errors > 0:
+            self.internal_errors -= 1
+            return {"jsonrpc": "2.0", "id": query["id"],
+                    "error": {"code": -32000, "message": "Internal Error"}}
+        elif name == "get_block":
+            result = {"block": {"block_id": "%08x" % params["block_num"] + "0" * 32}}
+        else:
+            return {"jsonrpc": "2.0", "id": query["id"],
+                    "error": {"code": -32003, "message": "Could not find method %s" % name}}
+        return {"jsonrpc": "2.0", "id": query["id"], "result": result}
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                length = 0
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b""):
+                        break
+                    key, _, value = line.decode().partition(":")
+                    if key.lower() == "content-length":
+                        length = int(value)
+                payload = json.loads((await reader.readexactly(length)).decode())
+                self.calls += 1
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+                if self.fail:
+                    body = b"<html>503 Service Temporarily Unavailable</html>"
+                    status = b"503 Service Unavailable"
+                else:
+                    if isinstance(payload, list):
+                        body = json.dumps([self.answer(q) for q in payload]).encode()
+                    else:
+                        body = json.dumps(self.answer(payload)).encode()
+                    status = b"200 OK"
+                writer.write(b"HTTP/1.1 " + status + b"\r\nContent-Type: application/json\r\n"
+                             b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+class Testcases(unittest.TestCase):
+
+    def test_appbase_call(self):
+        async def run():
+            node = StubNode()
+            url = await node.start()
+            rpc = AsyncHiveNodeRPC(url, num_retries=1, num_retries_call=1, timeout=5)
+            block = await rpc.get_block({"block_num": 10}, api="block")
+            self.assertTrue(rpc.is_appbase_ready())
+            self.assertEqual(block["block"]["block_id"][:8], "0000000a")
+            await rpc.close()
+            await node.stop()
+        asyncio.run(run())
+
+    def test_concurrent_calls(self):
+        async def run():
+            node = StubNode(delay=0.1)
+            url = await node.start()
+            rpc = AsyncHiveNodeRPC(url, num_retries=1, num_retries_call=1, timeout=5)
+            await rpc.rpcconnect()
+            start = time.time()
+            blocks = await asyncio.gather(*[rpc.get_block({"block_num": n}, api="block") for n in range(1, 51)])
+            duration = time.time() - start
+            self.assertEqual([int(b["block"]["block_id"][:8], 16) for b in blocks], list(range(1, 51)))
+            self.assertLess(duration, 50 * 0.1 / 2)
+            await rpc.close()
+            await node.stop()
+        asyncio.run(run())
+
+    def test_batch_call(self):
+        async def run():
+            node = StubNode()
+            url = await node.start()
+            rpc = AsyncHiveNodeRPC(url, num_retries=1, num_retries_call=1, timeout=5)
+            await rpc.rpcconnect()
+            for n in range(1, 4):
+                await rpc.get_block({"block_num": n}, api="block", add_to_queue=True)
+            blocks = await rpc.get_block({"block_num": 4}, api="block", add_to_queue=False)
+            self.assertEqual(len(blocks), 4)
+            await rpc.close()
+            await node.stop()
+        asyncio.run(run())
+
+    def test_node_failover(self):
+        async def run():
+            bad_node = StubNode(fail=True)
+            good_node = StubNode()
+            bad_url = await bad_node.start()
+            good_url = await good_node.start()
+            rpc = AsyncHiveNodeRPC([bad_url, good_url], num_retries=5, num_retries_call=1, timeout=5)
+            block = await rpc.get_block({"block_num": 3}, api="block")
+            self.assertEqual(rpc.url, good_url)
+            self.assertEqual(block["block"]["block_id"][:8], "00000003")
+            await rpc.close()
+            await bad_node.stop()
+            await good_node.stop()
+        asyncio.run(run())
+
+    def test_concurrent_retries(self):
+        async def run():
+            node = StubNode(delay=0.05)
+            url = await node.start()
+            rpc = AsyncHiveNodeRPC(url, num_retries=1, num_retries_call=3, timeout=5)
+            await rpc.rpcconnect()
+            node.internal_errors = 1
+            # the retry of one call is not affected by the other calls in progress
+            blocks = await asyncio.gather(*[rpc.get_block({"block_num": n}, api="block") for n in range(1, 21)])
+            self.assertEqual([int(b["block"]["block_id"][:8], 16) for b in blocks], list(range(1, 21)))
+            self.assertEqual(rpc.nodes.num_retries_call, 3)
+            await rpc.close()
+            await node.stop()
+        asyncio.run(run())
+
+    def test_failover_detects_protocol(self):
+        async def run():
+            first_node = StubNode()
+            second_node = StubNode()
+            first_url = await first_node.start()
+            second_url = await second_node.start()
+            rpc = AsyncHiveNodeRPC([first_url, second_url], num_retries=5, num_retries_call=1, timeout=5)
+            await rpc.rpcconnect()
+            self.assertEqual(rpc.url, first_url)
+            await first_node.stop()
+            await rpc.transport.close()
+            block = await rpc.get_block({"block_num": 3}, api="block")
+            self.assertEqual(block["block"]["block_id"][:8], "00000003")
+            self.assertEqual(rpc.url, second_url)
+            # the protocol of the new node is detected before the next call
+            self.assertEqual(second_node.calls, 1)
+            await rpc.get_block({"block_num": 4}, api="block")
+            self.assertEqual(second_node.calls, 3)
+            self.assertTrue(rpc.is_appbase_ready())
+            await rpc.close()
+            await second_node.stop()
+        asyncio.run(run())
+
+    def test_error_classification(self):
+        async def run():
+            node = StubNode()
+            url = await node.start()
+            rpc = AsyncHiveNodeRPC(url, num_retries=1, num_retries_call=1, timeout=5)
+            with self.assertRaises(exceptions.NoMethodWithName):
+                await rpc.get_config_abc(api="database")
+            await rpc.close()
+            await node.stop()
+        asyncio.run(run())
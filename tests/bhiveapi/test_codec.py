@@ -0,0 +1,46 @@
+# This Python file uses the following encoding: utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+import json
+import unittest
+from parameterized import parameterized
+from bhiveapi.codec import JsonCodec, JSON_MODULE, dumps, loads
+
+
+class Testcases(unittest.TestCase):
+
+    @parameterized.expand([
+        (JSON_MODULE,),
+        ("json",),
+    ])
+    def test_roundtrip(self, module):
+        codec = JsonCodec(module)
+        payload = {"jsonrpc": "2.0", "id": 1, "method": "block_api.get_block",
+                   "params": {"block_num": 1}, "memo": "äöü €"}
+        data = codec.dumps(payload)
+        self.assertTrue(isinstance(data, bytes))
+        self.assertEqual(json.loads(data.decode("utf8")), payload)
+        self.assertEqual(codec.loads(data), payload)
+        self.assertEqual(codec.loads(data.decode("utf8")), payload)
+
+    @parameterized.expand([
+        (JSON_MODULE,),
+        ("json",),
+    ])
+    def test_stdlib_fallback(self, module):
+        codec = JsonCodec(module)
+        # control characters inside of strings are accepted (strict=False)
+        self.assertEqual(codec.loads('{"memo": "a\tb"}'), {"memo": "a\tb"})
+        # integers with more than 64 bit
+        self.assertEqual(codec.loads(codec.dumps({"a": 2 ** 70})), {"a": 2 ** 70})
+        with self.assertRaises(ValueError):
+            codec.loads(b"<html>503 Service Temporarily Unavailable</html>")
+
+    def test_unknown_module(self):
+        with self.assertRaises(ValueError):
+            JsonCodec("abc")
+
+    def test_module_functions(self):
+        self.assertEqual(loads(dumps([1, "a", None])), [1, "a", None])
@@ -0,0 +1,422 @@
+# This Python file uses the following encoding: utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+import json
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from bhiveapi.graphenerpc import GrapheneRPC
+from bhiveapi.hivenoderpc import HiveNodeRPC
+from bhiveapi.rpcutils import get_api_method, get_query
+from bhiveapi.exceptions import RPCError, RPCErrorDoRetry
+from bhiveapi.rpccache import RPCCache
+
+
+class StubServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers get_block, get_config, broadcast_transaction and get_dynamic_global_properties calls"""
+
+    def log_message(self, *args):
+        pass
+
+    def answer(self, query):
+        api, method, params = get_api_method(query)
+        node = self.server.node
+        with node.lock:
+            node.calls.append(method)
+            if node.internal_errors > 0:
+                node.internal_errors -= 1
+                return {"jsonrpc": "2.0", "id": query["id"], "error": {"code": -32000, "message": "Internal Error"}}
+        if method == "get_block":
+            block_num = params["block_num"] if isinstance(params, dict) else params[0]
+            result = {"block": {"block_id": "%08x" % block_num + "0" * 32, "previous": "%08x" % (block_num - 1) + "0" * 32}}
+        elif method == "get_config":
+            result = {"HIVE_CHAIN_ID": "beeab0de" + "0" * 56, "HIVE_BLOCKCHAIN_VERSION": "0.23.0"}
+        elif method == "get_dynamic_global_properties":
+            result = {"head_block_number": 100, "last_irreversible_block_num": 80}
+        else:
+            result = {"method": method}
+        return {"jsonrpc": "2.0", "id": query["id"], "result": result}
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])).decode("utf8"))
+        node = self.server.node
+        delay = node.get_delay()
+        if delay:
+            time.sleep(delay)
+        if node.fail:
+            with node.lock:
+                node.calls.append("failed")
+            body = b"<html>503 Service Temporarily Unavailable</html>"
+            self.send_response(503)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if isinstance(payload, list) and node.single_reply:
+            # broken node answering only the first call of a batch
+            body = self.answer(payload[0])
+        elif isinstance(payload, list):
+            # replies of a batch may be returned in any order
+            body = [self.answer(q) for q in reversed(payload)]
+        else:
+            body = self.answer(payload)
+        body = json.dumps(body).encode("utf8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class StubNode(object):
+    """Local JSON-RPC node running in a background thread"""
+    def __init__(self, delay=0):
+        self.delay = delay
+        self.fail = False
+        # number of calls which are answered with an Internal Error
+        self.internal_errors = 0
+        self.single_reply = False
+        self.calls = []
+        self.lock = threading.Lock()
+        self.server = StubServer(("127.0.0.1", 0), StubHandler)
+        self.server.node = self
+        self.url = "http://127.0.0.1:%d" % self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def get_delay(self):
+        return self.delay
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def create_rpc(nodes, **kwargs):
+    kwargs.setdefault("num_retries", 2)
+    kwargs.setdefault("num_retries_call", 2)
+    return GrapheneRPC([n.url for n in nodes], timeout=10, disable_chain_detection=True, **kwargs)
+
+
+class Testcases(unittest.TestCase):
+    def setUp(self):
+        self.nodes = []
+
+    def tearDown(self):
+        for node in self.nodes:
+            node.stop()
+
+    def start_nodes(self, *delays):
+        self.nodes = [StubNode(delay=d) for d in delays]
+        return self.nodes
+
+    def test_get_block(self):
+        node, = self.start_nodes(0)
+        rpc = create_rpc([node])
+        block = rpc.get_block({"block_num": 5}, api="block")
+        self.assertEqual(block["block"]["block_id"][:8], "00000005")
+
+    def test_hedged_request(self):
+        slow, fast = self.start_nodes(0, 0)
+        rpc = create_rpc([slow, fast], hedge_requests=True, hedge_min_samples=5, node_reschedule_interval=0)
+        for i in range(5):
+            rpc.get_block({"block_num": i + 1}, api="block")
+        self.assertEqual(rpc.hedge_stats["hedged"], 0)
+        self.assertEqual(len(fast.calls), 0)
+        slow.delay = 1.
+        slow_latency = rpc.nodes[0].latency
+        start = time.time()
+        block = rpc.get_block({"block_num": 10}, api="block")
+        self.assertLess(time.time() - start, 1.)
+        self.assertEqual(block["block"]["block_id"][:8], "0000000a")
+        self.assertEqual(rpc.hedge_stats["hedged"], 1)
+        self.assertEqual(rpc.hedge_stats["hedge_wins"], 1)
+        self.assertEqual(fast.calls, ["get_block"])
+        # the latency is recorded for the node which has answered
+        self.assertLess(rpc.nodes[1].latency, 0.5)
+        self.assertEqual(rpc.nodes[0].latency, slow_latency)
+
+    def test_hedge_skips_websocket_nodes(self):
+        slow, fast = self.start_nodes(0, 0)
+        urls = [slow.url, "ws://127.0.0.1:1", fast.url]
+        rpc = GrapheneRPC(urls, timeout=10, disable_chain_detection=True, num_retries=2, num_retries_call=2,
+                          hedge_requests=True, hedge_min_samples=5, node_reschedule_interval=0)
+        for i in range(5):
+            rpc.get_block({"block_num": i + 1}, api="block")
+        slow.delay = 1.
+        block = rpc.get_block({"block_num": 10}, api="block")
+        self.assertEqual(block["block"]["block_id"][:8], "0000000a")
+        self.assertEqual(rpc.hedge_stats["hedge_wins"], 1)
+        self.assertEqual(fast.calls, ["get_block"])
+
+    def test_hedge_slots(self):
+        slow, fast = self.start_nodes(0, 0)
+        rpc = GrapheneRPC([slow.url, fast.url], timeout=2, disable_chain_detection=True, num_retries=2,
+                          num_retries_call=2, hedge_requests=True, hedge_min_samples=5, hedge_max_calls=1,
+                          node_reschedule_interval=0)
+        for i in range(5):
+            rpc.get_block({"block_num": i + 1}, api="block")
+        slow.delay = 1.
+        rpc.get_block({"block_num": 10}, api="block")
+        self.assertEqual(rpc.hedge_stats["hedge_wins"], 1)
+        # the slot is kept until the losing request has finished, the next call is not hedged
+        fast.delay = 5.
+        rpc.get_block({"block_num": 11}, api="block")
+        self.assertEqual(rpc.hedge_stats["hedged"], 1)
+        # the losing hedge ends with the timeout of its call
+        slow.delay = 1.5
+        start = time.time()
+        block = rpc.get_block({"block_num": 12}, api="block")
+        self.assertEqual(block["block"]["block_id"][:8], "0000000c")
+        self.assertEqual(rpc.hedge_stats["hedged"], 2)
+        self.assertTrue(rpc._hedge_slots.acquire(True, 2.5 - (time.time() - start)))
+
+    def test_no_hedge_for_broadcast(self):
+        slow, fast = self.start_nodes(0, 0)
+        rpc = create_rpc([slow, fast], hedge_requests=True, hedge_min_samples=5, node_reschedule_interval=0)
+        for i in range(5):
+            rpc.get_block({"block_num": i + 1}, api="block")
+        slow.delay = 0.3
+        rpc.broadcast_transaction({"trx": {}}, api="network_broadcast")
+        self.assertEqual(rpc.hedge_stats["hedged"], 0)
+        self.assertEqual(len(fast.calls), 0)
+
+    def test_node_reschedule(self):
+        slow, fast = self.start_nodes(0.05, 0)
+        rpc = create_rpc([slow, fast], node_reschedule_interval=2)
+        for i in range(3):
+            rpc.get_block({"block_num": i + 1}, api="block")
+        # the unmeasured node is probed in the background, the connection is kept
+        rpc._probe_executor.shutdown(wait=True)
+        rpc._probe_executor = None
+        self.assertEqual(rpc.url, slow.url)
+        self.assertEqual(fast.calls, ["get_block"])
+        self.assertIsNotNone(rpc.nodes[1].latency)
+        for i in range(3):
+            rpc.get_block({"block_num": i + 1}, api="block")
+        # the measured node is clearly faster
+        self.assertEqual(rpc.url, fast.url)
+        self.assertEqual(create_rpc([slow, fast]).node_reschedule_interval, 0)
+        # a single node is never probed
+        rpc = create_rpc([slow], node_reschedule_interval=1)
+        for i in range(3):
+            rpc.get_block({"block_num": i + 1}, api="block")
+        self.assertIsNone(rpc._probe_executor)
+        self.assertEqual(rpc._calls_since_reschedule, 0)
+
+    def test_batch_fanout(self):
+        nodes = self.start_nodes(0, 0, 0)
+        rpc = create_rpc(nodes, batch_fanout=True, fanout_batch_size=10)
+        for i in range(1, 100):
+            rpc.get_block({"block_num": i}, api="block", add_to_queue=True)
+        blocks = rpc.get_block({"block_num": 100}, api="block", add_to_queue=False)
+        self.assertEqual([int(b["block"]["block_id"][:8], 16) for b in blocks], list(range(1, 101)))
+        for node in nodes:
+            self.assertGreater(len(node.calls), 0)
+        self.assertEqual(sum([len(node.calls) for node in nodes]), 100)
+
+    def test_batch_fanout_retry(self):
+        good1, bad, good2 = self.start_nodes(0, 0, 0)
+        bad.fail = True
+        rpc = create_rpc([good1, bad, good2], batch_fanout=True, fanout_batch_size=10)
+        for i in range(1, 60):
+            rpc.get_block({"block_num": i}, api="block", add_to_queue=True)
+        blocks = rpc.get_block({"block_num": 60}, api="block", add_to_queue=False)
+        self.assertEqual([int(b["block"]["block_id"][:8], 16) for b in blocks], list(range(1, 61)))
+        self.assertGreater(bad.calls.count("failed"), 0)
+        self.assertEqual(len(good1.calls) + len(good2.calls), 60)
+
+    def test_batch_fanout_failure(self):
+        nodes = self.start_nodes(0, 0)
+        rpc = create_rpc(nodes, batch_fanout=True, fanout_batch_size=10)
+        queries = [get_query(True, i, "block_api", "get_block", [{"block_num": i}]) for i in range(1, 21)]
+        # incomplete batch replies from all nodes are not filled up with None
+        for node in nodes:
+            node.single_reply = True
+        with self.assertRaises(RPCError):
+            rpc.rpcexec_fanout(queries)
+        for node in nodes:
+            node.single_reply = False
+        self.assertEqual(len(rpc.rpcexec_fanout(queries)), 20)
+        for node in nodes:
+            node.fail = True
+        with self.assertRaises(RPCErrorDoRetry):
+            rpc.rpcexec_fanout(queries)
+
+    def test_rpc_cache(self):
+        node, = self.start_nodes(0)
+        path = tempfile.mkdtemp()
+        try:
+            rpc = create_rpc([node], rpc_cache=RPCCache(path))
+            props = rpc.get_dynamic_global_properties(api="database")
+            self.assertEqual(props["last_irreversible_block_num"], 80)
+            for i in range(70, 89):
+                rpc.get_block({"block_num": i}, api="block", add_to_queue=True)
+            blocks = rpc.get_block({"block_num": 89}, api="block", add_to_queue=False)
+            self.assertEqual(len(node.calls), 21)
+            # blocks 70 - 80 are irreversible and cached
+            rpc2 = create_rpc([node], rpc_cache=path)
+            for i in range(70, 89):
+                rpc2.get_block({"block_num": i}, api="block", add_to_queue=True)
+            self.assertEqual(rpc2.get_block({"block_num": 89}, api="block", add_to_queue=False), blocks)
+            self.assertEqual(len(node.calls), 21 + 9)
+            self.assertEqual(rpc2.get_block({"block_num": 75}, api="block"), blocks[5])
+            self.assertEqual(len(node.calls), 21 + 9)
+            self.assertEqual(rpc2.rpc_cache.hits, 12)
+        finally:
+            shutil.rmtree(path)
+
+    def test_coalesce_requests(self):
+        node, = self.start_nodes(0.3)
+        self.assertFalse(create_rpc([node]).coalesce_requests)
+        rpc = create_rpc([node], coalesce_requests=True)
+        results = []
+
+        def worker():
+            results.append(rpc.get_dynamic_global_properties(api="database"))
+        threads = [threading.Thread(target=worker) for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(results), 8)
+        self.assertEqual(node.calls, ["get_dynamic_global_properties"])
+        self.assertEqual(rpc.coalesce_stats, {"hits": 7, "misses": 1})
+        for r in results[1:]:
+            self.assertEqual(r, results[0])
+            self.assertIsNot(r, results[0])
+        # calls which do not overlap are sent again
+        node.delay = 0
+        rpc.get_dynamic_global_properties(api="database")
+        self.assertEqual(len(node.calls), 2)
+
+    def test_concurrent_call_retries(self):
+        node, = self.start_nodes(0.2)
+        rpc = HiveNodeRPC([node.url], timeout=10, disable_chain_detection=True, num_retries=2, num_retries_call=3)
+        node.internal_errors = 1
+        results = []
+        errors = []
+
+        def worker():
+            try:
+                results.append(rpc.get_dynamic_global_properties(api="database"))
+            except Exception as e:
+                errors.append(e)
+        threads = [threading.Thread(target=worker) for i in range(7)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        # each call has its own retries, the other calls do not use them up
+        self.assertEqual(errors, [])
+        self.assertEqual(len(results), 7)
+        self.assertEqual(len(node.calls), 8)
+        self.assertEqual(rpc.nodes.num_retries_call, 3)
+
+    def test_concurrent_node_switch(self):
+        first, second = self.start_nodes(0, 0)
+        rpc = create_rpc([first, second], num_retries=1, pool_maxsize=8)
+        first.stop()
+        results = []
+        errors = []
+        barrier = threading.Barrier(8)
+
+        def worker():
+            barrier.wait()
+            try:
+                results.append(rpc.get_dynamic_global_properties(api="database"))
+            except Exception as e:
+                errors.append(e)
+        threads = [threading.Thread(target=worker) for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        # the failed node is counted and left only once
+        self.assertEqual(errors, [])
+        self.assertEqual(rpc.url, second.url)
+        self.assertEqual(rpc.nodes[0].error_cnt, 1)
+        self.assertEqual(rpc.nodes[1].error_cnt, 0)
+
+    def test_connection_published_after_get_config(self):
+        first, second = self.start_nodes(0, 0)
+        rpc = GrapheneRPC([first.url, second.url], timeout=10, num_retries=1, num_retries_call=2,
+                          node_reschedule_interval=0)
+        self.assertEqual(rpc.url, first.url)
+        second.delay = 0.5
+        switch = threading.Thread(target=rpc.rpcconnect)
+        switch.start()
+        time.sleep(0.1)
+        # calls during the switch use the old connection
+        rpc.get_block({"block_num": 1}, api="block")
+        self.assertEqual(rpc.url, first.url)
+        switch.join()
+        self.assertEqual(rpc.url, second.url)
+        self.assertEqual(first.calls, ["get_config", "get_block"])
+        self.assertEqual(second.calls, ["get_config"])
+        # a node which fails get_config is never used
+        first.fail = True
+        rpc.rpcconnect()
+        self.assertEqual(rpc.url, second.url)
+        self.assertEqual(second.calls, ["get_config", "get_config"])
+
+    def test_thread_safe_queue(self):
+        node, = self.start_nodes(0.05)
+        rpc = create_rpc([node], pool_maxsize=4)
+        self.assertTrue(rpc.is_thread_safe())
+        self.assertEqual(rpc.session.get_adapter(node.url)._pool_maxsize, 4)
+        results = {}
+
+        def worker(n):
+            for i in range(3):
+                rpc.get_block({"block_num": n * 10 + i}, api="block", add_to_queue=True)
+            blocks = rpc.get_block({"block_num": n * 10 + 3}, api="block", add_to_queue=False)
+            results[n] = [int(b["block"]["block_id"][:8], 16) for b in blocks]
+        threads = [threading.Thread(target=worker, args=(n, )) for n in range(1, 9)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        for n in range(1, 9):
+            self.assertEqual(results[n], [n * 10 + i for i in range(4)])
+        rpc.resize_connection_pool(16)
+        self.assertEqual(rpc.session.get_adapter(node.url)._pool_maxsize, 16)
+
+    def test_metrics(self):
+        bad, good = self.start_nodes(0, 0)
+        # connections to a stopped node are refused
+        bad.stop()
+        self.nodes = [good]
+        self.assertIsNone(create_rpc([good]).metrics)
+        rpc = create_rpc([bad, good], num_retries=5, autoconnect=False, metrics=True)
+        rpc.rpcconnect()
+        rpc.get_block({"block_num": 1}, api="block")
+        for i in range(2, 5):
+            rpc.get_block({"block_num": i}, api="block", add_to_queue=True)
+        rpc.get_dynamic_global_properties(api="database", add_to_queue=False)
+        snapshot = rpc.metrics.snapshot()
+        self.assertEqual(snapshot["methods"]["block_api.get_block"]["calls"], 4)
+        self.assertEqual(snapshot["methods"]["block_api.get_block"]["errors"], 1)
+        self.assertEqual(snapshot["methods"]["block_api.get_block"]["retries"], 1)
+        self.assertEqual(snapshot["methods"]["block_api.get_block"]["latency"]["count"], 2)
+        self.assertEqual(snapshot["methods"]["database_api.get_dynamic_global_properties"]["calls"], 1)
+        self.assertEqual(snapshot["nodes"][bad.url]["errors"], 1)
+        self.assertEqual(snapshot["nodes"][good.url]["calls"], 2)
+        self.assertGreater(snapshot["nodes"][good.url]["response_bytes"], 0)
+        self.assertEqual(snapshot["node_switches"], 1)
+        self.assertEqual(snapshot["batch_sizes"]["count"], 2)
+        self.assertEqual(snapshot["batch_sizes"]["max"], 4)
+        self.assertEqual(rpc.metrics.top_methods(1)[0][0], "block_api.get_block")
+        rpc.metrics.reset()
+        self.assertEqual(rpc.metrics.snapshot()["methods"], {})
@@ -0,0 +1,67 @@
+# This Python file uses the following encoding: utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from bhiveapi.metrics import Histogram, RPCMetrics
+from bhiveapi.rpcutils import get_query
+
+
+class Testcases(unittest.TestCase):
+
+    def test_histogram(self):
+        h = Histogram([0.1, 0.5, 1])
+        for value in [0.05, 0.05, 0.2, 0.7, 3]:
+            h.add(value)
+        self.assertEqual(h.counts, [2, 1, 1, 1])
+        self.assertEqual(h.count, 5)
+        self.assertEqual(h.min, 0.05)
+        self.assertEqual(h.max, 3)
+        self.assertEqual(h.percentile(40), 0.1)
+        self.assertEqual(h.percentile(60), 0.5)
+        self.assertEqual(h.percentile(100), 3)
+        self.assertIsNone(Histogram([1]).percentile(50))
+
+    def test_record(self):
+        metrics = RPCMetrics()
+        block_query = get_query(True, 1, "block_api", "get_block", [{"block_num": 1}])
+        dgp_query = get_query(True, 2, "database_api", "get_dynamic_global_properties", [])
+        condenser_query = get_query(False, 3, "condenser_api", "get_accounts", [["test"]])
+        metrics.record_call([block_query, block_query, dgp_query], "https://a", 0.3, 300, 600)
+        metrics.record_call(condenser_query, "https://b", 0.1, 100, 200)
+        metrics.record_empty_reply(condenser_query, "https://b")
+        metrics.record_retry(condenser_query, "https://b")
+        metrics.record_error(block_query, "https://a")
+        metrics.record_node_switch("https://a", "https://b")
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot["methods"]["block_api.get_block"]["calls"], 2)
+        self.assertEqual(snapshot["methods"]["block_api.get_block"]["request_bytes"], 200)
+        self.assertEqual(snapshot["methods"]["block_api.get_block"]["response_bytes"], 400)
+        self.assertEqual(snapshot["methods"]["block_api.get_block"]["errors"], 1)
+        self.assertEqual(snapshot["methods"]["condenser_api.get_accounts"]["empty_replies"], 1)
+        self.assertEqual(snapshot["methods"]["condenser_api.get_accounts"]["retries"], 1)
+        self.assertEqual(snapshot["nodes"]["https://a"]["calls"], 1)
+        self.assertEqual(snapshot["nodes"]["https://b"]["latency"]["sum"], 0.1)
+        self.assertEqual(snapshot["batch_sizes"]["counts"][0], 1)
+        self.assertEqual(snapshot["node_switches"], 1)
+        self.assertEqual(metrics.top_methods(2), [("block_api.get_block", 0.3),
+                                                  ("database_api.get_dynamic_global_properties", 0.3)])
+
+    def test_dump(self):
+        metrics = RPCMetrics(latency_buckets=[1, 0.1])
+        self.assertEqual(metrics.latency_buckets, [0.1, 1])
+        metrics.record_call(get_query(True, 1, "block_api", "get_block", [{"block_num": 1}]), "https://a", 0.01)
+        path = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(path, "metrics.json")
+            metrics.dump(filename)
+            with open(filename) as f:
+                data = json.load(f)
+            self.assertEqual(data["methods"]["block_api.get_block"]["latency"]["counts"][0], 1)
+        finally:
+            shutil.rmtree(path)
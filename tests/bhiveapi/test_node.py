@@ -54,3 +54,77 @@ class Testcases(unittest.TestCase):
         nodes = Nodes(["a", "b", "c"], 5, 5)
         nodes2 = Nodes(nodes, 5, 5)
         self.assertEqual(nodes.url, nodes2.url)
+
+    def test_latency_scheduler(self):
+        nodes = Nodes(["a", "b", "c"], -1, -1)
+        next(nodes)
+        nodes.record_latency(1.0)
+        next(nodes)
+        nodes.record_latency(0.1)
+        next(nodes)
+        nodes.record_latency(0.5)
+        # all nodes are measured, the fastest node is selected
+        next(nodes)
+        self.assertEqual(nodes.url, "b")
+        # switching always selects another node
+        next(nodes)
+        self.assertEqual(nodes.url, "c")
+        self.assertEqual(nodes.best_node_index(), 1)
+        self.assertTrue(nodes.should_switch_node())
+        next(nodes)
+        self.assertEqual(nodes.url, "b")
+        self.assertFalse(nodes.should_switch_node())
+
+    def test_should_switch_node(self):
+        nodes = Nodes(["a", "b", "c"], -1, -1)
+        next(nodes)
+        nodes.record_latency(0.5)
+        # unmeasured nodes are probed, but no reason to switch
+        self.assertFalse(nodes.should_switch_node())
+        self.assertEqual(nodes.probe_node_index(), 1)
+        self.assertEqual(nodes.probe_node_index(exclude=[1]), 2)
+        nodes.record_latency(0.4, node=nodes[1])
+        nodes.record_latency(0.2, node=nodes[2])
+        self.assertIsNone(nodes.probe_node_index())
+        # b is not better by the margin, c is
+        self.assertTrue(nodes.should_switch_node())
+        nodes[2].open_until = 0
+        self.assertEqual(nodes[2].circuit, "half-open")
+        self.assertFalse(nodes.should_switch_node())
+        self.assertEqual(nodes.probe_node_index(), 2)
+
+    def test_circuit_breaker(self):
+        nodes = Nodes(["a", "b"], -1, -1)
+        next(nodes)
+        for i in range(nodes.breaker_threshold):
+            nodes.increase_error_cnt()
+        self.assertEqual(nodes.node.circuit, "open")
+        next(nodes)
+        self.assertEqual(nodes.url, "b")
+        nodes.record_latency(0.2)
+        # a is skipped while its circuit is open
+        next(nodes)
+        self.assertEqual(nodes.url, "b")
+        nodes[0].open_until = 0
+        self.assertEqual(nodes[0].circuit, "half-open")
+        # half-open nodes are probed
+        next(nodes)
+        self.assertEqual(nodes.url, "a")
+        nodes.increase_error_cnt()
+        self.assertEqual(nodes[0].circuit, "open")
+        self.assertEqual(nodes[0].cooldown, 2 * nodes.breaker_cooldown)
+        nodes[0].open_until = 0
+        nodes.record_latency(0.3)
+        self.assertEqual(nodes[0].circuit, "closed")
+
+    def test_node_scores(self):
+        nodes = Nodes(["a", "b"], 5, 5)
+        next(nodes)
+        nodes.record_latency(0.5)
+        scores = nodes.node_scores()
+        self.assertEqual(len(scores), 2)
+        self.assertEqual(scores[0]["url"], "a")
+        self.assertEqual(scores[0]["latency"], 0.5)
+        self.assertEqual(scores[0]["circuit"], "closed")
+        self.assertTrue(scores[0]["working"])
+        self.assertTrue(scores[1]["latency"] is None)
@@ -0,0 +1,104 @@
+# This Python file uses the following encoding: utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+import shutil
+import tempfile
+import unittest
+from bhiveapi.rpccache import RPCCache
+from bhiveapi.rpcutils import get_query
+
+
+def get_block_query(block_num, request_id=1):
+    return get_query(True, request_id, "block_api", "get_block", [{"block_num": block_num}])
+
+
+def get_block_result(block_num):
+    return {"block": {"block_id": "%08x" % block_num + "0" * 32, "transactions": []}}
+
+
+class Testcases(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.cache = RPCCache(self.path)
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.path)
+
+    def set_lib(self, cache, block_num):
+        query = get_query(True, 1, "database_api", "get_dynamic_global_properties", [])
+        cache.store(query, {"head_block_number": block_num + 20, "last_irreversible_block_num": block_num})
+
+    def test_key(self):
+        self.assertEqual(RPCCache.get_key(get_block_query(10, request_id=1)),
+                         RPCCache.get_key(get_block_query(10, request_id=5)))
+        self.assertNotEqual(RPCCache.get_key(get_block_query(10)), RPCCache.get_key(get_block_query(11)))
+
+    def test_chain_id(self):
+        self.assertIs(self.cache.for_chain("aa" * 32), self.cache)
+        self.assertEqual(self.cache.chain_id, "aa" * 32)
+        other = self.cache.for_chain("bb" * 32)
+        self.assertIsNot(other, self.cache)
+        self.assertNotEqual(self.cache.get_key(get_block_query(10), self.cache.chain_id),
+                            other.get_key(get_block_query(10), other.chain_id))
+        self.set_lib(self.cache, 100)
+        self.assertIsNone(other.last_irreversible_block_num)
+        self.assertFalse(other.store(get_block_query(10), get_block_result(10)))
+        self.set_lib(other, 50)
+        self.assertEqual(self.cache.last_irreversible_block_num, 100)
+        self.assertTrue(self.cache.store(get_block_query(10), get_block_result(10)))
+        # results of another chain are not returned
+        self.assertEqual(other.get(get_block_query(10)), (False, None))
+        self.assertEqual(self.cache.get(get_block_query(10)), (True, get_block_result(10)))
+        other.close()
+
+    def test_irreversible_only(self):
+        # nothing is stored before the last irreversible block is known
+        self.assertFalse(self.cache.store(get_block_query(10), get_block_result(10)))
+        self.set_lib(self.cache, 100)
+        self.assertEqual(self.cache.last_irreversible_block_num, 100)
+        self.assertTrue(self.cache.store(get_block_query(100), get_block_result(100)))
+        self.assertFalse(self.cache.store(get_block_query(101), get_block_result(101)))
+        self.assertFalse(self.cache.store(get_block_query(50), {}))
+        self.assertFalse(self.cache.store(get_block_query(50), {"block": {}}))
+        condenser_query = get_query(False, 1, "condenser_api", "get_block", [50])
+        self.assertTrue(self.cache.store(condenser_query, get_block_result(50)["block"]))
+        dgp_query = get_query(True, 1, "database_api", "get_dynamic_global_properties", [])
+        self.assertFalse(self.cache.store(dgp_query, {"head_block_number": 120}))
+
+        self.assertEqual(self.cache.get(get_block_query(100, request_id=7)), (True, get_block_result(100)))
+        self.assertEqual(self.cache.get(get_block_query(101)), (False, None))
+        self.assertEqual(self.cache.get(condenser_query), (True, get_block_result(50)["block"]))
+        self.assertEqual(self.cache.hits, 2)
+        self.assertEqual(self.cache.misses, 1)
+
+    def test_transaction(self):
+        self.set_lib(self.cache, 100)
+        query = get_query(True, 1, "account_history_api", "get_transaction", [{"id": "ab" * 20}])
+        self.assertFalse(self.cache.store(query, {"block_num": 101, "transaction_id": "ab" * 20}))
+        self.assertTrue(self.cache.store(query, {"block_num": 99, "transaction_id": "ab" * 20}))
+
+    def test_shared_directory(self):
+        other = RPCCache(self.path)
+        self.set_lib(self.cache, 100)
+        self.assertEqual(other.last_irreversible_block_num, 100)
+        # a lower value is ignored
+        self.set_lib(other, 90)
+        self.assertEqual(self.cache.last_irreversible_block_num, 100)
+        self.assertTrue(other.store(get_block_query(10), get_block_result(10)))
+        self.assertEqual(self.cache.get(get_block_query(10)), (True, get_block_result(10)))
+        other.close()
+
+    def test_evict(self):
+        self.set_lib(self.cache, 1000)
+        self.cache.evict_interval = 10
+        self.cache.max_size = 50 * len(RPCCache.get_key(get_block_query(1)))
+        for block_num in range(1, 201):
+            self.cache.store(get_block_query(block_num), get_block_result(block_num))
+        self.assertLessEqual(self.cache.size, self.cache.max_size + 10 * 150)
+        self.assertLess(len(self.cache), 200)
+        self.assertTrue(self.cache.get(get_block_query(200))[0])
+        self.cache.clear()
+        self.assertEqual(len(self.cache), 0)
@@ -7,7 +7,7 @@ import pytest
 import unittest
 from bhiveapi.rpcutils import (
     is_network_appbase_ready,
-    get_api_name, get_query, UnauthorizedError,
+    get_api_name, get_query, get_api_method, is_broadcast_query, UnauthorizedError,
     RPCConnection, RPCError, NumRetriesReached
 )
 
@@ -30,6 +30,20 @@ class Testcases(unittest.TestCase):
         self.assertTrue(get_api_name(False, api="") is None)
         self.assertTrue(get_api_name(False) is None)
 
+    def test_get_query_copy(self):
+        params = {"account": "alice", "keys": ["a"]}
+        query = get_query(True, 1, "test_api", "test", args=(params,))
+        params["keys"].append("b")
+        self.assertEqual(query["params"], {"account": "alice", "keys": ["a"]})
+        params = [{"block_num": 1}, {"block_num": 2}]
+        query_list = get_query(True, 1, "test_api", "test", args=(params,))
+        params[0]["block_num"] = 3
+        self.assertEqual(query_list[0]["params"], {"block_num": 1})
+        params = ["alice", ("a", "b")]
+        query = get_query(False, 1, "test_api", "test", args=params)
+        params[0] = "bob"
+        self.assertEqual(query["params"], ["test_api", "test", ["alice", ["a", "b"]]])
+
     def test_get_query(self):
         query = get_query(True, 1, "test_api", "test", args="")
         self.assertEqual(query["method"], 'test_api.test')
@@ -83,3 +97,18 @@ class Testcases(unittest.TestCase):
         self.assertEqual(query["id"], 1)
         self.assertTrue(isinstance(query["params"], list))
         self.assertEqual(query["params"], ["test_api", "test", ["b"]])
+
+    def test_get_api_method(self):
+        query = get_query(True, 1, "block_api", "get_block", ({"block_num": 1},))
+        self.assertEqual(get_api_method(query), ("block_api", "get_block", {"block_num": 1}))
+        query = get_query(True, 1, "condenser_api", "get_block", (1,))
+        self.assertEqual(get_api_method(query), ("condenser_api", "get_block", [1]))
+        query = get_query(False, 1, "database_api", "get_config", ())
+        self.assertEqual(get_api_method(query), ("database_api", "get_config", []))
+
+    def test_is_broadcast_query(self):
+        self.assertTrue(is_broadcast_query(get_query(True, 1, "condenser_api", "broadcast_transaction", ({},))))
+        self.assertTrue(is_broadcast_query(get_query(True, 1, "network_broadcast_api", "broadcast_transaction", ({"trx": {}},))))
+        self.assertTrue(is_broadcast_query([get_query(True, 1, "condenser_api", "get_block", (1,)),
+                                            get_query(True, 2, "condenser_api", "broadcast_transaction_synchronous", ({},))]))
+        self.assertFalse(is_broadcast_query(get_query(True, 1, "block_api", "get_block", ({"block_num": 1},))))
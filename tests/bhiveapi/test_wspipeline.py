@@ -0,0 +1,158 @@
+# This Python file uses the following encoding: utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+import json
+import threading
+import time
+import unittest
+from bhiveapi.wspipeline import WebsocketPipeline, get_request_ids
+from websocket._exceptions import WebSocketConnectionClosedException, WebSocketTimeoutException
+try:
+    from queue import Queue, Empty
+except ImportError:
+    from Queue import Queue, Empty
+
+
+class FakeWebsocket(object):
+    """Answers requests in reverse order, as soon as `batch` requests were received"""
+    def __init__(self, batch=1, recv_timeout=None):
+        self.batch = batch
+        # recv raises WebSocketTimeoutException, when no reply is received within recv_timeout
+        self.recv_timeout = recv_timeout
+        self.received = []
+        self.replies = Queue()
+        self.lock = threading.Lock()
+        self.closed = False
+
+    def send(self, payload):
+        with self.lock:
+            self.received.append(json.loads(payload))
+            if len(self.received) < self.batch:
+                return
+            requests = self.received
+            self.received = []
+        for request in reversed(requests):
+            if isinstance(request, list):
+                reply = [{"jsonrpc": "2.0", "id": r["id"], "result": r["params"]} for r in reversed(request)]
+            else:
+                reply = {"jsonrpc": "2.0", "id": request["id"], "result": request["params"]}
+            self.replies.put(json.dumps(reply))
+
+    def recv(self):
+        start = time.time()
+        while True:
+            if self.closed:
+                raise WebSocketConnectionClosedException("closed")
+            try:
+                return self.replies.get(timeout=0.05)
+            except Empty:
+                if self.recv_timeout is not None and time.time() - start > self.recv_timeout:
+                    raise WebSocketTimeoutException("timed out")
+
+
+def query(request_id, params):
+    return {"jsonrpc": "2.0", "id": request_id, "method": "test_api.test", "params": params}
+
+
+class Testcases(unittest.TestCase):
+    def test_get_request_ids(self):
+        self.assertEqual(get_request_ids(query(1, {})), [1])
+        self.assertEqual(get_request_ids([query(1, {}), query(2, {})]), [1, 2])
+
+    def test_out_of_order_replies(self):
+        ws = FakeWebsocket(batch=4)
+        pipeline = WebsocketPipeline(ws, timeout=5)
+        results = {}
+
+        def call(i):
+            payload = query(i, {"n": i})
+            results[i] = pipeline.request(json.dumps(payload), [i])
+
+        threads = [threading.Thread(target=call, args=(i,)) for i in range(1, 5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        for i in range(1, 5):
+            self.assertEqual(results[i]["id"], i)
+            self.assertEqual(results[i]["result"], {"n": i})
+        self.assertEqual(pipeline.pending_count, 0)
+        ws.closed = True
+
+    def test_batch_reply_order(self):
+        ws = FakeWebsocket()
+        pipeline = WebsocketPipeline(ws, timeout=5)
+        payload = [query(i, {"n": i}) for i in range(10, 13)]
+        reply = pipeline.request(json.dumps(payload), get_request_ids(payload))
+        self.assertEqual([r["id"] for r in reply], [10, 11, 12])
+        ws.closed = True
+
+    def test_closed_connection(self):
+        ws = FakeWebsocket(batch=2)
+        pipeline = WebsocketPipeline(ws, timeout=5)
+        pending = pipeline.send(json.dumps(query(1, {})), [1])
+        ws.closed = True
+        with self.assertRaises(WebSocketConnectionClosedException):
+            pipeline.wait(pending)
+        with self.assertRaises(WebSocketConnectionClosedException):
+            pipeline.send(json.dumps(query(2, {})), [2])
+
+    def test_timeout(self):
+        ws = FakeWebsocket(batch=2)
+        pipeline = WebsocketPipeline(ws, timeout=0.2)
+        with self.assertRaises(WebSocketTimeoutException):
+            pipeline.request(json.dumps(query(1, {})), [1])
+        self.assertEqual(pipeline.pending_count, 0)
+        ws.closed = True
+
+    def test_recv_timeout_keeps_requests(self):
+        ws = FakeWebsocket(batch=2, recv_timeout=0.1)
+        pipeline = WebsocketPipeline(ws, timeout=5)
+        first = pipeline.send(json.dumps(query(1, {"n": 1})), [1])
+        # the socket times out while the first request is waiting
+        time.sleep(0.3)
+        second = pipeline.send(json.dumps(query(2, {"n": 2})), [2])
+        self.assertEqual(pipeline.wait(first)["result"], {"n": 1})
+        self.assertEqual(pipeline.wait(second)["result"], {"n": 2})
+        ws.closed = True
+
+    def test_timeout_of_single_request(self):
+        ws = FakeWebsocket(batch=3, recv_timeout=0.05)
+        pipeline = WebsocketPipeline(ws, timeout=0.3)
+        first = pipeline.send(json.dumps(query(1, {"n": 1})), [1])
+        time.sleep(0.2)
+        second = pipeline.send(json.dumps(query(2, {"n": 2})), [2])
+        # the first request expires, the second one is still within its deadline
+        with self.assertRaises(WebSocketTimeoutException):
+            pipeline.wait(first)
+        # the late request is answered together with a new one
+        ws.batch = 2
+        third = pipeline.send(json.dumps(query(3, {"n": 3})), [3])
+        self.assertEqual(pipeline.wait(third)["result"], {"n": 3})
+        self.assertEqual(pipeline.wait(second)["result"], {"n": 2})
+        ws.closed = True
+
+    def test_late_reply_after_timeout(self):
+        ws = FakeWebsocket(batch=100)
+        pipeline = WebsocketPipeline(ws, timeout=0.2)
+        with self.assertRaises(WebSocketTimeoutException):
+            pipeline.request(json.dumps(query(1, {"n": 1})), [1])
+        pipeline.timeout = 5
+        second = pipeline.send(json.dumps(query(2, {"n": 2})), [2])
+        # the late reply of the first request is dropped and not given to the second one
+        ws.replies.put(json.dumps({"jsonrpc": "2.0", "id": 1, "result": {"n": 1}}))
+        ws.replies.put(json.dumps({"jsonrpc": "2.0", "id": 2, "result": {"n": 2}}))
+        reply = pipeline.wait(second)
+        self.assertEqual(reply["id"], 2)
+        self.assertEqual(reply["result"], {"n": 2})
+        ws.closed = True
+
+    def test_reply_without_id(self):
+        ws = FakeWebsocket(batch=100)
+        pipeline = WebsocketPipeline(ws, timeout=5)
+        pending = pipeline.send(json.dumps(query(1, {})), [1])
+        ws.replies.put(json.dumps({"jsonrpc": "2.0", "id": None, "error": {"code": -32700, "message": "Parse error"}}))
+        self.assertEqual(pipeline.wait(pending)["error"]["code"], -32700)
+        ws.closed = True
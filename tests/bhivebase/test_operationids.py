@@ -0,0 +1,16 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+import unittest
+from bhivebase.operationids import getVirtualOperationFilter, virtual_op_filter
+
+
+class Testcases(unittest.TestCase):
+    def test_getVirtualOperationFilter(self):
+        self.assertEqual(getVirtualOperationFilter([]), 0)
+        self.assertEqual(getVirtualOperationFilter(["producer_reward"]), 0x004000)
+        self.assertEqual(getVirtualOperationFilter(["fill_convert_request_operation", "author_reward"]), 0x000003)
+        self.assertEqual(getVirtualOperationFilter(list(virtual_op_filter)), 2 ** len(virtual_op_filter) - 1)
+        with self.assertRaises(ValueError):
+            getVirtualOperationFilter(["transfer"])